@@ -0,0 +1,408 @@
+"""
+Annotation index for YoloLabel application.
+YOLO .txt files in the annotations folder stay the source of truth and export
+format. This module mirrors them into an SQLite database (WAL mode) so single
+and bulk reads are served from the index instead of opening every file. Files
+written by other tools are picked up by comparing mtime and size.
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple, Callable, Set, Iterable
+
+# Constants
+ANNOTATIONS_FOLDER = os.path.join(os.getcwd(), "annotations")
+ANNOTATION_DB_PATH = os.environ.get(
+    "YOLOLABEL_ANNOTATION_DB", os.path.join(os.getcwd(), "annotation_index.sqlite3")
+)  # Index database, kept outside the annotations folder so exports don't include it
+BOX_KEYS = ("class", "x_center", "y_center", "width", "height")
+
+def parse_yolo_lines(text: str) -> List[Dict[str, Any]]:
+    """
+    Parse the content of a YOLO annotation file.
+
+    Args:
+        text: File content, one "class x_center y_center width height" line per box
+
+    Returns:
+        List of box dicts; blank and malformed lines are skipped
+    """
+    boxes = []
+    for line in text.split('\n'):
+        parts = line.split()
+        if len(parts) != 5:  # Standard YOLO format has 5 values
+            continue
+        try:
+            boxes.append({
+                "class": int(parts[0]),
+                "x_center": float(parts[1]),
+                "y_center": float(parts[2]),
+                "width": float(parts[3]),
+                "height": float(parts[4]),
+            })
+        except ValueError:
+            continue
+    return boxes
+
+def format_yolo_lines(boxes: List[Dict[str, Any]]) -> str:
+    """
+    Convert boxes to the content of a YOLO annotation file.
+
+    Args:
+        boxes: Box dicts with class, x_center, y_center, width and height
+
+    Returns:
+        File content with one line per box
+    """
+    lines = []
+    for box in boxes:
+        class_id = box.get("class", 0)
+        x_center = box.get("x_center", 0)
+        y_center = box.get("y_center", 0)
+        width = box.get("width", 0)
+        height = box.get("height", 0)
+        lines.append(f"{class_id} {x_center} {y_center} {width} {height}")
+    return '\n'.join(lines)
+
+class AnnotationStore:
+    """
+    SQLite index of the YOLO annotation files.
+
+    Each indexed file is recorded with its mtime and size; its boxes are stored
+    one row each. save() writes the .txt file and the index together, get()
+    re-reads a file only when it changed on disk, and sync() brings the whole
+    index up to date with a single directory scan.
+
+    A summary of box counts (per image and class, plus totals) is built from the
+    index on first use and then adjusted on every index change, so each update
+    costs O(boxes of the changed file).
+
+    on_change, if given, is called (with the index lock held, so it must not
+    call back into the store) for every saved, re-read or removed file.
+    """
+
+    def __init__(self, annotations_folder: str = ANNOTATIONS_FOLDER, db_path: str = ANNOTATION_DB_PATH,
+                 on_change: Optional[Callable[[str], None]] = None):
+        self.annotations_folder = annotations_folder
+        self.db_path = db_path
+        self.on_change = on_change  # Called with the stem of every file whose index entry changed
+        self._db = None
+        self._lock = threading.Lock()  # Guards the connection
+        self._sync_lock = threading.Lock()  # One directory scan at a time
+        self.stats = {"index_hits": 0, "file_reads": 0, "writes": 0, "syncs": 0}
+        self._image_counts: Optional[Dict[str, Counter]] = None  # Summary, built on first use
+        self._totals: Counter = Counter()
+        self._summary_version = 0
+        self._summary_json: Optional[Tuple[int, bytes]] = None  # Serialized summary and its version
+        self._instance_id = uuid.uuid4().hex[:8]  # Keeps ETags from different server runs apart
+        self._last_sync = 0.0
+
+    def _connect(self):
+        # Called with self._lock held
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS files (stem TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS boxes ("
+                "stem TEXT, class INTEGER, x_center REAL, y_center REAL, width REAL, height REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS boxes_stem ON boxes (stem)")
+            self._db.commit()
+        return self._db
+
+    def _path(self, stem: str) -> str:
+        return os.path.join(self.annotations_folder, stem + ".txt")
+
+    def _replace(self, db, stem: str, st: os.stat_result, boxes: List[Dict[str, Any]]):
+        # Called with self._lock held, inside a transaction
+        db.execute("DELETE FROM boxes WHERE stem = ?", (stem,))
+        db.executemany(
+            "INSERT INTO boxes VALUES (?, ?, ?, ?, ?, ?)",
+            [(stem, *(box[k] for k in BOX_KEYS)) for box in boxes],
+        )
+        db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?)", (stem, st.st_mtime_ns, st.st_size))
+
+    def _remove(self, db, stem: str) -> bool:
+        # Called with self._lock held, inside a transaction; returns whether the file was indexed
+        db.execute("DELETE FROM boxes WHERE stem = ?", (stem,))
+        return db.execute("DELETE FROM files WHERE stem = ?", (stem,)).rowcount > 0
+
+    def _index_changed(self, stem: str, boxes: Optional[List[Dict[str, Any]]]):
+        # Called with self._lock held, after the index change was committed; boxes=None removes the image
+        if self.on_change is not None:
+            self.on_change(stem)
+        self._update_summary(stem, boxes)
+
+    def _update_summary(self, stem: str, boxes: Optional[List[Dict[str, Any]]]):
+        # Called with self._lock held
+        if self._image_counts is None:
+            return
+        counts = Counter(box["class"] for box in boxes) if boxes is not None else None
+        old = self._image_counts.get(stem)
+        if old == counts:
+            return
+        if old is not None:
+            self._totals.subtract(old)
+            del self._image_counts[stem]
+        if counts is not None:
+            self._totals.update(counts)
+            self._image_counts[stem] = counts
+        self._totals = +self._totals  # Drop classes that no longer have boxes
+        self._summary_version += 1
+
+    def _read_file(self, stem: str) -> Optional[Tuple[os.stat_result, List[Dict[str, Any]]]]:
+        path = self._path(stem)
+        try:
+            with open(path, 'r') as f:
+                st = os.fstat(f.fileno())
+                boxes = parse_yolo_lines(f.read())
+        except FileNotFoundError:
+            return None
+        self.stats["file_reads"] += 1
+        return st, boxes
+
+    def get(self, stem: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get the boxes of one annotation file.
+
+        Args:
+            stem: Image filename without extension
+
+        Returns:
+            List of box dicts, or None if the image has no annotation file
+        """
+        try:
+            st = os.stat(self._path(stem))
+        except FileNotFoundError:
+            with self._lock:
+                db = self._connect()
+                with db:
+                    removed = self._remove(db, stem)
+                if removed:
+                    self._index_changed(stem, None)
+            return None
+
+        with self._lock:
+            db = self._connect()
+            row = db.execute("SELECT mtime_ns, size FROM files WHERE stem = ?", (stem,)).fetchone()
+            if row == (st.st_mtime_ns, st.st_size):
+                self.stats["index_hits"] += 1
+                rows = db.execute(
+                    "SELECT class, x_center, y_center, width, height FROM boxes WHERE stem = ? ORDER BY rowid",
+                    (stem,),
+                ).fetchall()
+                return [dict(zip(BOX_KEYS, r)) for r in rows]
+
+        # Changed on disk (or never indexed): read the file and refresh the index
+        loaded = self._read_file(stem)
+        if loaded is None:
+            return None
+        st, boxes = loaded
+        with self._lock:
+            db = self._connect()
+            with db:
+                self._replace(db, stem, st, boxes)
+            self._index_changed(stem, boxes)
+        return boxes
+
+    def save(self, stem: str, boxes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Write an annotation file and update the index.
+
+        Args:
+            stem: Image filename without extension
+            boxes: Box dicts with class, x_center, y_center, width and height
+
+        Returns:
+            The boxes as stored (parsed back from the written lines)
+        """
+        text = format_yolo_lines(boxes)
+        path = self._path(stem)
+        with open(path, 'w') as f:
+            f.write(text)
+        st = os.stat(path)
+        stored = parse_yolo_lines(text)
+        with self._lock:
+            db = self._connect()
+            with db:
+                self._replace(db, stem, st, stored)
+            self._index_changed(stem, stored)
+            self.stats["writes"] += 1
+        return stored
+
+    def sync(self, max_age: float = 0.0) -> Dict[str, int]:
+        """
+        Bring the index up to date with the annotations folder.
+
+        Only files whose mtime or size changed since they were indexed are read.
+
+        Args:
+            max_age: Skip the scan if the last one finished less than this many seconds ago
+
+        Returns:
+            Counts of added, updated and removed files
+        """
+        counts = {"added": 0, "updated": 0, "removed": 0}
+        with self._sync_lock:
+            if max_age > 0 and time.monotonic() - self._last_sync < max_age:
+                return counts
+            on_disk = {}
+            if os.path.isdir(self.annotations_folder):
+                with os.scandir(self.annotations_folder) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(".txt") and entry.is_file():
+                            st = entry.stat()
+                            on_disk[entry.name[:-4]] = (st.st_mtime_ns, st.st_size)
+
+            with self._lock:
+                indexed = {
+                    stem: (mtime_ns, size)
+                    for stem, mtime_ns, size in self._connect().execute("SELECT stem, mtime_ns, size FROM files")
+                }
+
+            changed = [stem for stem, sig in on_disk.items() if indexed.get(stem) != sig]
+            removed = [stem for stem in indexed if stem not in on_disk]
+            loaded = [(stem, self._read_file(stem)) for stem in changed]
+
+            with self._lock:
+                db = self._connect()
+                with db:
+                    for stem, result in loaded:
+                        if result is None:
+                            self._remove(db, stem)
+                            continue
+                        counts["updated" if stem in indexed else "added"] += 1
+                        self._replace(db, stem, result[0], result[1])
+                    for stem in removed:
+                        self._remove(db, stem)
+                        counts["removed"] += 1
+                for stem, result in loaded:
+                    self._index_changed(stem, result[1] if result is not None else None)
+                for stem in removed:
+                    self._index_changed(stem, None)
+                self.stats["syncs"] += 1
+            self._last_sync = time.monotonic()
+        return counts
+
+    def all_boxes(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Return the boxes of every indexed annotation file.
+
+        Returns:
+            Dict mapping image stem to its list of box dicts (empty files included)
+        """
+        with self._lock:
+            db = self._connect()
+            result = {stem: [] for (stem,) in db.execute("SELECT stem FROM files")}
+            for stem, *values in db.execute(
+                "SELECT stem, class, x_center, y_center, width, height FROM boxes ORDER BY stem, rowid"
+            ):
+                result[stem].append(dict(zip(BOX_KEYS, values)))
+        return result
+
+    def box_rows(self) -> Tuple[List[str], List[Tuple]]:
+        """
+        Return every indexed box as a flat row, for bulk processing.
+
+        Returns:
+            Tuple of (stems of all indexed files, including empty ones; list of
+            (stem, class, x_center, y_center, width, height) rows)
+        """
+        with self._lock:
+            db = self._connect()
+            stems = [stem for (stem,) in db.execute("SELECT stem FROM files")]
+            rows = db.execute("SELECT stem, class, x_center, y_center, width, height FROM boxes").fetchall()
+        return stems, rows
+
+    def class_counts(self) -> Dict[str, Dict[int, int]]:
+        """
+        Return the number of boxes per class for every indexed annotation file.
+
+        Returns:
+            Dict mapping image stem to {class id: box count} (empty files map to {})
+        """
+        with self._lock:
+            return self._class_counts_locked()
+
+    def _class_counts_locked(self) -> Dict[str, Dict[int, int]]:
+        # Called with self._lock held
+        db = self._connect()
+        result = {stem: {} for (stem,) in db.execute("SELECT stem FROM files")}
+        for stem, class_id, count in db.execute(
+            "SELECT stem, class, COUNT(*) FROM boxes GROUP BY stem, class"
+        ):
+            result[stem][class_id] = count
+        return result
+
+    def _ensure_summary_locked(self):
+        # Called with self._lock held
+        if self._image_counts is None:
+            self._image_counts = {}
+            for stem, counts in self._class_counts_locked().items():
+                self._image_counts[stem] = Counter(counts)
+                self._totals.update(counts)
+            self._summary_version += 1
+
+    def annotated_stems(self) -> Set[str]:
+        """Return the stems of all images that have an annotation file (empty files included)."""
+        with self._lock:
+            self._ensure_summary_locked()
+            return set(self._image_counts)
+
+    def stems_with_classes(self, class_ids: Iterable[int]) -> Set[str]:
+        """
+        Find the images that have boxes of any of the given classes.
+
+        Args:
+            class_ids: Class indexes to look for
+
+        Returns:
+            Set of image stems
+        """
+        class_ids = set(class_ids)
+        with self._lock:
+            self._ensure_summary_locked()
+            return {stem for stem, counts in self._image_counts.items() if not class_ids.isdisjoint(counts)}
+
+    def summary(self) -> Tuple[bytes, str]:
+        """
+        Return the box count summary as JSON, with an ETag.
+
+        The JSON has the per-image class counts ("images", keyed by image
+        filename without extension), the per-class totals ("totals"), the total
+        number of boxes and of annotated images, and the summary version. It is
+        serialized once per version.
+
+        Returns:
+            Tuple of (JSON bytes, ETag)
+        """
+        with self._lock:
+            self._ensure_summary_locked()
+            version = self._summary_version
+            if self._summary_json is None or self._summary_json[0] != version:
+                self._summary_json = (version, json.dumps({
+                    "version": version,
+                    "images": self._image_counts,
+                    "totals": self._totals,
+                    "total_boxes": sum(self._totals.values()),
+                    "annotated_images": sum(1 for counts in self._image_counts.values() if counts),
+                }).encode())
+            data = self._summary_json[1]
+        return data, f'"{self._instance_id}-{version}"'
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return index size and read/write counters."""
+        with self._lock:
+            db = self._connect()
+            files = db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            boxes = db.execute("SELECT COUNT(*) FROM boxes").fetchone()[0]
+        return {"files": files, "boxes": boxes, **self.stats}
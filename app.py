@@ -1,18 +1,124 @@
-from fastapi import FastAPI, HTTPException, Body, File, UploadFile
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import FastAPI, HTTPException, Body, File, UploadFile, Request
+from fastapi.responses import FileResponse, StreamingResponse, Response, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import sys
 import json
 import io
+import time
 import zipfile
 import shutil
+import asyncio
+import contextlib
+import importlib
 from typing import List, Dict, Optional
-import yolo_predict
+import image_utils
+import annotation_store
+import status_store
+import class_store
+import change_log
+import file_index
+import image_catalog
 from PIL import Image
 from datetime import datetime
 
-app = FastAPI(title="Image Files API")
+# The ML stack (ultralytics, torch, cv2) is imported on first use; set YOLOLABEL_ENABLE_ML=0 for labeling-only servers
+ENABLE_ML = os.environ.get("YOLOLABEL_ENABLE_ML", "1") != "0"
+# Load and warm up the prediction model at startup (set YOLOLABEL_PRELOAD_MODEL=0 to load on first use)
+PRELOAD_MODEL = ENABLE_ML and os.environ.get("YOLOLABEL_PRELOAD_MODEL", "1") != "0"
+
+# Startup state reported by /ready
+readiness = {"model": "pending" if PRELOAD_MODEL else "disabled", "model_path": None, "error": None, "timings": {}}
+
+def require_ml():
+    """Fail prediction requests with 503 when the ML stack is disabled."""
+    if not ENABLE_ML:
+        raise HTTPException(status_code=503, detail="Prediction is disabled on this server (YOLOLABEL_ENABLE_ML=0)")
+
+# Modules imported through import_modules(); importing them again is only a sys.modules lookup
+imported_modules = set()
+
+async def import_modules(*names):
+    """
+    Import heavy modules (ultralytics, torch, cv2, NumPy) in the executor.
+    
+    The first import takes seconds and, if another thread (the startup warmup)
+    is importing the same module, waits on its import lock; neither may happen
+    on the event loop. After this returns, plain import statements are cheap.
+    A missing or broken ML stack fails the request with 503 and the install hint.
+    """
+    missing = [name for name in names if name not in imported_modules]
+    if missing:
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, lambda: [importlib.import_module(name) for name in missing])
+        except ImportError as e:
+            print(f"Error importing {', '.join(missing)}: {str(e)}")
+            raise HTTPException(status_code=503, detail=str(e))
+        imported_modules.update(missing)
+
+def warm_up_model():
+    """Load the best model and run warmup inferences, logging the time of each phase."""
+    print("Preloading prediction model...")
+    readiness["model"] = "warming"
+    try:
+        start_time = time.perf_counter()
+        import yolo_predict
+        import worker_pool
+        imported_modules.update(("yolo_predict", "worker_pool"))
+        print(f"Imported prediction modules in {time.perf_counter() - start_time:.3f}s")
+        
+        timings = yolo_predict.warmup_model()
+        readiness["model_path"] = timings.pop("model_path")
+        print(f"Resolved model {readiness['model_path']} in {timings['resolve_seconds']:.3f}s")
+        print(f"Loaded model in {timings['load_seconds']:.3f}s")
+        print(f"Ran {len(timings['warmup_runs'])} warmup inferences in {timings['warmup_seconds']:.3f}s "
+              f"({', '.join(f'{t:.3f}s' for t in timings['warmup_runs'])})")
+
+        # Worker processes load their own copy of the model
+        start_time = time.perf_counter()
+        if worker_pool.get_pool() is not None:
+            timings["worker_pool_seconds"] = time.perf_counter() - start_time
+            print(f"Started inference worker pool in {timings['worker_pool_seconds']:.3f}s")
+
+        readiness["timings"] = timings
+        readiness["model"] = "ready"
+    except Exception as e:
+        print(f"Error preloading model: {str(e)}")
+        readiness["model"] = "failed"
+        readiness["error"] = str(e)
+
+def sync_annotation_index():
+    """Bring the annotation index up to date with the annotations folder."""
+    try:
+        start_time = time.perf_counter()
+        counts = annotation_index.sync()
+        print(f"Synced annotation index in {time.perf_counter() - start_time:.3f}s "
+              f"({counts['added']} added, {counts['updated']} updated, {counts['removed']} removed)")
+    except Exception as e:
+        print(f"Error syncing annotation index: {str(e)}")
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background indexing and model warmup at startup, flush stores and stop worker processes at shutdown."""
+    loop = asyncio.get_running_loop()
+    # Index annotation files changed while the server was down
+    loop.run_in_executor(None, sync_annotation_index)
+    # Check the image catalog snapshot against the folder, then keep polling it
+    catalog.start_polling()
+    if PRELOAD_MODEL:
+        # Runs beside the event loop so the server answers requests while the ML stack is imported
+        loop.run_in_executor(None, warm_up_model)
+    yield
+    # Fold the status journal into file_statuses.json
+    file_statuses.close()
+    catalog.close()
+    # Only stop worker processes if prediction was ever used
+    if "worker_pool" in sys.modules:
+        sys.modules["worker_pool"].shutdown_pool()
+
+app = FastAPI(title="Image Files API", lifespan=lifespan)
 
 # Enable CORS for all origins
 app.add_middleware(
@@ -41,63 +147,157 @@ os.makedirs(ORIGINAL_IMAGES_FOLDER, exist_ok=True)
 # Make sure the annotations folder exists
 os.makedirs(ANNOTATIONS_FOLDER, exist_ok=True)
 
+# Log of changes to images, annotations, statuses and classes, served by /changes
+changes = change_log.ChangeLog()
+# Longest a /changes request may wait for a change, in seconds
+CHANGES_MAX_WAIT = 60.0
+
+# Dataset statistics over all boxes (created by the first /dataset_stats request, as it imports NumPy)
+dataset_statistics = None
+
+# Called by the annotation index (with its lock held) for every changed annotation file
+def on_annotation_change(stem):
+    changes.record("annotation", [stem])
+    if dataset_statistics is not None:
+        dataset_statistics.mark_changed(stem)
+
+# Index of the annotation files, used for reads (every index change is logged)
+annotation_index = annotation_store.AnnotationStore(ANNOTATIONS_FOLDER, on_change=on_annotation_change)
+# Seconds between scans for annotation files written outside the API, when serving the summary
+SUMMARY_SYNC_INTERVAL = 5.0
+
+# Helper to pick up annotation files written outside the API; the folder scan runs in the executor
+async def sync_annotations(max_age=0.0):
+    await asyncio.get_running_loop().run_in_executor(None, annotation_index.sync, max_age)
+
+# Catalog of the images folder (size, mtime, dimensions, hash, annotation), used instead of listing the folders
+catalog = image_catalog.ImageCatalog(IMAGES_FOLDER, annotated_stems=annotation_index.annotated_stems)
+# Status filter for images without an annotation file
+UNLABELED_FILTER = "UNLABELED"
+
 # Mount static files directory
 app.mount("/static", StaticFiles(directory="static_pages"), name="static")
 
-# Helper function to load classes from JSON file
+# Class list, cached in memory and re-read only when classes.json changes on disk
+class_list = class_store.ClassStore(CLASSES_FILE)
+
+# Helper function to load classes (a copy that may be modified and saved)
 def load_classes():
-    if not os.path.exists(CLASSES_FILE):
-        # Create default classes file if it doesn't exist
-        with open(CLASSES_FILE, 'w') as f:
-            json.dump([{"name": "Class 0", "instructions": ""}], f)
-        return [{"name": "Class 0", "instructions": ""}]
-    
-    with open(CLASSES_FILE, 'r') as f:
-        classes = json.load(f)
-        
-        # Convert simple string classes to objects for backward compatibility
-        for i, c in enumerate(classes):
-            if isinstance(c, str):
-                classes[i] = {"name": c, "instructions": ""}
-        
-        return classes
+    return class_list.load()
 
-# Helper function to save classes to JSON file
+# Helper function to save classes to JSON file (atomically)
 def save_classes(classes):
-    with open(CLASSES_FILE, 'w') as f:
-        json.dump(classes, f)
+    class_list.save(classes)
+    changes.record("classes")
 
-# Helper function to load file statuses
-def load_file_statuses():
-    if not os.path.exists(FILE_STATUS_PATH):
-        return {}
-    
-    try:
-        with open(FILE_STATUS_PATH, 'r') as f:
-            return json.load(f)
-    except:
-        return {}
+# File statuses, kept in memory and journaled to file_statuses.json.journal
+file_statuses = status_store.StatusStore(FILE_STATUS_PATH)
+
+# Helper function to set the same status for several files (also used by background jobs)
+def set_file_statuses(filenames, status):
+    file_statuses.set(filenames, status)
+    changes.record("status", filenames)
+
+# Helper to check an If-None-Match header (a list of tags, weak tags or *) against an ETag
+def etag_matches(request, etag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+# Helper to register a frame the video ingest job saved to the images folder (like an upload)
+def add_ingested_frame(filename):
+    catalog.update([filename])
+    changes.record("image", [filename])
 
-# Helper function to save file statuses
-def save_file_statuses(statuses):
-    with open(FILE_STATUS_PATH, 'w') as f:
-        json.dump(statuses, f)
+# Current bulk pre-annotation job (one at a time)
+preannotation_job = None
+# Current video ingest job (one at a time)
+video_ingest_job = None
 
 @app.get("/")
 async def root():
     """Redirect root to the image labeler interface"""
     return FileResponse("static_pages/index.html")
 
-@app.get("/list_files", response_model=List[str])
-async def list_files():
-    """Return a list of files inside the images folder."""
+@app.get("/ready")
+async def ready():
+    """
+    Report whether the server is alive and the prediction model is warm.
+    
+    Answers 200 once the model is warm (or preloading is disabled) and 503 while
+    it is still loading or failed to load.
+    """
+    warm = readiness["model"] in ("ready", "disabled")
+    return JSONResponse(
+        status_code=200 if warm else 503,
+        content={"alive": True, "model_warm": readiness["model"] == "ready", **readiness},
+    )
+
+@app.get("/list_files")
+async def list_files(cursor: Optional[str] = None, limit: Optional[int] = None, status: Optional[str] = None,
+                     classes: Optional[str] = None, sort: str = "name", desc: bool = False):
+    """
+    Return a list of files inside the images folder.
+    
+    Without parameters, all filenames are returned as a plain list. With any of
+    limit, cursor, status, classes, sort or desc, one page is returned as
+    {"files", "next_cursor", "total"}. status and classes are comma-separated:
+    statuses (DONE, IN_PROGRESS, ATTENTION, UNLABELED for images without an
+    annotation file) match any of them; classes (indexes or names) match images
+    with a box of any of them.
+    """
     try:
-        # Get a list of all files in the images folder
-        files = os.listdir(IMAGES_FOLDER)
-        # Filter out directories, only include files
-        files = [f for f in files if os.path.isfile(os.path.join(IMAGES_FOLDER, f))]
-        print(f"Found {len(files)} files in {IMAGES_FOLDER}")
-        return files
+        # Re-scans the folder only if files were added or removed
+        catalog.refresh()
+        
+        if cursor is None and limit is None and status is None and classes is None and sort == "name" and not desc:
+            return catalog.names()
+        
+        if sort not in file_index.SORT_KEYS:
+            raise HTTPException(status_code=400, detail=f"Invalid sort key: {sort} (use one of {', '.join(file_index.SORT_KEYS)})")
+        if limit is not None and limit < 1:
+            raise HTTPException(status_code=400, detail="limit must be at least 1")
+        
+        if status or classes:
+            # Pick up annotation files written outside the API
+            await sync_annotations(max_age=SUMMARY_SYNC_INTERVAL)
+        
+        filters = []
+        if status:
+            wanted = {s.strip().upper() for s in status.split(",") if s.strip()}
+            invalid = wanted - set(status_store.VALID_STATUSES) - {UNLABELED_FILTER}
+            if invalid:
+                raise HTTPException(status_code=400, detail=f"Invalid status filter: {', '.join(sorted(invalid))}")
+            statuses = file_statuses.get_all()
+            annotated = annotation_index.annotated_stems() if UNLABELED_FILTER in wanted else set()
+            # Files without a status are shown as in progress by the editor
+            filters.append(lambda name: statuses.get(name, "IN_PROGRESS") in wanted or (
+                UNLABELED_FILTER in wanted and os.path.splitext(name)[0] not in annotated))
+        if classes:
+            class_names = [c["name"] for c in load_classes()]
+            class_ids = set()
+            for item in classes.split(","):
+                item = item.strip()
+                if item.isdigit():
+                    class_ids.add(int(item))
+                elif item in class_names:
+                    class_ids.add(class_names.index(item))
+                elif item:
+                    raise HTTPException(status_code=400, detail=f"Unknown class: {item}")
+            stems = annotation_index.stems_with_classes(class_ids)
+            filters.append(lambda name: os.path.splitext(name)[0] in stems)
+        
+        try:
+            return catalog.page(
+                sort=sort, descending=desc, cursor=cursor, limit=limit,
+                predicate=(lambda name: all(f(name) for f in filters)) if filters else None,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         # Log the error details
         print(f"Error listing files: {str(e)}")
@@ -134,11 +334,14 @@ async def get_file(filename: str):
 
 # Class management endpoints
 @app.get("/classes", response_model=List[Dict])
-async def get_classes():
-    """Return all available classes for labeling."""
+async def get_classes(request: Request):
+    """Return all available classes for labeling (304 if the If-None-Match ETag is current)."""
     try:
-        classes = load_classes()
-        return classes
+        data, etag = class_list.serialized()
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=data, media_type="application/json", headers=headers)
     except Exception as e:
         print(f"Error loading classes: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -214,7 +417,14 @@ async def update_class_instructions(class_index: int, data: Dict = Body(...)):
 
 @app.delete("/classes/{class_index}", response_model=List[Dict])
 async def delete_class(class_index: int):
-    """Delete a class by its index."""
+    """
+    Delete a class by its index.
+
+    Saved label files are not rewritten, so they keep the old indexes: after
+    deleting class k, boxes labeled k still belong to the deleted class and
+    boxes labeled k + 1 to the class now at index k. /annotations and
+    /annotation_summary report the indexes stored in the files.
+    """
     try:
         classes = load_classes()
         if class_index < 0 or class_index >= len(classes):
@@ -234,53 +444,81 @@ async def delete_class(class_index: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 # Annotation management endpoints
+@app.get("/annotations")
+async def get_all_annotations(counts: bool = False):
+    """Get annotations of all images in one response (or only per-class box counts with counts=true)."""
+    try:
+        # Pick up annotation files written outside the API (only changed files are read)
+        await sync_annotations()
+        
+        # Map annotation stems back to image filenames with the in-memory catalog (re-scanned in the executor if the folder changed)
+        await asyncio.get_running_loop().run_in_executor(None, catalog.refresh)
+        images = {os.path.splitext(name)[0]: name for name in catalog.names()}
+        
+        if counts:
+            return {"counts": {images[stem]: c for stem, c in annotation_index.class_counts().items() if stem in images}}
+        return {"annotations": {images[stem]: b for stem, b in annotation_index.all_boxes().items() if stem in images}}
+    except Exception as e:
+        print(f"Error loading annotations: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/annotation_summary")
+async def annotation_summary(request: Request):
+    """
+    Get box counts per image and class plus dataset totals, with ETag revalidation.
+
+    Counts are keyed by the class indexes stored in the label files. Deleting a
+    class does not change those files, so it does not change the summary (or
+    its ETag) either; see delete_class.
+    """
+    try:
+        await sync_annotations(max_age=SUMMARY_SYNC_INTERVAL)
+        data, etag = annotation_index.summary()
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=data, media_type="application/json", headers=headers)
+    except Exception as e:
+        print(f"Error building annotation summary: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/dataset_stats")
+async def get_dataset_stats(class_id: Optional[int] = None):
+    """
+    Get class balance, boxes-per-image, box size and aspect ratio histograms and
+    a heatmap of box centers over all annotations (or only boxes of class_id).
+    """
+    global dataset_statistics
+    try:
+        if dataset_statistics is None:
+            await import_modules("dataset_stats")
+            import dataset_stats
+            dataset_statistics = dataset_stats.DatasetStats(annotation_index)
+        await sync_annotations(max_age=SUMMARY_SYNC_INTERVAL)
+        # The first request loads every box; later ones apply changes and are served from the cache
+        result = await asyncio.get_running_loop().run_in_executor(None, dataset_statistics.compute, class_id)
+        class_names = [c["name"] for c in load_classes()]
+        return {**result, "class_names": class_names}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error computing dataset statistics: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/annotations/{image_name}")
 async def get_annotation(image_name: str):
     """Get annotations for a specific image."""
     try:
-        # Create annotation filename (replace image extension with .txt)
-        annotation_file = os.path.splitext(image_name)[0] + ".txt"
-        annotation_path = os.path.join(ANNOTATIONS_FOLDER, annotation_file)
-        
-        # Check if the annotation file exists
-        if not os.path.exists(annotation_path):
+        # Served from the annotation index; the .txt file is only read if it changed
+        boxes = annotation_index.get(os.path.splitext(image_name)[0])
+        if boxes is None:
             return {"boxes": []}
         
-        # Read the annotation file content
-        with open(annotation_path, 'r') as f:
-            lines = f.read().strip().split('\n')
-        
-        # Parse YOLO format annotations to box format
-        boxes = []
-        # Get the image dimensions to convert normalized coordinates
         image_path = os.path.join(IMAGES_FOLDER, image_name)
         if not os.path.exists(image_path):
             raise HTTPException(status_code=404, detail=f"Image {image_name} not found")
         
-        for line in lines:
-            if not line.strip():  # Skip empty lines
-                continue
-                
-            parts = line.split()
-            if len(parts) != 5:  # Standard YOLO format has 5 values
-                continue
-                
-            class_id = int(parts[0])
-            x_center = float(parts[1])
-            y_center = float(parts[2])
-            width = float(parts[3])
-            height = float(parts[4])
-            
-            # Convert normalized coordinates to pixel coordinates
-            # This will be done on the client side since we have the image dimensions there
-            boxes.append({
-                "class": class_id,
-                "x_center": x_center,
-                "y_center": y_center,
-                "width": width,
-                "height": height
-            })
-            
+        # Coordinates stay normalized, the client converts them with the image dimensions
         return {"boxes": boxes}
     except HTTPException:
         raise
@@ -294,31 +532,54 @@ async def save_annotation(image_name: str, data: Dict = Body(...)):
     try:
         boxes = data.get("boxes", [])
         
-        # Create annotation filename (replace image extension with .txt)
-        annotation_file = os.path.splitext(image_name)[0] + ".txt"
-        annotation_path = os.path.join(ANNOTATIONS_FOLDER, annotation_file)
-        
-        # Convert to YOLO format
-        lines = []
-        for box in boxes:
-            class_id = box.get("class", 0)
-            x_center = box.get("x_center", 0)
-            y_center = box.get("y_center", 0)
-            width = box.get("width", 0)
-            height = box.get("height", 0)
-            
-            line = f"{class_id} {x_center} {y_center} {width} {height}"
-            lines.append(line)
-        
-        # Write to file
-        with open(annotation_path, 'w') as f:
-            f.write('\n'.join(lines))
+        # Write the YOLO .txt file and update the annotation index
+        annotation_index.save(os.path.splitext(image_name)[0], boxes)
         
         return {"success": True, "message": f"Annotations saved for {image_name}"}
     except Exception as e:
         print(f"Error saving annotation: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/changes")
+async def get_changes(since: int, timeout: float = 0.0):
+    """
+    Get what changed after sequence number `since`.
+    
+    With timeout > 0 the request waits (up to CHANGES_MAX_WAIT seconds) until
+    something changes. Annotations are keyed by image name without extension,
+    like /annotation_summary; a null annotation or status was removed. When the
+    server no longer has the changes since `since` (restart, or too far behind)
+    the response has reset=true and the client should reload everything.
+    
+    Annotation files written outside the API are only logged when a request
+    syncs the annotation index (this one does, at most every
+    SUMMARY_SYNC_INTERVAL seconds), so they can show up a little late.
+    """
+    try:
+        # Log annotation files written outside the API (e.g. by background jobs)
+        await sync_annotations(max_age=SUMMARY_SYNC_INTERVAL)
+        if timeout > 0 and await changes.wait(since, min(timeout, CHANGES_MAX_WAIT)):
+            await sync_annotations(max_age=SUMMARY_SYNC_INTERVAL)
+        
+        seq = changes.seq
+        changed = changes.changes_since(since)
+        if changed is None:
+            return {"seq": seq, "reset": True}
+        
+        response = {
+            "seq": seq,
+            "reset": False,
+            "images": sorted(changed["image"]),
+            "annotations": {stem: annotation_index.get(stem) for stem in changed["annotation"]},
+            "statuses": {filename: file_statuses.get(filename) for filename in changed["status"]},
+        }
+        if changed["classes"]:
+            response["classes"] = load_classes()
+        return response
+    except Exception as e:
+        print(f"Error getting changes: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/export_dataset")
 async def export_dataset():
     """Export all images and annotations as a YOLO dataset zip file."""
@@ -334,22 +595,22 @@ async def export_dataset():
         os.makedirs(images_dir, exist_ok=True)
         os.makedirs(labels_dir, exist_ok=True)
         
-        # Get list of images
-        images = [f for f in os.listdir(IMAGES_FOLDER) 
-                  if os.path.isfile(os.path.join(IMAGES_FOLDER, f)) and 
-                  f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp', '.gif'))]
+        # Get list of images (and whether they are annotated) from the catalog; dimensions and hashes aren't needed
+        catalog.refresh()
+        await sync_annotations(max_age=SUMMARY_SYNC_INTERVAL)
+        images = catalog.entries(extensions=('.jpg', '.jpeg', '.png', '.bmp', '.gif'), describe=False)
         
         # Copy images and their annotations to the temp directory
         for image in images:
             # Copy image
-            src_image = os.path.join(IMAGES_FOLDER, image)
-            dst_image = os.path.join(images_dir, image)
+            src_image = os.path.join(IMAGES_FOLDER, image["name"])
+            dst_image = os.path.join(images_dir, image["name"])
             shutil.copy2(src_image, dst_image)
             
             # Copy annotation if it exists
-            annotation_file = os.path.splitext(image)[0] + ".txt"
-            src_annotation = os.path.join(ANNOTATIONS_FOLDER, annotation_file)
-            if os.path.exists(src_annotation):
+            if image["has_annotation"]:
+                annotation_file = os.path.splitext(image["name"])[0] + ".txt"
+                src_annotation = os.path.join(ANNOTATIONS_FOLDER, annotation_file)
                 dst_annotation = os.path.join(labels_dir, annotation_file)
                 shutil.copy2(src_annotation, dst_annotation)
         
@@ -407,15 +668,9 @@ async def system_info():
         # Get the absolute path
         abs_images_folder = os.path.abspath(IMAGES_FOLDER)
         
-        # List files in the images folder if it exists
-        image_files = []
-        if images_folder_exists:
-            try:
-                all_files = os.listdir(IMAGES_FOLDER)
-                image_files = [f for f in all_files if os.path.isfile(os.path.join(IMAGES_FOLDER, f)) and 
-                               f.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp'))]
-            except Exception as e:
-                image_files = [f"Error listing files: {str(e)}"]
+        # List image files from the catalog
+        catalog.refresh()
+        image_files = [f for f in catalog.names() if f.lower().endswith(image_catalog.IMAGE_EXTENSIONS)]
         
         # Get current working directory
         cwd = os.getcwd()
@@ -425,10 +680,11 @@ async def system_info():
             "images_folder": IMAGES_FOLDER,
             "abs_images_folder": abs_images_folder,
             "images_folder_exists": images_folder_exists,
-            "image_count": len(image_files) if isinstance(image_files, list) else -1,
+            "image_count": len(image_files),
             "image_files": image_files[:20],  # Limit to first 20 to avoid too much data
             "annotations_folder": ANNOTATIONS_FOLDER,
-            "annotations_folder_exists": os.path.exists(ANNOTATIONS_FOLDER)
+            "annotations_folder_exists": os.path.exists(ANNOTATIONS_FOLDER),
+            "catalog": catalog.get_stats()
         }
     except Exception as e:
         print(f"Error getting system info: {str(e)}")
@@ -477,26 +733,8 @@ async def upload_files(files: List[UploadFile] = File(...)):
             # Open the image and resize it to 1280x720
             try:
                 with Image.open(original_file_path) as img:
-                    # Calculate cropping box to center the image
-                    width, height = img.size
-                    target_width, target_height = 1280, 720
-
-                    if width / height > target_width / target_height:
-                        # Image is too wide, trim the sides
-                        new_width = int(height * target_width / target_height)
-                        left = (width - new_width) // 2
-                        right = left + new_width
-                        top, bottom = 0, height
-                    else:
-                        # Image is too tall, trim the top and bottom
-                        new_height = int(width * target_height / target_width)
-                        top = (height - new_height) // 2
-                        bottom = top + new_height
-                        left, right = 0, width
-
-                    img = img.crop((left, top, right, bottom))
-                    # Replace deprecated ANTIALIAS with LANCZOS (the modern equivalent)
-                    img = img.resize((target_width, target_height), Image.LANCZOS)
+                    # Center-crop to the labeling aspect ratio and resize
+                    img = image_utils.crop_and_resize(img)
 
                     # Save the resized image to the images folder
                     resized_file_path = os.path.join(IMAGES_FOLDER, filename)
@@ -512,6 +750,9 @@ async def upload_files(files: List[UploadFile] = File(...)):
                 skipped_files.append(f"{filename} (error during processing: {str(e)})")
                 skipped_count += 1
 
+        catalog.update(uploaded_files)
+        changes.record("image", uploaded_files)
+
         return {
             "message": "Files uploaded successfully",
             "uploaded_count": uploaded_count,
@@ -527,8 +768,7 @@ async def upload_files(files: List[UploadFile] = File(...)):
 async def get_file_statuses():
     """Get statuses for all files"""
     try:
-        statuses = load_file_statuses()
-        return statuses
+        return file_statuses.get_all()
     except Exception as e:
         print(f"Error loading file statuses: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -540,17 +780,11 @@ async def update_file_status(filename: str, data: Dict = Body(...)):
         status = data.get("status", "IN_PROGRESS")
         
         # Validate status
-        if status not in ["DONE", "IN_PROGRESS", "ATTENTION"]:
+        if status not in status_store.VALID_STATUSES:
             raise HTTPException(status_code=400, detail="Invalid status value")
             
-        # Load existing statuses
-        statuses = load_file_statuses()
-        
-        # Update the status for this file
-        statuses[filename] = status
-        
-        # Save back to file
-        save_file_statuses(statuses)
+        # Update in memory and append to the journal
+        set_file_statuses([filename], status)
         
         return {"message": f"Status updated for {filename}", "status": status}
     except HTTPException:
@@ -559,9 +793,56 @@ async def update_file_status(filename: str, data: Dict = Body(...)):
         print(f"Error updating file status: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.put("/file_statuses")
+async def update_file_statuses(data: Dict = Body(...)):
+    """Update statuses of several files at once."""
+    try:
+        # Either {"statuses": {filename: status}} or {"filenames": [...], "status": status}
+        if "statuses" in data:
+            updates = data["statuses"]
+        else:
+            updates = {filename: data.get("status", "IN_PROGRESS") for filename in data.get("filenames", [])}
+        if not isinstance(updates, dict) or not updates:
+            raise HTTPException(status_code=400, detail="No status updates given")
+        
+        invalid = sorted({str(s) for s in updates.values() if s not in status_store.VALID_STATUSES})
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Invalid status value: {', '.join(invalid)}")
+        
+        file_statuses.set_many(updates)
+        changes.record("status", updates)
+        return {"message": f"Status updated for {len(updates)} files", "updated": len(updates)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error updating file statuses: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Helper to turn a full inference queue into a 503 with Retry-After
+def queue_full_response(error):
+    return HTTPException(
+        status_code=503,
+        detail="Inference queue is full, please retry later",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+# Blocking part of /predict that runs before inference: cache key and lookup
+def lookup_cached_prediction(image_path, backend):
+    import yolo_predict
+    cache_key = yolo_predict.prediction_cache_key(image_path, yolo_predict.RAW_CONFIDENCE_FLOOR, backend=backend)
+    return cache_key, yolo_predict.prediction_cache.get(cache_key)
+
 @app.get("/predict/{filename}")
-async def predict_image(filename: str, visualize: bool = True):
+async def predict_image(filename: str, visualize: bool = True, columnar: bool = False,
+                        backend: Optional[str] = None, tiled: bool = False,
+                        conf: Optional[float] = None, class_conf: Optional[str] = None):
     """Perform YOLO prediction on a specific image in the images folder."""
+    require_ml()
+    await import_modules("yolo_predict", "predict_scheduler", "worker_pool")
+    import yolo_predict
+    import predict_scheduler
+    import worker_pool
+    
     try:
         # Construct full path to the image
         image_path = os.path.join(IMAGES_FOLDER, filename)
@@ -569,31 +850,126 @@ async def predict_image(filename: str, visualize: bool = True):
         if not os.path.isfile(image_path):
             raise HTTPException(status_code=404, detail=f"Image file {filename} not found")
         
-        # Call the predict function from yolo_predict module
+        # Validate the requested inference backend (None uses the server default)
+        if backend is not None and backend not in yolo_predict.BACKENDS:
+            raise HTTPException(status_code=400, detail=f"Invalid backend: {backend}")
+        
+        # Thresholds are applied to stored raw predictions, so changing them needs no new inference
+        if conf is None:
+            conf = yolo_predict.CONFIDENCE_THRESHOLD
+        try:
+            class_thresholds = yolo_predict.parse_class_conf(class_conf) if class_conf else None
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid class_conf: {class_conf}")
+        
+        executor = predict_scheduler.executor
         try:
-            if visualize:
-                # Generate visualization and return both prediction results and visualization
-                vis_path = yolo_predict.predict_and_visualize(image_path, return_mode='path')
-                results = yolo_predict.predict(image_path)
-                formatted_results = yolo_predict.format_results(results)
+            # All blocking work runs on the inference executor; reject early when it is saturated
+            with executor.admit():
+                cached_result = None
+                cache_key = None
+                results = None
+                image = None  # Image decoded for inference, reused for the visualization
                 
-                # Return results with visualization path
-                return {
-                    "success": True,
-                    "filename": filename,
-                    "predictions": formatted_results,
-                    "visualization": os.path.basename(vis_path) if vis_path else None
-                }
-            else:
-                # Just return prediction results without visualization
-                results = yolo_predict.predict(image_path)
-                formatted_results = yolo_predict.format_results(results)
+                if tiled:
+                    # Sliced inference on the full-resolution original, mapped back to the resized image
+                    original_path = os.path.join(ORIGINAL_IMAGES_FOLDER, filename)
+                    raw_results = await executor.run(
+                        lambda: yolo_predict.predict_tiled(image_path, original_path, conf=yolo_predict.RAW_CONFIDENCE_FLOOR,
+                                                           columnar=True, backend=backend)
+                    )
+                else:
+                    # Fast path on the event loop: key from memoized hashes, in-memory lookup without copying
+                    cache_key = yolo_predict.prediction_cache_key(
+                        image_path, yolo_predict.RAW_CONFIDENCE_FLOOR, backend=backend, memo_only=True
+                    )
+                    cached_result = yolo_predict.prediction_cache.peek(cache_key) if cache_key else None
+                    if cached_result is None:
+                        # Reuse a cached prediction from disk if neither the image nor the model changed
+                        cache_key, cached_result = await executor.run(lookup_cached_prediction, image_path, backend)
+                    
+                    if cached_result is not None:
+                        raw_results = [cached_result]
+                    else:
+                        pool = worker_pool.get_pool()
+                        if pool is not None:
+                            # Hand the decoded image to a worker process through shared memory
+                            image = await executor.run(worker_pool.read_image, image_path)
+                            future = await executor.run(
+                                pool.submit_image, image, image_path, yolo_predict.RAW_CONFIDENCE_FLOOR, None, backend
+                            )
+                            raw_results = [await asyncio.wrap_future(future)]
+                        else:
+                            # Queue the image with the micro-batching scheduler so concurrent requests share a forward pass
+                            results = await predict_scheduler.scheduler.submit(
+                                image_path, yolo_predict.RAW_CONFIDENCE_FLOOR, backend=backend
+                            )
+                            raw_results = yolo_predict.format_results(results, columnar=True)
+                        if raw_results:
+                            await executor.run(yolo_predict.prediction_cache.put, cache_key, raw_results[0])
+
+                # A raw result cut off at its box limit can miss boxes passing a low per-class threshold; predict at it then
+                if not all(yolo_predict.filter_is_exact(r, conf, class_thresholds) for r in raw_results):
+                    lowest_conf = min([conf, *(class_thresholds or {}).values()])
+                    if tiled:
+                        raw_results = await executor.run(
+                            lambda: yolo_predict.predict_tiled(image_path, original_path, conf=lowest_conf,
+                                                               columnar=True, backend=backend)
+                        )
+                    else:
+                        results = await executor.run(
+                            lambda: yolo_predict.predict(image_path, conf=lowest_conf, backend=backend)
+                        )
+                        raw_results = yolo_predict.format_results(results, columnar=True)
+
+                # Apply the requested thresholds; columnar boxes are returned as parallel arrays, otherwise one dict per box
+                formatted_results = []
+                for raw_result in raw_results:
+                    formatted_result = yolo_predict.filter_predictions(raw_result, conf, class_thresholds, columnar)
+                    formatted_result["image_path"] = image_path
+                    formatted_results.append(formatted_result)
                 
-                return {
-                    "success": True,
-                    "filename": filename,
-                    "predictions": formatted_results
-                }
+                if visualize:
+                    # Render the thresholded boxes into the in-memory cache, on the image already decoded for inference.
+                    # Cache hits ran no inference, so the image is read from disk; the rendering is keyed by the
+                    # prediction and thresholds so repeating the request serves the cached one without rendering
+                    vis_name = None
+                    try:
+                        if formatted_results:
+                            if results:
+                                image = getattr(results[0], "orig_img", None)
+                            render_key = f"{cache_key}|{conf}|{class_conf or ''}" if cache_key else None
+                            vis_filename = yolo_predict.visualization_filename(image_path)
+                            if render_key and yolo_predict.visualization_cache.rendered_from(vis_filename, render_key):
+                                vis_name = vis_filename
+                            else:
+                                vis_name = await executor.run(
+                                    lambda: yolo_predict.render_boxes_visualization(
+                                        formatted_results[0], image_path, return_mode='cache', image=image,
+                                        cache_source=render_key
+                                    )
+                                )
+                    except Exception as e:
+                        print(f"Error creating visualization: {str(e)}")
+                    
+                    # Return results with visualization path
+                    return {
+                        "success": True,
+                        "filename": filename,
+                        "predictions": formatted_results,
+                        "cached": cached_result is not None,
+                        "visualization": vis_name
+                    }
+                else:
+                    # Just return prediction results without visualization
+                    return {
+                        "success": True,
+                        "filename": filename,
+                        "predictions": formatted_results,
+                        "cached": cached_result is not None
+                    }
+        except predict_scheduler.QueueFullError as e:
+            raise queue_full_response(e)
         except Exception as e:
             print(f"Prediction error: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Error during prediction: {str(e)}")
@@ -604,9 +980,255 @@ async def predict_image(filename: str, visualize: bool = True):
         print(f"Error processing prediction request: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/predict_batch")
+async def predict_batch(data: Dict = Body(...)):
+    """Perform YOLO prediction on a list of images from the images folder in batches."""
+    require_ml()
+    await import_modules("yolo_predict", "predict_scheduler")
+    import yolo_predict
+    import predict_scheduler
+    
+    try:
+        filenames = data.get("filenames", [])
+        if not isinstance(filenames, list) or not filenames:
+            raise HTTPException(status_code=400, detail="filenames must be a non-empty list")
+        
+        conf = float(data.get("conf", yolo_predict.CONFIDENCE_THRESHOLD))
+        batch_size = int(data.get("batch_size", yolo_predict.DEFAULT_BATCH_SIZE))
+        columnar = bool(data.get("columnar", False))
+        backend = data.get("backend")
+        if backend is not None and backend not in yolo_predict.BACKENDS:
+            raise HTTPException(status_code=400, detail=f"Invalid backend: {backend}")
+        
+        # Split requested files into existing and missing
+        image_paths = {}
+        missing = []
+        for filename in filenames:
+            image_path = os.path.join(IMAGES_FOLDER, filename)
+            if os.path.isfile(image_path):
+                image_paths[image_path] = filename
+            else:
+                missing.append(filename)
+        
+        # Run the whole batched prediction on the inference executor
+        executor = predict_scheduler.executor
+        with executor.admit():
+            batch_results = await executor.run(lambda: list(yolo_predict.predict_batch(
+                list(image_paths), batch_size=batch_size, conf=conf, columnar=columnar, backend=backend
+            )))
+        
+        predictions = {}
+        errors = {}
+        for result in batch_results:
+            filename = image_paths[result["image_path"]]
+            if "error" in result:
+                errors[filename] = result["error"]
+            else:
+                predictions[filename] = result
+        
+        return {
+            "success": True,
+            "predictions": predictions,
+            "errors": errors,
+            "missing": missing
+        }
+    except HTTPException:
+        raise
+    except predict_scheduler.QueueFullError as e:
+        raise queue_full_response(e)
+    except Exception as e:
+        print(f"Error processing batch prediction request: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/model_stats")
+async def model_stats():
+    """Return model cache counters (loads, load time, cache hits) and prediction cache counters."""
+    # Don't import the ML stack just to report that nothing is loaded
+    if "yolo_predict" not in imported_modules:
+        return {"loaded": False}
+    import yolo_predict
+    
+    try:
+        stats = yolo_predict.get_model_stats()
+        stats["prediction_cache"] = yolo_predict.prediction_cache.get_stats()
+        stats["visualization_cache"] = yolo_predict.visualization_cache.get_stats()
+        return stats
+    except Exception as e:
+        print(f"Error getting model stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/preannotate")
+async def start_preannotation(data: Dict = Body(default={})):
+    """Start a background job that pre-annotates every image without annotations."""
+    global preannotation_job
+    require_ml()
+    await import_modules("yolo_predict", "preannotate")
+    import yolo_predict
+    import preannotate
+    
+    try:
+        if preannotation_job is not None and preannotation_job.running:
+            raise HTTPException(status_code=409, detail="A pre-annotation job is already running")
+        
+        preannotation_job = preannotate.PreannotationJob(
+            images_folder=IMAGES_FOLDER,
+            annotations_folder=ANNOTATIONS_FOLDER,
+            class_names=[c["name"] for c in load_classes()],
+            update_statuses=set_file_statuses,
+            save_annotation=annotation_index.save,
+            batch_size=int(data.get("batch_size", yolo_predict.DEFAULT_BATCH_SIZE)),
+            conf=float(data.get("conf", yolo_predict.CONFIDENCE_THRESHOLD)),
+        )
+        preannotation_job.start()
+        return {"success": True, "progress": preannotation_job.progress()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error starting pre-annotation: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/preannotate/cancel")
+async def cancel_preannotation():
+    """Stop the running pre-annotation job after its current batch."""
+    if preannotation_job is None or not preannotation_job.running:
+        raise HTTPException(status_code=404, detail="No pre-annotation job is running")
+    preannotation_job.cancel()
+    return {"success": True, "message": "Pre-annotation will stop after the current batch"}
+
+@app.get("/preannotate/progress")
+async def preannotation_progress(stream: bool = True):
+    """Report pre-annotation progress, streamed as NDJSON until the job finishes."""
+    if preannotation_job is None:
+        raise HTTPException(status_code=404, detail="No pre-annotation job has been started")
+    
+    if not stream:
+        return preannotation_job.progress()
+    
+    async def progress_lines():
+        while True:
+            progress = preannotation_job.progress()
+            yield json.dumps(progress) + "\n"
+            if progress["state"] != "running":
+                break
+            await asyncio.sleep(0.5)
+    
+    return StreamingResponse(progress_lines(), media_type="application/x-ndjson")
+
+@app.post("/ingest_video")
+async def ingest_video(file: UploadFile = File(...), stride: int = 30, scene_threshold: float = 0.0,
+                       max_frames: Optional[int] = None, track: bool = False, conf: Optional[float] = None):
+    """Upload a video and extract sampled frames into the images folder in a background job."""
+    global video_ingest_job
+    if track:
+        require_ml()
+        await import_modules("yolo_predict")
+        import yolo_predict
+        # Pre-label with the same default threshold as the prediction endpoints
+        if conf is None:
+            conf = yolo_predict.CONFIDENCE_THRESHOLD
+    await import_modules("video_ingest")
+    import video_ingest
+    
+    try:
+        if video_ingest_job is not None and video_ingest_job.running:
+            raise HTTPException(status_code=409, detail="A video ingest job is already running")
+        
+        filename = os.path.basename(file.filename or "")
+        if not filename.lower().endswith(video_ingest.VIDEO_EXTENSIONS):
+            raise HTTPException(status_code=400, detail=f"{filename} is not a supported video file")
+        
+        # Stream the upload to disk instead of reading the whole video into memory
+        os.makedirs(video_ingest.VIDEOS_FOLDER, exist_ok=True)
+        video_path = os.path.join(video_ingest.VIDEOS_FOLDER, filename)
+        with open(video_path, 'wb') as f:
+            await asyncio.get_running_loop().run_in_executor(None, shutil.copyfileobj, file.file, f)
+        
+        video_ingest_job = video_ingest.VideoIngestJob(
+            video_path,
+            stride=stride,
+            scene_threshold=scene_threshold,
+            max_frames=max_frames,
+            track=track,
+            conf=conf,
+            images_folder=IMAGES_FOLDER,
+            original_images_folder=ORIGINAL_IMAGES_FOLDER,
+            annotations_folder=ANNOTATIONS_FOLDER,
+            class_names=[c["name"] for c in load_classes()],
+            update_statuses=set_file_statuses,
+            on_frame=add_ingested_frame,
+            save_annotation=annotation_index.save,
+        )
+        video_ingest_job.start()
+        return {"success": True, "progress": video_ingest_job.progress()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error starting video ingest: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/ingest_video/cancel")
+async def cancel_video_ingest():
+    """Stop the running video ingest job; frames already extracted are kept."""
+    if video_ingest_job is None or not video_ingest_job.running:
+        raise HTTPException(status_code=404, detail="No video ingest job is running")
+    video_ingest_job.cancel()
+    return {"success": True, "message": "Video ingest is stopping"}
+
+@app.get("/ingest_video/progress")
+async def video_ingest_progress(stream: bool = True):
+    """Report video ingest progress, streamed as NDJSON until the job finishes."""
+    if video_ingest_job is None:
+        raise HTTPException(status_code=404, detail="No video ingest job has been started")
+    
+    if not stream:
+        return video_ingest_job.progress()
+    
+    async def progress_lines():
+        while True:
+            progress = video_ingest_job.progress()
+            yield json.dumps(progress) + "\n"
+            if progress["state"] != "running":
+                break
+            await asyncio.sleep(0.5)
+    
+    return StreamingResponse(progress_lines(), media_type="application/x-ndjson")
+
+@app.get("/scheduler_stats")
+async def scheduler_stats():
+    """Return micro-batching and inference executor settings, queue depth and histograms."""
+    if "predict_scheduler" not in imported_modules:
+        return {"loaded": False}
+    await import_modules("worker_pool")
+    import predict_scheduler
+    import worker_pool
+    
+    try:
+        stats = predict_scheduler.scheduler.get_stats()
+        stats["executor"] = predict_scheduler.executor.get_stats()
+        pool = worker_pool.get_pool()
+        stats["worker_pool"] = pool.get_stats() if pool is not None else None
+        return stats
+    except Exception as e:
+        print(f"Error getting scheduler stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/visualizations/{filename}")
-async def get_visualization(filename: str):
+async def get_visualization(filename: str, request: Request):
     """Serve visualization images with bounding boxes."""
+    require_ml()
+    await import_modules("yolo_predict")
+    import yolo_predict
+    
+    # Rendered visualizations are served from memory, with ETag revalidation
+    cached = yolo_predict.visualization_cache.get(filename)
+    if cached is not None:
+        data, etag = cached
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=data, media_type="image/jpeg", headers=headers)
+    
+    # Fall back to visualizations saved on disk
     vis_path = os.path.join(yolo_predict.VISUALIZATIONS_DIR, filename)
     
     if not os.path.isfile(vis_path):
@@ -639,10 +1261,10 @@ async def setup_training():
         os.makedirs(labels_train_dir, exist_ok=True)
         
         # 3. Copy images and annotations
-        # Get list of images
-        images = [f for f in os.listdir(IMAGES_FOLDER) 
-                  if os.path.isfile(os.path.join(IMAGES_FOLDER, f)) and 
-                  f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp', '.gif'))]
+        # Get list of images (and whether they are annotated) from the catalog; dimensions and hashes aren't needed
+        catalog.refresh()
+        await sync_annotations(max_age=SUMMARY_SYNC_INTERVAL)
+        images = catalog.entries(extensions=('.jpg', '.jpeg', '.png', '.bmp', '.gif'), describe=False)
         
         # Copy each image and its annotation if it exists
         copied_images = 0
@@ -650,15 +1272,15 @@ async def setup_training():
         
         for image in images:
             # Copy image
-            src_image = os.path.join(IMAGES_FOLDER, image)
-            dst_image = os.path.join(images_train_dir, image)
+            src_image = os.path.join(IMAGES_FOLDER, image["name"])
+            dst_image = os.path.join(images_train_dir, image["name"])
             shutil.copy2(src_image, dst_image)
             copied_images += 1
             
             # Copy annotation if it exists
-            annotation_file = os.path.splitext(image)[0] + ".txt"
-            src_annotation = os.path.join(ANNOTATIONS_FOLDER, annotation_file)
-            if os.path.exists(src_annotation):
+            if image["has_annotation"]:
+                annotation_file = os.path.splitext(image["name"])[0] + ".txt"
+                src_annotation = os.path.join(ANNOTATIONS_FOLDER, annotation_file)
                 dst_annotation = os.path.join(labels_train_dir, annotation_file)
                 shutil.copy2(src_annotation, dst_annotation)
                 copied_labels += 1
@@ -706,26 +1328,21 @@ async def backup_data():
                 zip_file.write(CLASSES_FILE, os.path.basename(CLASSES_FILE))
             
             # Add file_statuses.json if it exists
+            # Fold the status journal into the snapshot so the backup is complete
+            file_statuses.compact()
             if os.path.exists(FILE_STATUS_PATH):
                 zip_file.write(FILE_STATUS_PATH, os.path.basename(FILE_STATUS_PATH))
             
-            # Add all files from the images folder
-            if os.path.exists(IMAGES_FOLDER):
-                for root, _, files in os.walk(IMAGES_FOLDER):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        # Calculate the arcname (path within the zip file)
-                        arcname = os.path.join("images", os.path.relpath(file_path, IMAGES_FOLDER))
-                        zip_file.write(file_path, arcname)
+            # Add all files from the images folder (listed by the catalog)
+            catalog.refresh()
+            for file in catalog.names():
+                zip_file.write(os.path.join(IMAGES_FOLDER, file), os.path.join("images", file))
             
-            # Add all files from the annotations folder
-            if os.path.exists(ANNOTATIONS_FOLDER):
-                for root, _, files in os.walk(ANNOTATIONS_FOLDER):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        # Calculate the arcname (path within the zip file)
-                        arcname = os.path.join("annotations", os.path.relpath(file_path, ANNOTATIONS_FOLDER))
-                        zip_file.write(file_path, arcname)
+            # Add all annotation files (listed by the annotation index)
+            await sync_annotations()
+            for stem in sorted(annotation_index.annotated_stems()):
+                file = stem + ".txt"
+                zip_file.write(os.path.join(ANNOTATIONS_FOLDER, file), os.path.join("annotations", file))
         
         # Reset the buffer position
         zip_buffer.seek(0)
@@ -0,0 +1,112 @@
+"""
+Change log for YoloLabel application.
+Every change to images, annotations, file statuses or classes gets a global
+sequence number, so clients can ask for what changed since the last number
+they saw (optionally waiting for the next change) instead of reloading
+everything.
+"""
+
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import List, Dict, Any, Optional, Iterable, Set
+
+# Settings (can be overridden with environment variables)
+CHANGE_LOG_SIZE = int(os.environ.get("YOLOLABEL_CHANGE_LOG_SIZE", "100000"))  # Changes kept for delta sync
+CHANGE_KINDS = ("image", "annotation", "status", "classes")
+
+class ChangeLog:
+    """
+    Bounded, in-memory log of changes with a global sequence number.
+
+    Sequence numbers start at the server start time in milliseconds, so they
+    keep increasing across restarts and a client holding a number from an
+    earlier run is told to reload (as is a client whose number is older than
+    the oldest change still kept). record() can be called from any thread and
+    wakes long-polling requests on their event loops.
+    """
+
+    def __init__(self, max_entries: int = CHANGE_LOG_SIZE):
+        self.max_entries = max(1, max_entries)
+        self.seq = int(time.time() * 1000)
+        self._start_seq = self.seq  # Changes up to here are not in the log
+        self._entries: deque = deque()  # (seq, kind, key), in sequence order
+        self._lock = threading.Lock()
+        self._waiters: List[tuple] = []  # (loop, future) of waiting requests
+
+    def record(self, kind: str, keys: Iterable[Any] = (None,)) -> int:
+        """
+        Record changes.
+
+        Args:
+            kind: One of CHANGE_KINDS
+            keys: Changed items (e.g. filenames); None for changes without a key
+
+        Returns:
+            Sequence number of the last recorded change
+        """
+        with self._lock:
+            for key in keys:
+                self.seq += 1
+                self._entries.append((self.seq, kind, key))
+            while len(self._entries) > self.max_entries:
+                self._start_seq = self._entries.popleft()[0]
+            seq = self.seq
+            waiters, self._waiters = self._waiters, []
+
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+        return seq
+
+    def changes_since(self, since: int) -> Optional[Dict[str, Set[Any]]]:
+        """
+        Collect the keys changed after a sequence number.
+
+        Args:
+            since: Last sequence number the client has seen
+
+        Returns:
+            Dict mapping each kind to the set of changed keys, or None if the
+            client is too far behind (or from another server run) and must reload
+        """
+        with self._lock:
+            if since < self._start_seq or since > self.seq:
+                return None
+            changed: Dict[str, Set[Any]] = {kind: set() for kind in CHANGE_KINDS}
+            for seq, kind, key in reversed(self._entries):
+                if seq <= since:
+                    break
+                changed[kind].add(key)
+            return changed
+
+    async def wait(self, since: int, timeout: float) -> bool:
+        """
+        Wait until a change after `since` is recorded.
+
+        Args:
+            since: Last sequence number the client has seen
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if there are changes after `since`, False on timeout
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self.seq > since:
+                return True
+            self._waiters.append((loop, future))
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            with self._lock:
+                if (loop, future) in self._waiters:
+                    self._waiters.remove((loop, future))
+            return self.seq > since
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
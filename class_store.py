@@ -0,0 +1,104 @@
+"""
+Class list store for YoloLabel application.
+The class list from classes.json is held in memory with a version number that
+increases on every change, so readers don't re-parse the file and clients can
+revalidate with an ETag. Edits made to classes.json outside the API are picked
+up through an mtime and size check.
+"""
+
+import os
+import json
+import uuid
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+from status_store import write_json_atomic
+
+# Constants
+CLASSES_FILE = os.path.join(os.getcwd(), "classes.json")
+DEFAULT_CLASSES = [{"name": "Class 0", "instructions": ""}]
+
+def normalize_classes(classes: List[Any]) -> List[Dict[str, Any]]:
+    """Convert simple string classes to objects for backward compatibility."""
+    return [{"name": c, "instructions": ""} if isinstance(c, str) else c for c in classes]
+
+class ClassStore:
+    """
+    In-memory copy of classes.json with a version number.
+
+    load() returns a copy of the cached list after a stat() of the file; the
+    file is only parsed again when its mtime or size changed. save() writes the
+    file atomically (temp file + rename) and bumps the version.
+    """
+
+    def __init__(self, classes_file: str = CLASSES_FILE):
+        self.classes_file = classes_file
+        self.version = 0
+        self._classes: Optional[List[Dict[str, Any]]] = None
+        self._signature: Optional[Tuple[int, int]] = None  # (mtime_ns, size) of the file we last read or wrote
+        self._json: Optional[Tuple[int, bytes]] = None  # Serialized class list and its version
+        self._instance_id = uuid.uuid4().hex[:8]  # Keeps ETags from different server runs apart
+        self._lock = threading.Lock()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.classes_file)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _refresh(self):
+        # Called with self._lock held
+        signature = self._stat()
+        if signature is None:
+            # Create default classes file if it doesn't exist
+            self._write(DEFAULT_CLASSES)
+            return
+        if self._classes is not None and signature == self._signature:
+            return
+        with open(self.classes_file, 'r') as f:
+            self._classes = normalize_classes(json.load(f))
+        self._signature = signature
+        self.version += 1
+
+    def _write(self, classes: List[Dict[str, Any]]):
+        # Called with self._lock held
+        classes = [dict(c) for c in classes]
+        write_json_atomic(self.classes_file, classes)
+        self._classes = classes
+        self._signature = self._stat()
+        self.version += 1
+
+    def load(self) -> List[Dict[str, Any]]:
+        """
+        Get the class list.
+
+        Returns:
+            Copy of the class list (callers may modify it and pass it to save())
+        """
+        with self._lock:
+            self._refresh()
+            return [dict(c) for c in self._classes]
+
+    def save(self, classes: List[Dict[str, Any]]):
+        """
+        Replace the class list and write classes.json atomically.
+
+        Args:
+            classes: New class list
+        """
+        with self._lock:
+            self._write(normalize_classes(classes))
+
+    def serialized(self) -> Tuple[bytes, str]:
+        """
+        Get the class list as JSON, with an ETag.
+
+        Returns:
+            Tuple of (JSON bytes, ETag); the JSON is built once per version
+        """
+        with self._lock:
+            self._refresh()
+            if self._json is None or self._json[0] != self.version:
+                self._json = (self.version, json.dumps(self._classes).encode())
+            return self._json[1], f'"{self._instance_id}-{self.version}"'
@@ -0,0 +1,242 @@
+"""
+Dataset statistics for YoloLabel application.
+All boxes from the annotation index are held in NumPy arrays, an integer one
+with (image id, class) and a float one with (x_center, y_center, width,
+height) per box, and class balance,
+boxes-per-image, box size and aspect ratio histograms and position heatmaps
+are computed over it in bulk. Saved annotations are applied incrementally.
+"""
+
+import os
+import time
+import threading
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+import numpy as np
+
+import image_utils
+
+# Settings (can be overridden with environment variables)
+HISTOGRAM_BINS = int(os.environ.get("YOLOLABEL_STATS_HISTOGRAM_BINS", "20"))  # Bins of the size histograms
+HEATMAP_BINS = int(os.environ.get("YOLOLABEL_STATS_HEATMAP_BINS", "32"))  # Heatmap columns (rows follow the image aspect ratio)
+MAX_BOXES_PER_IMAGE_BIN = 50  # Images with more boxes are counted in the last bin
+ASPECT_RANGE = (-4.0, 4.0)  # log2(width / height) range of the aspect ratio histogram
+MAX_PRESENCE_CELLS = 64_000_000  # Largest images x classes table for counting images per class without sorting
+
+def bin_indexes(values: np.ndarray, low: float, high: float, bins: int) -> np.ndarray:
+    """Map values to equal-width bin indexes; values outside [low, high] go to the outer bins."""
+    indexes = ((values - low) * (bins / (high - low))).astype(np.int64)
+    return np.clip(indexes, 0, bins - 1)
+
+# Column indexes of the id array and of the coordinate array
+IMAGE, CLASS = range(2)
+X_CENTER, Y_CENTER, WIDTH, HEIGHT = range(4)
+
+def split_rows(rows: List[tuple]) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Turn (image id, class, x_center, y_center, width, height) rows into arrays.
+
+    Boxes with a negative class id (e.g. from a hand-edited .txt file) are
+    dropped, as no class balance can count them.
+
+    Returns:
+        Tuple of (int32 ids of shape (N, 2), float32 coordinates of shape
+        (N, 4), number of dropped boxes)
+    """
+    ids = np.array([row[:2] for row in rows], dtype=np.int64).reshape(-1, 2)
+    coords = np.array([row[2:] for row in rows], dtype=np.float32).reshape(-1, 4)
+    valid = ids[:, CLASS] >= 0
+    return ids[valid].astype(np.int32), coords[valid], int(len(rows) - np.count_nonzero(valid))
+
+class DatasetStats:
+    """
+    Box statistics over the whole annotation index.
+
+    The box array is loaded from the index on first use. Afterwards, changed
+    images reported with mark_changed() are applied on the next compute(): their
+    rows are dropped with one vectorized mask and their current boxes appended.
+    Results are cached per class filter until the data changes.
+    """
+
+    def __init__(self, store, image_width: int = image_utils.TARGET_WIDTH,
+                 image_height: int = image_utils.TARGET_HEIGHT):
+        """
+        Args:
+            store: annotation_store.AnnotationStore to read boxes from
+            image_width: Pixel width used to turn normalized sizes into aspect ratios
+            image_height: Pixel height used to turn normalized sizes into aspect ratios
+        """
+        self.store = store
+        self.image_width = image_width
+        self.image_height = image_height
+        self.version = 0
+        self.stats = {"loads": 0, "incremental_updates": 0, "computes": 0, "cache_hits": 0, "invalid_boxes": 0}
+        self._stems: List[str] = []
+        self._stem_ids: Dict[str, int] = {}
+        self._annotated = np.zeros(0, dtype=bool)  # Per image id: has an annotation file
+        self._ids = np.zeros((0, 2), dtype=np.int32)  # Per box: image id, class
+        self._coords = np.zeros((0, 4), dtype=np.float32)  # Per box: x_center, y_center, width, height
+        self._loaded = False
+        self._pending: Set[str] = set()
+        self._pending_lock = threading.Lock()
+        self._lock = threading.Lock()  # Guards the arrays and the result cache
+        self._results: Dict[Optional[int], Dict[str, Any]] = {}
+
+    def mark_changed(self, stem: str):
+        """Record that the boxes of an image changed (safe to call from the store's change callback)."""
+        with self._pending_lock:
+            self._pending.add(stem)
+
+    def _image_id(self, stem: str) -> int:
+        image_id = self._stem_ids.get(stem)
+        if image_id is None:
+            image_id = len(self._stems)
+            self._stem_ids[stem] = image_id
+            self._stems.append(stem)
+        return image_id
+
+    def _grow_annotated(self):
+        if len(self._annotated) < len(self._stems):
+            self._annotated = np.concatenate(
+                [self._annotated, np.zeros(len(self._stems) - len(self._annotated), dtype=bool)]
+            )
+
+    def _load(self):
+        # Called with self._lock held
+        stems, rows = self.store.box_rows()
+        for stem in stems:
+            self._image_id(stem)
+        self._grow_annotated()
+        self._annotated[[self._stem_ids[stem] for stem in stems]] = True
+        self._ids, self._coords, invalid = split_rows([(self._stem_ids[stem], *values) for stem, *values in rows])
+        self.stats["invalid_boxes"] += invalid
+        self._loaded = True
+        self.stats["loads"] += 1
+
+    def _apply_pending(self) -> bool:
+        # Called with self._lock held
+        with self._pending_lock:
+            stems, self._pending = self._pending, set()
+        if not stems:
+            return False
+
+        ids = [self._image_id(stem) for stem in stems]
+        self._grow_annotated()
+        new_rows = []
+        for stem, image_id in zip(stems, ids):
+            boxes = self.store.get(stem)
+            self._annotated[image_id] = boxes is not None
+            for box in boxes or []:
+                new_rows.append((image_id, box["class"], box["x_center"], box["y_center"], box["width"], box["height"]))
+
+        new_ids, new_coords, invalid = split_rows(new_rows)
+        keep = ~np.isin(self._ids[:, IMAGE], np.array(ids, dtype=np.int32))
+        self._ids = np.concatenate([self._ids[keep], new_ids])
+        self._coords = np.concatenate([self._coords[keep], new_coords])
+        self.stats["invalid_boxes"] += invalid
+        self.stats["incremental_updates"] += 1
+        return True
+
+    def compute(self, class_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Get the dataset statistics.
+
+        Args:
+            class_id: Only count boxes of this class (None for all classes)
+
+        Returns:
+            Dict with counts, class balance, boxes-per-image, size and aspect
+            ratio histograms and a position heatmap (rows are y, columns x)
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self.version += 1
+                self._results = {}
+            if self._apply_pending():
+                self.version += 1
+                self._results = {}
+            cached = self._results.get(class_id)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                return cached
+
+            start_time = time.perf_counter()
+            if class_id is None:
+                result = self._compute(self._ids, self._coords)
+            else:
+                selected = self._ids[:, CLASS] == class_id
+                result = self._compute(self._ids[selected], self._coords[selected])
+            result["class_id"] = class_id
+            result["version"] = self.version
+            result["compute_ms"] = round((time.perf_counter() - start_time) * 1000, 2)
+            self._results[class_id] = result
+            self.stats["computes"] += 1
+            return result
+
+    def _compute(self, ids: np.ndarray, coords: np.ndarray) -> Dict[str, Any]:
+        image_ids = ids[:, IMAGE].astype(np.int64)
+        classes = ids[:, CLASS].astype(np.int64)
+        widths = np.clip(coords[:, WIDTH], 0.0, 1.0)
+        heights = np.clip(coords[:, HEIGHT], 0.0, 1.0)
+        annotated_ids = np.flatnonzero(self._annotated)
+
+        # Class balance: boxes per class and images containing each class
+        class_counts = np.bincount(classes)
+        num_classes = len(class_counts)
+        pairs = image_ids * num_classes + classes
+        if len(self._stems) * num_classes <= MAX_PRESENCE_CELLS:
+            # Mark (image, class) cells in a table: O(boxes), no sort
+            present = np.zeros((len(self._stems), num_classes), dtype=bool)
+            present.reshape(-1)[pairs] = True
+            images_per_class = present.sum(axis=0)
+        else:
+            images_per_class = np.bincount(np.unique(pairs) % num_classes, minlength=num_classes)
+
+        # Boxes per annotated image
+        per_image = np.bincount(image_ids, minlength=len(self._stems))[annotated_ids]
+        boxes_per_image = np.bincount(np.minimum(per_image, MAX_BOXES_PER_IMAGE_BIN))
+
+        # Box sizes (normalized to the image) and aspect ratios (in pixels); histograms are bincounts of bin indexes
+        size_edges = np.linspace(0.0, 1.0, HISTOGRAM_BINS + 1)
+        valid = (widths > 0) & (heights > 0)
+        aspect = np.log2((widths[valid] * self.image_width) / (heights[valid] * self.image_height))
+        aspect_edges = np.linspace(*ASPECT_RANGE, HISTOGRAM_BINS + 1)
+
+        def histogram(values, low, high):
+            return np.bincount(bin_indexes(values, low, high, HISTOGRAM_BINS), minlength=HISTOGRAM_BINS).tolist()
+
+        # Position heatmap of box centers
+        heatmap_rows = max(1, round(HEATMAP_BINS * self.image_height / self.image_width))
+        cells = (bin_indexes(coords[:, Y_CENTER], 0.0, 1.0, heatmap_rows) * HEATMAP_BINS
+                 + bin_indexes(coords[:, X_CENTER], 0.0, 1.0, HEATMAP_BINS))
+        heatmap = np.bincount(cells, minlength=heatmap_rows * HEATMAP_BINS).reshape(heatmap_rows, HEATMAP_BINS)
+
+        return {
+            "total_boxes": int(len(ids)),
+            "annotated_images": int(len(annotated_ids)),
+            "images_with_boxes": int(np.count_nonzero(per_image)),
+            "class_counts": class_counts.tolist(),
+            "images_per_class": images_per_class.tolist(),
+            "boxes_per_image": {
+                "counts": boxes_per_image.tolist(),  # counts[n] = images with n boxes (last bin: n or more)
+                "mean": float(per_image.mean()) if len(per_image) else 0.0,
+                "max": int(per_image.max()) if len(per_image) else 0,
+            },
+            "box_width": {"edges": size_edges.tolist(), "counts": histogram(widths, 0.0, 1.0)},
+            "box_height": {"edges": size_edges.tolist(), "counts": histogram(heights, 0.0, 1.0)},
+            "box_size": {  # sqrt(width * height), the side of a square with the same area
+                "edges": size_edges.tolist(),
+                "counts": histogram(np.sqrt(widths * heights), 0.0, 1.0),
+            },
+            "aspect_ratio": {  # log2(width / height) in pixels, out-of-range values in the outer bins
+                "edges": aspect_edges.tolist(),
+                "counts": histogram(aspect, *ASPECT_RANGE),
+            },
+            "heatmap": heatmap.tolist(),
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return array size and load/update/compute counters."""
+        with self._lock:
+            return {"boxes": int(len(self._ids)), "images": len(self._stems), "version": self.version, **self.stats}
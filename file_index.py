@@ -0,0 +1,181 @@
+"""
+Image folder index for YoloLabel application.
+Keeps the files of the images folder (with mtime and size) in memory so file
+listings don't list and stat the whole folder on every request. The folder is
+re-scanned only when its own mtime changes, and only new files are stat()ed.
+"""
+
+import os
+import json
+import base64
+import bisect
+import threading
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterable
+
+# Constants
+IMAGES_FOLDER = os.path.join(os.getcwd(), "images")
+SORT_KEYS = ("name", "mtime", "size")
+
+def encode_cursor(item: Tuple[Any, str]) -> str:
+    """Encode the (sort key, filename) of the last listed file as an opaque cursor."""
+    return base64.urlsafe_b64encode(json.dumps(list(item)).encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """Decode a cursor made by encode_cursor(); raises ValueError if it is malformed."""
+    try:
+        key, name = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(name, str) or not isinstance(key, (str, int)):
+            raise ValueError
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return key, name
+
+class FileIndex:
+    """
+    In-memory index of the files in one folder.
+
+    refresh() compares the folder's mtime with the one seen at the last scan
+    and, if it changed (files were added, removed or renamed), lists the folder
+    with os.scandir and applies the difference. Files overwritten in place
+    don't change the folder mtime, so writers report them with update().
+    Sorted views are built once per index version and shared by all requests.
+    """
+
+    def __init__(self, folder: str = IMAGES_FOLDER):
+        self.folder = folder
+        self.version = 0
+        self.stats = {"scans": 0, "added": 0, "removed": 0, "updated": 0}
+        self._files: Dict[str, Tuple[int, int]] = {}  # filename -> (mtime_ns, size)
+        self._folder_mtime: Optional[int] = None
+        self._views: Dict[str, Tuple[int, List[Tuple[Any, str]]]] = {}  # sort key -> (version, sorted items)
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Re-scan the folder if files were added or removed since the last scan."""
+        with self._lock:
+            try:
+                folder_mtime = os.stat(self.folder).st_mtime_ns
+            except FileNotFoundError:
+                folder_mtime = None
+            if folder_mtime is not None and folder_mtime == self._folder_mtime:
+                return
+            # Remember the mtime from before the listing, so changes made during it trigger another scan
+            self._folder_mtime = folder_mtime
+
+            names = set()
+            if folder_mtime is not None:
+                with os.scandir(self.folder) as entries:
+                    names = {entry.name for entry in entries if entry.is_file()}
+            added = [name for name in names if name not in self._files]
+            removed = [name for name in self._files if name not in names]
+            for name in removed:
+                del self._files[name]
+            for name in added:
+                signature = self._stat(name)
+                if signature is not None:
+                    self._files[name] = signature
+            self.stats["scans"] += 1
+            self.stats["added"] += len(added)
+            self.stats["removed"] += len(removed)
+            if added or removed:
+                self.version += 1
+
+    def _stat(self, name: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(os.path.join(self.folder, name))
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def update(self, names: Iterable[str]):
+        """
+        Re-stat files that were written, overwritten or deleted.
+
+        Args:
+            names: Filenames inside the folder
+        """
+        with self._lock:
+            changed = False
+            for name in names:
+                signature = self._stat(name)
+                if signature == self._files.get(name):
+                    continue
+                if signature is None:
+                    del self._files[name]
+                else:
+                    self._files[name] = signature
+                self.stats["updated"] += 1
+                changed = True
+            if changed:
+                self.version += 1
+
+    def names(self) -> List[str]:
+        """Return all filenames, sorted by name."""
+        return [name for _, name in self._view("name")]
+
+    def _view(self, sort: str) -> List[Tuple[Any, str]]:
+        with self._lock:
+            cached = self._views.get(sort)
+            if cached is not None and cached[0] == self.version:
+                return cached[1]
+            if sort == "name":
+                items = [(name, name) for name in self._files]
+            elif sort == "mtime":
+                items = [(mtime_ns, name) for name, (mtime_ns, _) in self._files.items()]
+            elif sort == "size":
+                items = [(size, name) for name, (_, size) in self._files.items()]
+            else:
+                raise ValueError(f"Invalid sort key: {sort} (use one of {', '.join(SORT_KEYS)})")
+            items.sort()
+            self._views[sort] = (self.version, items)
+            return items
+
+    def page(self, sort: str = "name", descending: bool = False, cursor: Optional[str] = None,
+             limit: Optional[int] = None, predicate: Optional[Callable[[str], bool]] = None) -> Dict[str, Any]:
+        """
+        Get one page of the sorted, filtered file list.
+
+        The cursor holds the sort key and name of the last file of the previous
+        page, so pages stay consistent when files are added or removed between
+        requests.
+
+        Args:
+            sort: One of SORT_KEYS (ties are ordered by filename)
+            descending: Reverse the order
+            cursor: next_cursor of the previous page, or None for the first page
+            limit: Maximum number of files to return (None for all)
+            predicate: Function that returns True for filenames to include
+
+        Returns:
+            Dict with "files", "next_cursor" (None on the last page) and "total"
+            (number of files matching the predicate)
+        """
+        items = self._view(sort)
+        if predicate is not None:
+            items = [item for item in items if predicate(item[1])]
+        total = len(items)
+
+        position = decode_cursor(cursor) if cursor else None
+        if position is not None and not isinstance(position[0], str if sort == "name" else int):
+            raise ValueError(f"Cursor does not belong to sort key {sort}")
+        if descending:
+            end = bisect.bisect_left(items, position) if position else total
+            start = max(0, end - limit) if limit is not None else 0
+            selected = items[start:end][::-1]
+            more = start > 0
+        else:
+            start = bisect.bisect_right(items, position) if position else 0
+            end = start + limit if limit is not None else total
+            selected = items[start:end]
+            more = end < total
+
+        return {
+            "files": [name for _, name in selected],
+            "next_cursor": encode_cursor(selected[-1]) if more and selected else None,
+            "total": total,
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return file count, index version and scan counters."""
+        with self._lock:
+            return {"files": len(self._files), "version": self.version, **self.stats}
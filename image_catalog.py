@@ -0,0 +1,268 @@
+"""
+Image catalog for YoloLabel application.
+Extends the images folder index with the details of every image (size, mtime,
+dimensions, content hash and whether it has an annotation file). The catalog is
+saved to a snapshot file so a restart only re-reads images that changed, and a
+background thread polls the folder so changes made outside the API are picked
+up without every endpoint walking the folders itself.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from typing import List, Dict, Any, Optional, Tuple, Callable, Set, Iterable
+
+from PIL import Image
+
+import file_index
+from status_store import write_json_atomic
+
+# Settings (can be overridden with environment variables)
+CATALOG_SNAPSHOT_PATH = os.environ.get(
+    "YOLOLABEL_CATALOG_SNAPSHOT", os.path.join(os.getcwd(), "image_catalog.json")
+)
+POLL_INTERVAL = float(os.environ.get("YOLOLABEL_CATALOG_POLL_SECONDS", "10"))  # Seconds between full folder polls
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
+
+def describe_image(path: str) -> Tuple[Tuple[int, int], Optional[int], Optional[int], str]:
+    """
+    Read the details of one image file.
+
+    The hash is the same blake2b digest yolo_predict.file_hash() computes.
+
+    Args:
+        path: Path to the image
+
+    Returns:
+        Tuple of ((mtime_ns, size) the details belong to, width, height, hash);
+        width and height are None for files PIL cannot open
+    """
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        try:
+            # Only the image header is read
+            with Image.open(f) as img:
+                width, height = img.size
+        except Exception:
+            width = height = None
+        f.seek(0)
+        hasher = hashlib.blake2b(digest_size=16)
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    return (st.st_mtime_ns, st.st_size), width, height, hasher.hexdigest()
+
+class ImageCatalog(file_index.FileIndex):
+    """
+    Folder index with per-image details, persisted across restarts.
+
+    Details are stored with the (mtime_ns, size) they were read for and are
+    only trusted while the file still has that signature, so any change found
+    by refresh(), update() or poll() makes the image get described again. poll()
+    stats every file (catching files overwritten in place), describes new and
+    changed images and saves the snapshot when anything changed.
+    """
+
+    def __init__(self, folder: str = file_index.IMAGES_FOLDER, snapshot_path: str = CATALOG_SNAPSHOT_PATH,
+                 annotated_stems: Optional[Callable[[], Set[str]]] = None):
+        super().__init__(folder)
+        self.snapshot_path = snapshot_path
+        self.annotated_stems = annotated_stems  # Returns the stems of images with an annotation file
+        self.stats.update({"polls": 0, "described": 0, "loaded": 0})
+        self._details: Dict[str, Tuple[Tuple[int, int], Optional[int], Optional[int], str]] = {}
+        self._saved_version: Optional[int] = None
+        self._details_dirty = False  # Details were read since the last save
+        self._describe_lock = threading.Lock()  # One thread reads image details at a time
+        self._save_lock = threading.Lock()  # One thread writes the snapshot at a time
+        self._stop = threading.Event()
+        self._poller: Optional[threading.Thread] = None
+        self._load_snapshot()
+
+    def _load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, 'r') as f:
+                files = json.load(f)["files"]
+        except Exception as e:
+            print(f"Ignoring unreadable image catalog {self.snapshot_path}: {str(e)}")
+            return
+        # Names are checked against the folder by the first refresh(), signatures by the first poll()
+        for name, (mtime_ns, size, width, height, digest) in files.items():
+            signature = (mtime_ns, size)
+            self._files[name] = signature
+            if digest is not None:
+                self._details[name] = (signature, width, height, digest)
+        self.version += 1
+        self._saved_version = self.version
+        self.stats["loaded"] = len(self._files)
+
+    def save_snapshot(self):
+        """Write the catalog to the snapshot file (atomically) if it changed since the last save."""
+        with self._save_lock:
+            with self._lock:
+                if self.version == self._saved_version and not self._details_dirty:
+                    return
+                version = self.version
+                self._details_dirty = False
+                files = {}
+                for name, signature in self._files.items():
+                    details = self._details.get(name)
+                    if details is not None and details[0] == signature:
+                        files[name] = [*signature, details[1], details[2], details[3]]
+                    else:
+                        files[name] = [*signature, None, None, None]
+            write_json_atomic(self.snapshot_path, {"files": files})
+            with self._lock:
+                self._saved_version = version
+
+    def poll(self) -> Dict[str, int]:
+        """
+        Stat every file in the folder and apply the changes.
+
+        Returns:
+            Dict with the number of files added, changed and removed
+        """
+        try:
+            folder_mtime = os.stat(self.folder).st_mtime_ns
+        except FileNotFoundError:
+            folder_mtime = None
+        found = {}
+        if folder_mtime is not None:
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            st = entry.stat()
+                            found[entry.name] = (st.st_mtime_ns, st.st_size)
+                    except FileNotFoundError:
+                        continue
+
+        counts = {"added": 0, "changed": 0, "removed": 0}
+        with self._lock:
+            for name in [name for name in self._files if name not in found]:
+                del self._files[name]
+                self._details.pop(name, None)
+                counts["removed"] += 1
+            for name, signature in found.items():
+                old = self._files.get(name)
+                if old == signature:
+                    continue
+                self._files[name] = signature
+                counts["added" if old is None else "changed"] += 1
+            self._folder_mtime = folder_mtime
+            if any(counts.values()):
+                self.version += 1
+            self.stats["polls"] += 1
+
+        self.describe_missing()
+        self.save_snapshot()
+        return counts
+
+    def describe_missing(self, names: Optional[Iterable[str]] = None):
+        """
+        Read the details of images that are new or changed.
+
+        Stops early once close() was called; the remaining images are read by
+        the next call.
+
+        Args:
+            names: Only consider these filenames (default: all)
+        """
+        with self._describe_lock:
+            with self._lock:
+                candidates = self._files.keys() if names is None else [n for n in names if n in self._files]
+                missing = [
+                    name for name in candidates
+                    if self._details.get(name, (None,))[0] != self._files[name]
+                ]
+            for name in missing:
+                if self._stop.is_set():
+                    return
+                try:
+                    details = describe_image(os.path.join(self.folder, name))
+                except FileNotFoundError:
+                    continue
+                with self._lock:
+                    self._details[name] = details
+                    self._details_dirty = True
+                    # Also record the signature we just read, in case the file changed since it was listed
+                    if name in self._files and self._files[name] != details[0]:
+                        self._files[name] = details[0]
+                        self.version += 1
+                    self.stats["described"] += 1
+
+    def entries(self, extensions: Optional[Tuple[str, ...]] = IMAGE_EXTENSIONS,
+                describe: bool = True) -> List[Dict[str, Any]]:
+        """
+        Get the catalog records, sorted by filename.
+
+        Args:
+            extensions: Only include files with these extensions (None for all files)
+            describe: Read the details of new or changed images first. This reads
+                and hashes those files (waiting for a running poll to finish);
+                with False their width, height and hash are None instead
+
+        Returns:
+            List of dicts with name, size, mtime (seconds), width, height, hash
+            and has_annotation
+        """
+        names = [n for n in self.names() if extensions is None or n.lower().endswith(extensions)]
+        if describe:
+            self.describe_missing(names)
+        annotated = self.annotated_stems() if self.annotated_stems is not None else set()
+        records = []
+        with self._lock:
+            for name in names:
+                signature = self._files.get(name)
+                if signature is None:
+                    continue
+                details = self._details.get(name)
+                width, height, digest = details[1:] if details is not None and details[0] == signature else (None, None, None)
+                records.append({
+                    "name": name,
+                    "size": signature[1],
+                    "mtime": signature[0] / 1e9,
+                    "width": width,
+                    "height": height,
+                    "hash": digest,
+                    "has_annotation": os.path.splitext(name)[0] in annotated,
+                })
+        return records
+
+    def start_polling(self, interval: float = POLL_INTERVAL):
+        """Poll the folder in a background thread every `interval` seconds (the first poll runs right away)."""
+        if self._poller is not None or interval <= 0:
+            return
+        self._poller = threading.Thread(target=self._poll_loop, args=(interval,), name="image-catalog", daemon=True)
+        self._poller.start()
+
+    def _poll_loop(self, interval: float):
+        while not self._stop.is_set():
+            try:
+                counts = self.poll()
+                if any(counts.values()):
+                    print(f"Image catalog: {counts['added']} added, {counts['changed']} changed, "
+                          f"{counts['removed']} removed")
+            except Exception as e:
+                print(f"Error polling image catalog: {str(e)}")
+            self._stop.wait(interval)
+
+    def close(self, timeout: float = 10.0):
+        """Stop polling and save the snapshot (waiting at most `timeout` seconds for a running poll)."""
+        self._stop.set()
+        if self._poller is not None:
+            self._poller.join(timeout)
+            if self._poller.is_alive():
+                print(f"Image catalog poll still running after {timeout:.0f}s, saving without waiting for it")
+            self._poller = None
+        self.save_snapshot()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return file count, scan/poll counters and how many images have details."""
+        stats = super().get_stats()
+        with self._lock:
+            stats["described_files"] = sum(
+                1 for name, details in self._details.items() if self._files.get(name) == details[0]
+            )
+        return stats
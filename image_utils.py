@@ -0,0 +1,67 @@
+"""
+Image geometry helpers for YoloLabel application.
+Uploaded images are center-cropped to the labeling aspect ratio and resized to a
+fixed size; these helpers keep that mapping in one place so prediction code can
+translate between original and resized coordinates.
+"""
+
+from typing import Tuple
+
+from PIL import Image
+
+# Size of the images stored in the images folder
+TARGET_WIDTH = 1280
+TARGET_HEIGHT = 720
+
+def center_crop_box(
+    width: int,
+    height: int,
+    target_width: int = TARGET_WIDTH,
+    target_height: int = TARGET_HEIGHT,
+) -> Tuple[int, int, int, int]:
+    """
+    Compute the centered crop that gives an image the target aspect ratio.
+
+    Args:
+        width: Width of the original image
+        height: Height of the original image
+        target_width: Width of the resized image
+        target_height: Height of the resized image
+
+    Returns:
+        Crop box as (left, top, right, bottom) in original pixels
+    """
+    if width / height > target_width / target_height:
+        # Image is too wide, trim the sides
+        new_width = int(height * target_width / target_height)
+        left = (width - new_width) // 2
+        right = left + new_width
+        top, bottom = 0, height
+    else:
+        # Image is too tall, trim the top and bottom
+        new_height = int(width * target_height / target_width)
+        top = (height - new_height) // 2
+        bottom = top + new_height
+        left, right = 0, width
+    return left, top, right, bottom
+
+def crop_and_resize(
+    img: Image.Image,
+    target_width: int = TARGET_WIDTH,
+    target_height: int = TARGET_HEIGHT,
+) -> Image.Image:
+    """
+    Center-crop an image to the target aspect ratio and resize it to the target size.
+
+    Args:
+        img: Original image
+        target_width: Width of the resized image
+        target_height: Height of the resized image
+
+    Returns:
+        Resized image
+    """
+    width, height = img.size
+    img = img.crop(center_crop_box(width, height, target_width, target_height))
+    # Replace deprecated ANTIALIAS with LANCZOS (the modern equivalent)
+    return img.resize((target_width, target_height), Image.LANCZOS)
@@ -0,0 +1,324 @@
+"""
+ONNX Runtime inference backend for YoloLabel application.
+This module exports YOLO weights to ONNX once and runs CPU inference through
+ONNX Runtime, with preprocessing, box decoding and NMS implemented in NumPy.
+Results mimic the parts of ultralytics Results used by yolo_predict.format_results.
+"""
+
+import os
+import ast
+import time
+import shutil
+from typing import List, Dict, Any, Optional, Tuple, Union
+
+try:
+    import cv2
+    import numpy as np
+except ImportError as e:
+    module = str(e).split("'")[-2]
+    raise ImportError(
+        f"{module} package is required. Install with: pip install {module}"
+    )
+
+# Constants
+ONNX_IMAGE_SIZE = int(os.environ.get("YOLOLABEL_ONNX_IMGSZ", "640"))  # Export input size
+ONNX_INTRA_OP_THREADS = int(os.environ.get("YOLOLABEL_ONNX_THREADS", "0"))  # 0 lets ONNX Runtime decide
+NMS_IOU_THRESHOLD = 0.7  # Same default IoU threshold as ultralytics predict
+MAX_DETECTIONS = 300  # Same default max_det as ultralytics predict
+# Per-class shift of box coordinates before NMS (ultralytics' max_wh): larger than any
+# input side, so boxes of different classes never overlap and NMS stays within a class
+CLASS_OFFSET = 7680.0
+LETTERBOX_COLOR = (114, 114, 114)
+
+def export_onnx(model_path: str, imgsz: int = ONNX_IMAGE_SIZE) -> str:
+    """
+    Export YOLO weights to ONNX, reusing a previous export when it is up to date.
+
+    The exported file is cached next to the weights (best.pt -> best.onnx) and
+    re-exported whenever the weights are newer than the cached file.
+
+    Args:
+        model_path: Path to the .pt weights (or a model name YOLO can download)
+        imgsz: Square input size of the exported model
+
+    Returns:
+        Path to the ONNX file
+    """
+    onnx_path = os.path.splitext(model_path)[0] + ".onnx"
+    if (os.path.exists(onnx_path) and os.path.exists(model_path)
+            and os.path.getmtime(onnx_path) >= os.path.getmtime(model_path)):
+        return onnx_path
+
+    from ultralytics import YOLO
+
+    start_time = time.perf_counter()
+    # Dynamic axes let the exported model run batches of any size
+    exported_path = YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=True)
+    if os.path.abspath(exported_path) != os.path.abspath(onnx_path):
+        shutil.move(exported_path, onnx_path)
+    print(f"Exported {model_path} to {onnx_path} in {time.perf_counter() - start_time:.1f}s")
+    return onnx_path
+
+def quantized_onnx_path(model_path: str) -> str:
+    """Path of the INT8 ONNX variant produced by yolo_train.quantize (best.pt -> best.int8.onnx)."""
+    return os.path.splitext(model_path)[0] + ".int8.onnx"
+
+def letterbox(img: np.ndarray, new_shape: Tuple[int, int]) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+    """
+    Resize an image keeping its aspect ratio and pad it to new_shape.
+
+    Args:
+        img: BGR image array (H, W, 3)
+        new_shape: Target (height, width)
+
+    Returns:
+        Tuple of (padded image, scale ratio, (left pad, top pad))
+    """
+    height, width = img.shape[:2]
+    ratio = min(new_shape[0] / height, new_shape[1] / width)
+    new_width, new_height = int(round(width * ratio)), int(round(height * ratio))
+    pad_w = (new_shape[1] - new_width) / 2
+    pad_h = (new_shape[0] - new_height) / 2
+
+    if (width, height) != (new_width, new_height):
+        img = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+
+    top, bottom = int(round(pad_h - 0.1)), int(round(pad_h + 0.1))
+    left, right = int(round(pad_w - 0.1)), int(round(pad_w + 0.1))
+    img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+    return img, ratio, (left, top)
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float = NMS_IOU_THRESHOLD) -> np.ndarray:
+    """
+    Greedy non-maximum suppression.
+
+    Args:
+        boxes: Boxes as (N, 4) xyxy array
+        scores: Scores as (N,) array
+        iou_threshold: Boxes overlapping a kept box by more than this are dropped
+
+    Returns:
+        Indices of kept boxes, highest score first
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        inter_w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        inter_h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = inter_w * inter_h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+def decode_predictions(
+    output: np.ndarray,
+    conf: float,
+    iou_threshold: float = NMS_IOU_THRESHOLD,
+    max_det: int = MAX_DETECTIONS,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Decode the raw output of a YOLOv8/YOLO11 detection head for one image.
+
+    Args:
+        output: Raw output of shape (4 + num_classes, num_anchors)
+        conf: Confidence threshold
+        iou_threshold: NMS IoU threshold
+        max_det: Maximum number of detections to keep
+
+    Returns:
+        Tuple of (xyxy boxes in network input pixels, confidences, class ids)
+    """
+    preds = output.T
+    class_scores = preds[:, 4:]
+    class_ids = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(preds)), class_ids]
+
+    mask = scores > conf
+    boxes = preds[mask, :4]
+    scores = scores[mask]
+    class_ids = class_ids[mask]
+
+    # Center format to corners
+    xyxy = np.empty_like(boxes)
+    xyxy[:, :2] = boxes[:, :2] - boxes[:, 2:] / 2
+    xyxy[:, 2:] = boxes[:, :2] + boxes[:, 2:] / 2
+
+    # Offset boxes by class so NMS only suppresses within a class
+    offsets = class_ids[:, None].astype(xyxy.dtype) * CLASS_OFFSET
+    keep = nms(xyxy + offsets, scores, iou_threshold)[:max_det]
+    return xyxy[keep], scores[keep], class_ids[keep]
+
+class OnnxBoxes:
+    """
+    Detection boxes of one image (NumPy counterpart of ultralytics Boxes).
+    """
+
+    def __init__(self, xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    def __len__(self) -> int:
+        return len(self.conf)
+
+class OnnxResult:
+    """
+    Prediction result of one image, with the attributes format_results reads.
+    """
+
+    def __init__(self, path: str, orig_shape: Tuple[int, int], boxes: OnnxBoxes,
+                 names: Dict[int, str], speed: Dict[str, float], orig_img: Optional[np.ndarray] = None):
+        self.path = path
+        self.orig_img = orig_img
+        self.orig_shape = orig_shape
+        self.boxes = boxes
+        self.names = names
+        self.speed = speed
+
+class OnnxModel:
+    """
+    YOLO detection model served by ONNX Runtime on CPU.
+
+    predict() accepts the same source/conf/batch arguments yolo_predict passes
+    to ultralytics YOLO.predict and returns a list of OnnxResult.
+    """
+
+    def __init__(self, onnx_path: str, intra_op_threads: int = ONNX_INTRA_OP_THREADS):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError(
+                "onnxruntime package is required for the ONNX backend. Install with: pip install onnxruntime"
+            )
+
+        options = ort.SessionOptions()
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        self.onnx_path = onnx_path
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+        # ultralytics stores class names and input size in the model metadata
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        names = ast.literal_eval(metadata["names"]) if "names" in metadata else {}
+        self.names = {int(k): v for k, v in names.items()}
+        imgsz = ast.literal_eval(metadata["imgsz"]) if "imgsz" in metadata else [ONNX_IMAGE_SIZE, ONNX_IMAGE_SIZE]
+        self.imgsz = (int(imgsz[0]), int(imgsz[1]))
+
+    def predict(
+        self,
+        source: Union[str, np.ndarray, List[Union[str, np.ndarray]]],
+        conf: float = 0.25,
+        batch: Optional[int] = None,
+        max_det: int = MAX_DETECTIONS,
+        **kwargs,
+    ) -> List[OnnxResult]:
+        """
+        Run detection on one or more images.
+
+        Args:
+            source: Image path or BGR array, or a list of them
+            conf: Confidence threshold
+            batch: Images per forward pass (defaults to all at once)
+            max_det: Maximum number of detections to keep per image
+            **kwargs: Other ultralytics predict arguments (ignored)
+
+        Returns:
+            List of OnnxResult, one per image
+        """
+        sources = list(source) if isinstance(source, (list, tuple)) else [source]
+        batch_size = max(1, batch or len(sources))
+
+        results = []
+        for start in range(0, len(sources), batch_size):
+            results.extend(self._predict_batch(sources[start:start + batch_size], conf, max_det))
+        return results
+
+    def _predict_batch(self, sources: List[Union[str, np.ndarray]], conf: float, max_det: int) -> List[OnnxResult]:
+        start_time = time.perf_counter()
+
+        paths, images, shapes, ratios, pads, inputs = [], [], [], [], [], []
+        for i, src in enumerate(sources):
+            if isinstance(src, str):
+                img = cv2.imread(src)
+                if img is None:
+                    raise FileNotFoundError(f"Image not found: {src}")
+                paths.append(src)
+            else:
+                img = src
+                paths.append(f"image{i}.jpg")
+            images.append(img)
+            shapes.append(img.shape[:2])
+            padded, ratio, pad = letterbox(img, self.imgsz)
+            ratios.append(ratio)
+            pads.append(pad)
+            # BGR HWC -> RGB CHW
+            inputs.append(padded[..., ::-1].transpose(2, 0, 1))
+
+        tensor = np.ascontiguousarray(np.stack(inputs), dtype=np.float32) / 255.0
+        preprocess_time = time.perf_counter()
+
+        outputs = self.session.run(None, {self.input_name: tensor})[0]
+        inference_time = time.perf_counter()
+
+        results = []
+        for i in range(len(sources)):
+            xyxy, scores, class_ids = decode_predictions(outputs[i], conf, max_det=max_det)
+
+            # Undo letterboxing and clip to the original image
+            height, width = shapes[i]
+            xyxy = (xyxy - np.array([pads[i][0], pads[i][1], pads[i][0], pads[i][1]], dtype=xyxy.dtype)) / ratios[i]
+            xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, width)
+            xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, height)
+
+            results.append(OnnxResult(
+                path=paths[i],
+                orig_shape=(height, width),
+                boxes=OnnxBoxes(xyxy, scores, class_ids.astype(np.float32)),
+                names=self.names,
+                speed={},
+                orig_img=images[i],
+            ))
+        end_time = time.perf_counter()
+
+        # Per-image timings in milliseconds, like ultralytics
+        speed = {
+            "preprocess": (preprocess_time - start_time) * 1000 / len(sources),
+            "inference": (inference_time - preprocess_time) * 1000 / len(sources),
+            "postprocess": (end_time - inference_time) * 1000 / len(sources),
+        }
+        for result in results:
+            result.speed = dict(speed)
+        return results
+
+def load_onnx_model(model_path: str, intra_op_threads: int = ONNX_INTRA_OP_THREADS, quantized: bool = False) -> OnnxModel:
+    """
+    Export (if needed) and load YOLO weights with ONNX Runtime.
+
+    Args:
+        model_path: Path to the .pt weights
+        intra_op_threads: ONNX Runtime intra-op thread count (0 for default)
+        quantized: Load the INT8 variant produced by yolo_train.quantize instead
+
+    Returns:
+        Loaded OnnxModel
+    """
+    if not quantized:
+        return OnnxModel(export_onnx(model_path), intra_op_threads=intra_op_threads)
+
+    int8_path = quantized_onnx_path(model_path)
+    if not os.path.exists(int8_path):
+        raise FileNotFoundError(
+            f"Quantized model not found: {int8_path}. Create it with: python yolo_train.py --quantize"
+        )
+    if os.path.exists(model_path) and os.path.getmtime(int8_path) < os.path.getmtime(model_path):
+        raise FileNotFoundError(
+            f"Quantized model {int8_path} is older than {model_path}. Recreate it with: python yolo_train.py --quantize"
+        )
+    return OnnxModel(int8_path, intra_op_threads=intra_op_threads)
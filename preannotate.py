@@ -0,0 +1,314 @@
+"""
+Bulk pre-annotation job for YoloLabel application.
+This module runs the current YOLO model over every image that has no annotation
+file yet, writes the predictions in YOLO format and flags the images for review.
+Progress is checkpointed after every batch so an interrupted job resumes where it stopped.
+"""
+
+import os
+import json
+import time
+import threading
+from typing import List, Dict, Any, Optional, Callable
+
+import yolo_predict
+import status_store
+from annotation_store import format_yolo_lines
+from status_store import write_json_atomic
+
+# Constants
+IMAGES_FOLDER = os.path.join(os.getcwd(), "images")
+ANNOTATIONS_FOLDER = os.path.join(os.getcwd(), "annotations")
+CLASSES_FILE = os.path.join(os.getcwd(), "classes.json")
+FILE_STATUS_PATH = os.path.join(os.getcwd(), "file_statuses.json")
+CHECKPOINT_PATH = os.path.join(os.getcwd(), "preannotate_checkpoint.json")
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
+REVIEW_STATUS = "ATTENTION"  # Status given to images with predicted annotations
+
+def find_unannotated_images(images_folder: str = IMAGES_FOLDER, annotations_folder: str = ANNOTATIONS_FOLDER) -> List[str]:
+    """
+    List images that have no annotation file yet.
+
+    Args:
+        images_folder: Folder containing the images
+        annotations_folder: Folder containing YOLO .txt annotations
+
+    Returns:
+        Sorted list of image filenames
+    """
+    annotated = set()
+    if os.path.isdir(annotations_folder):
+        with os.scandir(annotations_folder) as entries:
+            annotated = {os.path.splitext(e.name)[0] for e in entries if e.name.endswith(".txt")}
+
+    images = []
+    with os.scandir(images_folder) as entries:
+        for entry in entries:
+            if (entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS)
+                    and os.path.splitext(entry.name)[0] not in annotated):
+                images.append(entry.name)
+    return sorted(images)
+
+def load_class_names(classes_file: str = CLASSES_FILE) -> List[str]:
+    """Load class names from classes.json (string or object entries)."""
+    if not os.path.exists(classes_file):
+        return []
+    with open(classes_file, 'r') as f:
+        return [c["name"] if isinstance(c, dict) else c for c in json.load(f)]
+
+def map_class_index(box: Dict[str, Any], class_names: List[str]) -> int:
+    """
+    Map a predicted box to a class index of the labeling project.
+
+    Mirrors the web UI: match the model's class name (case-insensitive) first,
+    then fall back to the model's class index if it is valid, otherwise 0.
+    """
+    name = str(box.get("name", "")).lower()
+    for i, class_name in enumerate(class_names):
+        if class_name.lower() == name:
+            return i
+    class_id = int(box.get("class", 0))
+    return class_id if 0 <= class_id < len(class_names) else 0
+
+def update_statuses_file(filenames: List[str], status: str, file_status_path: str = FILE_STATUS_PATH):
+    """Set the status of several files in the status store on disk (while the server is not running)."""
+    store = status_store.StatusStore(file_status_path)
+    try:
+        store.set(filenames, status)
+    finally:
+        store.close()
+
+class PreannotationJob:
+    """
+    Resumable job that pre-annotates every unannotated image with the current model.
+
+    The work list is fixed when the job starts and saved in a checkpoint file
+    together with the number of images done. After a crash, the next run picks
+    up the saved list at the last completed batch. Before a batch's labels are
+    written, the images about to get them are saved in the checkpoint as pending,
+    so a run that crashed before flagging them flags them on resume (the re-run
+    of the batch skips them because their label files already exist).
+    """
+
+    def __init__(
+        self,
+        images_folder: str = IMAGES_FOLDER,
+        annotations_folder: str = ANNOTATIONS_FOLDER,
+        checkpoint_path: str = CHECKPOINT_PATH,
+        class_names: Optional[List[str]] = None,
+        update_statuses: Optional[Callable[[List[str], str], None]] = None,
+        save_annotation: Optional[Callable[[str, List[Dict[str, Any]]], Any]] = None,
+        batch_size: int = yolo_predict.DEFAULT_BATCH_SIZE,
+        conf: float = yolo_predict.CONFIDENCE_THRESHOLD,
+        verbose: bool = False,
+    ):
+        self.images_folder = images_folder
+        self.annotations_folder = annotations_folder
+        self.checkpoint_path = checkpoint_path
+        self.class_names = class_names if class_names is not None else load_class_names()
+        self.update_statuses = update_statuses or update_statuses_file
+        self.save_annotation = save_annotation  # Called with (image stem, boxes); None writes the .txt file directly
+        self.batch_size = max(1, int(batch_size))
+        self.conf = conf
+        self.verbose = verbose
+        self._thread: Optional[threading.Thread] = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._progress = {
+            "state": "idle",
+            "total": 0,
+            "processed": 0,
+            "written": 0,
+            "empty": 0,
+            "errors": 0,
+            "resumed": False,
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        """
+        Start the job in a background thread.
+
+        Returns:
+            False if the job is already running, True otherwise
+        """
+        if self.running:
+            return False
+        self._cancel.clear()
+        self._set_progress(state="running")
+        self._thread = threading.Thread(target=self.run, name="preannotate", daemon=True)
+        self._thread.start()
+        return True
+
+    def cancel(self):
+        """Ask the job to stop after the current batch (progress stays checkpointed)."""
+        self._cancel.set()
+
+    def progress(self) -> Dict[str, Any]:
+        """Return a snapshot of the job progress."""
+        with self._lock:
+            progress = dict(self._progress)
+        elapsed = (progress["finished_at"] or time.time()) - progress["started_at"] if progress["started_at"] else 0
+        progress["images_per_second"] = progress["processed"] / elapsed if elapsed > 0 else 0.0
+        return progress
+
+    def _set_progress(self, **values):
+        with self._lock:
+            self._progress.update(values)
+
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                checkpoint = json.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable checkpoint {self.checkpoint_path}: {str(e)}")
+            return None
+        return checkpoint if checkpoint.get("state") != "completed" else None
+
+    def _annotation_path(self, filename: str) -> str:
+        return os.path.join(self.annotations_folder, os.path.splitext(filename)[0] + ".txt")
+
+    def _write_checkpoint(self, files: List[str], done: int, counters: Dict[str, int],
+                          pending: Optional[Dict[str, List[str]]] = None):
+        checkpoint = {"state": "running", "files": files, "done": done, "counters": counters}
+        if pending:
+            checkpoint["pending"] = pending
+        write_json_atomic(self.checkpoint_path, checkpoint)
+
+    def _write_annotation(self, filename: str, result: Dict[str, Any]) -> bool:
+        stem = os.path.splitext(filename)[0]
+        annotation_path = self._annotation_path(filename)
+        # Never overwrite labels saved by an annotator while the job was running
+        if os.path.exists(annotation_path):
+            return False
+
+        # No detections give an empty file (a YOLO "no objects" label), so later jobs skip the image
+        boxes = [{**box, "class": map_class_index(box, self.class_names)} for box in result["boxes"]]
+        if self.save_annotation is not None:
+            self.save_annotation(stem, boxes)
+        else:
+            with open(annotation_path, 'w') as f:
+                f.write(format_yolo_lines(boxes))
+        return True
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Run the job synchronously.
+
+        Returns:
+            Final progress snapshot
+        """
+        start_time = time.time()
+        try:
+            os.makedirs(self.annotations_folder, exist_ok=True)
+
+            checkpoint = self._load_checkpoint()
+            resumed = checkpoint is not None
+            if resumed:
+                files = checkpoint["files"]
+                done = checkpoint["done"]
+                counters = checkpoint.get("counters", {})
+                pending = checkpoint.get("pending", {})
+            else:
+                files = find_unannotated_images(self.images_folder, self.annotations_folder)
+                done = 0
+                counters = {}
+                pending = {}
+            written = counters.get("written", 0)
+            empty = counters.get("empty", 0)
+            errors = counters.get("errors", 0)
+
+            # Labels written by the interrupted batch: count them and flag them, in case the crash came before that
+            pending_review = [f for f in pending.get("review", []) if os.path.exists(self._annotation_path(f))]
+            empty += sum(1 for f in pending.get("empty", []) if os.path.exists(self._annotation_path(f)))
+            written += len(pending_review)
+            if pending_review:
+                self.update_statuses(pending_review, REVIEW_STATUS)
+
+            self._set_progress(
+                state="running", total=len(files), processed=done, written=written, empty=empty,
+                errors=errors, resumed=resumed, started_at=start_time, finished_at=None, error=None,
+            )
+            if self.verbose:
+                action = "Resuming" if resumed else "Starting"
+                print(f"{action} pre-annotation of {len(files)} images at {done}")
+
+            while done < len(files) and not self._cancel.is_set():
+                batch = files[done:done + self.batch_size]
+                paths = [os.path.join(self.images_folder, f) for f in batch]
+
+                results = yolo_predict.predict_batch(paths, batch_size=len(paths), conf=self.conf)
+                to_write = [
+                    (filename, result) for filename, result in zip(batch, results)
+                    if "error" not in result and not os.path.exists(self._annotation_path(filename))
+                ]
+                self._write_checkpoint(files, done, {"written": written, "empty": empty, "errors": errors}, pending={
+                    "review": [filename for filename, result in to_write if result["boxes"]],
+                    "empty": [filename for filename, result in to_write if not result["boxes"]],
+                })
+
+                errors += sum(1 for result in results if "error" in result)
+                flagged = []
+                for filename, result in to_write:
+                    if not self._write_annotation(filename, result):
+                        continue
+                    if result["boxes"]:
+                        written += 1
+                        flagged.append(filename)
+                    else:
+                        empty += 1
+
+                if flagged:
+                    self.update_statuses(flagged, REVIEW_STATUS)
+
+                done += len(batch)
+                self._write_checkpoint(files, done, {"written": written, "empty": empty, "errors": errors})
+                self._set_progress(processed=done, written=written, empty=empty, errors=errors)
+                if self.verbose:
+                    print(f"Pre-annotated {done}/{len(files)} images ({written} written, {errors} errors)")
+
+            if done >= len(files):
+                write_json_atomic(self.checkpoint_path, {"state": "completed", "files": [], "done": done})
+                self._set_progress(state="completed", finished_at=time.time())
+            else:
+                self._set_progress(state="cancelled", finished_at=time.time())
+        except Exception as e:
+            print(f"Pre-annotation error: {str(e)}")
+            self._set_progress(state="failed", error=str(e), finished_at=time.time())
+
+        return self.progress()
+
+if __name__ == "__main__":
+    # Simple command-line interface when run directly
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pre-annotate all unannotated images with the current YOLO model")
+    parser.add_argument("--conf", type=float, default=yolo_predict.CONFIDENCE_THRESHOLD,
+                        help=f"Confidence threshold (default: {yolo_predict.CONFIDENCE_THRESHOLD})")
+    parser.add_argument("--batch", type=int, default=yolo_predict.DEFAULT_BATCH_SIZE, help="Images per batch")
+    parser.add_argument("--restart", action="store_true", help="Ignore any checkpoint and start over")
+
+    args = parser.parse_args()
+
+    if args.restart and os.path.exists(CHECKPOINT_PATH):
+        os.remove(CHECKPOINT_PATH)
+
+    # Open the status store once for the whole run (the server must not be running)
+    statuses = status_store.StatusStore(FILE_STATUS_PATH)
+    job = PreannotationJob(batch_size=args.batch, conf=args.conf, update_statuses=statuses.set, verbose=True)
+    try:
+        final = job.run()
+    finally:
+        statuses.close()
+    print(f"\nPre-annotation {final['state']}: {final['processed']}/{final['total']} images, "
+          f"{final['written']} annotations written, {final['empty']} without detections, {final['errors']} errors")
+    if final["state"] == "failed":
+        print(f"Error: {final['error']}")
@@ -0,0 +1,320 @@
+"""
+Inference scheduling for YoloLabel prediction requests.
+This module runs blocking inference work on a dedicated, bounded executor so the
+event loop stays responsive, and collects concurrent prediction requests for a
+short window to run them as a single batched forward pass.
+"""
+
+import os
+import math
+import time
+import asyncio
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_left
+from collections import namedtuple
+from typing import List, Dict, Any, Optional, Tuple
+
+import yolo_predict
+
+# Settings (can be overridden with environment variables)
+BATCH_WINDOW_MS = float(os.environ.get("YOLOLABEL_BATCH_WINDOW_MS", "10"))  # Max time to wait for more requests
+MAX_BATCH_SIZE = int(os.environ.get("YOLOLABEL_MAX_BATCH_SIZE", "8"))  # Max images per forward pass
+INFERENCE_WORKERS = int(os.environ.get("YOLOLABEL_INFERENCE_WORKERS", "1"))  # Threads running inference work
+MAX_PENDING_REQUESTS = int(os.environ.get("YOLOLABEL_MAX_PENDING_REQUESTS", "32"))  # Admitted requests before rejecting
+
+# Histogram bucket upper bounds
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64]
+QUEUE_WAIT_MS_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 250, 500, 1000, 5000]
+RUN_MS_BUCKETS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+# A queued prediction request waiting for its batch
+PendingRequest = namedtuple("PendingRequest", ["image_path", "conf", "model_path", "backend", "submitted", "future"])
+
+class Histogram:
+    """
+    Fixed-bucket histogram for reporting metrics.
+    """
+
+    def __init__(self, buckets: List[float]):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Record a single value."""
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.total += value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return bucket counts (keyed by upper bound) and summary values."""
+        with self._lock:
+            buckets = {str(b): c for b, c in zip(self.buckets, self.counts)}
+            buckets["+Inf"] = self.counts[-1]
+            return {
+                "buckets": buckets,
+                "count": self.count,
+                "sum": self.total,
+                "mean": self.total / self.count if self.count else 0.0,
+            }
+
+class QueueFullError(RuntimeError):
+    """
+    Raised when the inference executor has no room for another request.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after  # Suggested delay in seconds
+
+class InferenceExecutor:
+    """
+    Dedicated thread pool for blocking inference work with admission control.
+
+    Requests are admitted with admit() (at most max_pending at a time, further
+    requests get QueueFullError) and their blocking steps run through run() on
+    a pool of `workers` threads, outside the event loop.
+    """
+
+    def __init__(self, workers: int = INFERENCE_WORKERS, max_pending: int = MAX_PENDING_REQUESTS):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.wait_histogram = Histogram(QUEUE_WAIT_MS_BUCKETS)
+        self.run_histogram = Histogram(RUN_MS_BUCKETS)
+        self.stats = {"admitted": 0, "rejected": 0, "tasks": 0, "max_pending_seen": 0}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0  # Admitted requests, only touched on the event loop thread
+        self._queued_tasks = 0
+        self._running_tasks = 0
+        self._lock = threading.Lock()  # Guards task counters updated from worker threads
+
+    def retry_after(self) -> int:
+        """Estimate how many seconds the current backlog needs to drain."""
+        mean_run_ms = self.run_histogram.to_dict()["mean"] or 1000.0
+        return max(1, math.ceil(self._pending * mean_run_ms / 1000.0 / self.workers))
+
+    @contextlib.contextmanager
+    def admit(self):
+        """
+        Admit one request for the duration of the with-block.
+
+        Raises:
+            QueueFullError: If max_pending requests are already admitted
+        """
+        if self._pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise QueueFullError(self.retry_after())
+        self._pending += 1
+        self.stats["admitted"] += 1
+        self.stats["max_pending_seen"] = max(self.stats["max_pending_seen"], self._pending)
+        try:
+            yield
+        finally:
+            self._pending -= 1
+
+    async def run(self, fn, *args):
+        """
+        Run a blocking function on the inference thread pool.
+
+        Args:
+            fn: Function to call
+            *args: Positional arguments for fn
+
+        Returns:
+            Return value of fn
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        submitted = time.perf_counter()
+        with self._lock:
+            self._queued_tasks += 1
+            self.stats["tasks"] += 1
+
+        def task():
+            start_time = time.perf_counter()
+            self.wait_histogram.observe((start_time - submitted) * 1000.0)
+            with self._lock:
+                self._queued_tasks -= 1
+                self._running_tasks += 1
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running_tasks -= 1
+                self.run_histogram.observe((time.perf_counter() - start_time) * 1000.0)
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, task)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return executor settings, queue depth and wait/run-time histograms.
+
+        Returns:
+            Dict with settings, counters and histograms
+        """
+        with self._lock:
+            queued_tasks, running_tasks = self._queued_tasks, self._running_tasks
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending_requests": self._pending,
+            "queued_tasks": queued_tasks,
+            "running_tasks": running_tasks,
+            **self.stats,
+            "queue_wait_ms_histogram": self.wait_histogram.to_dict(),
+            "run_ms_histogram": self.run_histogram.to_dict(),
+        }
+
+class MicroBatchScheduler:
+    """
+    Aggregates concurrent prediction calls into batched inference.
+
+    Requests are queued with submit(). A background task takes the first queued
+    request, waits up to window_ms for more (or until max_batch_size is reached),
+    runs one batched forward pass on the inference executor and resolves each caller's
+    future with its own result. Requests with different conf, model_path or
+    backend are run as separate batches.
+    """
+
+    def __init__(self, executor: InferenceExecutor, window_ms: float = BATCH_WINDOW_MS, max_batch_size: int = MAX_BATCH_SIZE):
+        self.executor = executor
+        self.window_ms = window_ms
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_size_histogram = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_histogram = Histogram(QUEUE_WAIT_MS_BUCKETS)
+        self.stats = {"requests": 0, "batches": 0, "errors": 0}
+        self._queue: Optional[asyncio.Queue] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether requests are actually aggregated (a window and batch size above 1)."""
+        return self.window_ms > 0 and self.max_batch_size > 1
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def submit(
+        self,
+        image_path: str,
+        conf: float = yolo_predict.CONFIDENCE_THRESHOLD,
+        model_path: Optional[str] = None,
+        backend: Optional[str] = None,
+    ) -> List[Any]:
+        """
+        Queue an image for prediction and wait for its result.
+
+        Args:
+            image_path: Path to the image file
+            conf: Confidence threshold for detections (0-1)
+            model_path: Path to a specific model file (optional)
+            backend: Inference backend ('torch', 'onnx' or 'onnx_int8', defaults to the server setting)
+
+        Returns:
+            List of YOLO results for the image (same shape as yolo_predict.predict)
+        """
+        self.stats["requests"] += 1
+        backend = yolo_predict.resolve_backend(backend)
+
+        if not self.enabled:
+            results = await self.executor.run(yolo_predict.predict_results_batch, [image_path], conf, model_path, backend)
+            self.queue_wait_histogram.observe(0.0)
+            self.batch_size_histogram.observe(1)
+            self.stats["batches"] += 1
+            return list(results)
+
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._queue.put_nowait(PendingRequest(image_path, conf, model_path, backend, time.perf_counter(), future))
+        self._wakeup.set()
+        return await future
+
+    async def _collect_batch(self) -> List[PendingRequest]:
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.window_ms / 1000.0
+
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect_batch()
+
+            # Group requests that can share a forward pass
+            groups: Dict[Tuple, List[PendingRequest]] = {}
+            for item in batch:
+                groups.setdefault((item.conf, item.model_path, item.backend), []).append(item)
+
+            for (conf, model_path, backend), items in groups.items():
+                await self._run_group(items, conf, model_path, backend)
+
+    async def _run_group(self, items: List[PendingRequest], conf: float, model_path: Optional[str], backend: str):
+        dispatch_time = time.perf_counter()
+        for item in items:
+            self.queue_wait_histogram.observe((dispatch_time - item.submitted) * 1000.0)
+        self.batch_size_histogram.observe(len(items))
+        self.stats["batches"] += 1
+
+        paths = [item.image_path for item in items]
+        try:
+            results = await self.executor.run(yolo_predict.predict_results_batch, paths, conf, model_path, backend)
+        except Exception as e:
+            self.stats["errors"] += 1
+            for item in items:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        # Fan the per-image results back to the waiting requests
+        for item, result in zip(items, results):
+            if not item.future.done():
+                item.future.set_result([result])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return scheduler settings, counters and histograms.
+
+        Returns:
+            Dict with settings, counters, batch-size and queue-wait histograms
+        """
+        return {
+            "enabled": self.enabled,
+            "window_ms": self.window_ms,
+            "max_batch_size": self.max_batch_size,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            **self.stats,
+            "batch_size_histogram": self.batch_size_histogram.to_dict(),
+            "queue_wait_ms_histogram": self.queue_wait_histogram.to_dict(),
+        }
+
+# Process-wide executor and scheduler shared by the prediction endpoints
+executor = InferenceExecutor()
+scheduler = MicroBatchScheduler(executor)
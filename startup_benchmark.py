@@ -0,0 +1,123 @@
+"""
+Startup benchmark for YoloLabel application.
+Imports the API server in fresh interpreters with `python -X importtime` and
+reports import time and peak memory, with the ML stack loaded lazily versus
+imported up front (as app.py used to do).
+"""
+
+import os
+import sys
+import json
+import subprocess
+from typing import List, Dict, Any, Tuple
+
+# Modules the server imports only when prediction is first used
+ML_MODULES = ["yolo_predict", "predict_scheduler", "worker_pool", "preannotate"]
+
+# Code run in the child interpreter; prints its peak RSS in KiB as the last stdout line
+CHILD_CODE = """
+import resource
+{imports}
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+SCENARIOS = {
+    "lazy": ["app"],
+    "eager": ["app"] + ML_MODULES,
+}
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """
+    Parse `-X importtime` output.
+
+    Args:
+        stderr: Standard error of an interpreter run with -X importtime
+
+    Returns:
+        List of (module, self_us, cumulative_us) in import order
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Header line
+        # Keep the indentation of the name, it marks nested imports
+        entries.append((fields[2][1:].rstrip(), int(fields[0]), int(fields[1])))
+    return entries
+
+def run_scenario(modules: List[str], top: int = 10) -> Dict[str, Any]:
+    """
+    Import modules in a fresh interpreter and measure it.
+
+    Args:
+        modules: Modules to import, in order
+        top: Number of slowest top-level imports to report
+
+    Returns:
+        Dict with total import time, peak RSS and the slowest top-level imports
+    """
+    code = CHILD_CODE.format(imports="\n".join(f"import {m}" for m in modules))
+    # Measure the import alone, without starting the model warmup
+    env = dict(os.environ, YOLOLABEL_PRELOAD_MODEL="0")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=env,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {', '.join(modules)} failed:\n{proc.stderr[-2000:]}")
+
+    entries = parse_importtime(proc.stderr)
+    # Top-level imports are the ones without leading spaces in the module column
+    top_level = [(name, cumulative) for name, _, cumulative in entries if not name.startswith(" ")]
+    return {
+        "modules": modules,
+        "import_ms": sum(cumulative for _, cumulative in top_level) / 1000.0,
+        "max_rss_mb": int(proc.stdout.strip().splitlines()[-1]) / 1024.0,
+        "slowest": [
+            {"module": name, "cumulative_ms": cumulative / 1000.0}
+            for name, cumulative in sorted(top_level, key=lambda e: e[1], reverse=True)[:top]
+        ],
+    }
+
+def benchmark(top: int = 10, verbose: bool = True) -> Dict[str, Dict[str, Any]]:
+    """
+    Compare server startup with lazy and eager ML imports.
+
+    Args:
+        top: Number of slowest top-level imports to report per scenario
+        verbose: Print the report
+
+    Returns:
+        Dict mapping scenario name to its run_scenario result
+    """
+    report = {name: run_scenario(modules, top) for name, modules in SCENARIOS.items()}
+
+    if verbose:
+        for name, result in report.items():
+            print(f"\n{name}: import {', '.join(result['modules'])}")
+            print(f"  Import time: {result['import_ms']:.1f} ms")
+            print(f"  Peak RSS: {result['max_rss_mb']:.1f} MB")
+            print("  Slowest imports:")
+            for entry in result["slowest"]:
+                print(f"    {entry['cumulative_ms']:9.1f} ms  {entry['module']}")
+        lazy, eager = report["lazy"], report["eager"]
+        print(f"\nLazy ML imports save {eager['import_ms'] - lazy['import_ms']:.1f} ms "
+              f"and {eager['max_rss_mb'] - lazy['max_rss_mb']:.1f} MB at startup")
+    return report
+
+if __name__ == "__main__":
+    # Simple command-line interface when run directly
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure API server import time with lazy and eager ML imports")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list per scenario")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    args = parser.parse_args()
+
+    results = benchmark(top=args.top, verbose=not args.json)
+    if args.json:
+        print(json.dumps(results, indent=2))
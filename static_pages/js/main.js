@@ -375,29 +375,31 @@ document.addEventListener('DOMContentLoaded', () => {
             }
         }
         
-        // Load box counts for all images
-        for (const file of imageFiles) {
-            try {
-                const response = await fetch(`/annotations/${file}`);
+        // Load box counts for all images from the server-maintained summary (revalidated with its ETag)
+        try {
+            const response = await fetch('/annotation_summary');
+            
+            if (response.ok) {
+                const data = await response.json();
+                const allCounts = data.images || {};
                 
-                if (response.ok) {
-                    const data = await response.json();
-                    const boxes = data.boxes || [];
-                    
-                    // Count boxes by class
+                imageFiles.forEach(file => {
+                    // Summary entries are keyed by filename without extension; map class indexes to names
                     const counts = {};
-                    boxes.forEach(box => {
-                        const classIndex = box.class;
+                    const stem = file.replace(/\.[^.]+$/, '');
+                    Object.entries(allCounts[stem] || {}).forEach(([classIndex, count]) => {
                         const className = classes[classIndex] || `Class ${classIndex}`;
-                        counts[className] = (counts[className] || 0) + 1;
+                        counts[className] = (counts[className] || 0) + count;
                     });
                     
                     // Store the counts
                     fileBoxCounts[file] = counts;
-                }
-            } catch (error) {
-                console.error(`Error loading annotations for ${file}:`, error);
+                });
+            } else {
+                console.error('Error loading annotation counts:', response.statusText);
             }
+        } catch (error) {
+            console.error('Error loading annotation counts:', error);
         }
         
         // Save updated statuses to localStorage as backup
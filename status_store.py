@@ -0,0 +1,176 @@
+"""
+File status store for YoloLabel application.
+Statuses are kept in memory and every change is appended to a journal next to
+file_statuses.json instead of rewriting the whole JSON file. The journal is
+fsynced in batches and periodically compacted into the JSON snapshot; on
+startup the snapshot is loaded and the journal replayed on top of it.
+"""
+
+import os
+import json
+import time
+import threading
+from typing import List, Dict, Any, Optional
+
+# Constants
+FILE_STATUS_PATH = os.path.join(os.getcwd(), "file_statuses.json")
+VALID_STATUSES = ("DONE", "IN_PROGRESS", "ATTENTION")
+FSYNC_INTERVAL = float(os.environ.get("YOLOLABEL_STATUS_FSYNC_MS", "50")) / 1000.0  # Max delay before appended changes are fsynced
+COMPACT_THRESHOLD = int(os.environ.get("YOLOLABEL_STATUS_COMPACT_ENTRIES", "10000"))  # Journal entries before compaction
+
+def write_json_atomic(path: str, data: Any):
+    """Write JSON to a temp file, fsync it and rename it over the target."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class StatusStore:
+    """
+    In-memory file statuses persisted as snapshot + append-only journal.
+
+    Each change is one JSON line {"file": ..., "status": ...} appended to the
+    journal (status None removes the entry). Appends are flushed to the OS right
+    away, so they survive a process crash; a background thread fsyncs them at
+    most every FSYNC_INTERVAL, so concurrent clicks share one fsync. Once the
+    journal holds COMPACT_THRESHOLD entries, the statuses are written to the
+    snapshot atomically and the journal is truncated. Replaying a journal over
+    a snapshot that already contains it gives the same result, so a crash
+    between the two steps loses nothing.
+    """
+
+    def __init__(self, snapshot_path: str = FILE_STATUS_PATH, journal_path: Optional[str] = None,
+                 fsync_interval: float = FSYNC_INTERVAL, compact_threshold: int = COMPACT_THRESHOLD):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or f"{snapshot_path}.journal"
+        self.fsync_interval = fsync_interval
+        self.compact_threshold = max(1, compact_threshold)
+        self.stats = {"updates": 0, "fsyncs": 0, "compactions": 0, "replayed": 0}
+        self._statuses: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._journal = None
+        self._journal_entries = 0
+        self._dirty = threading.Event()
+        self._closed = False
+        self._load()
+        self._flusher = threading.Thread(target=self._flush_loop, name="status-fsync", daemon=True)
+        self._flusher.start()
+
+    def _load(self):
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, 'r') as f:
+                    self._statuses = json.load(f)
+            except Exception as e:
+                print(f"Ignoring unreadable status snapshot {self.snapshot_path}: {str(e)}")
+                self._statuses = {}
+
+        # Replay changes made after the last compaction
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'rb+') as f:
+                data = f.read()
+                complete = data.rfind(b"\n") + 1
+                if complete < len(data):
+                    # Drop the partial last line of an interrupted append so new entries start on a fresh line
+                    f.truncate(complete)
+            for line in data[:complete].splitlines():
+                try:
+                    entry = json.loads(line)
+                    self._apply(entry["file"], entry["status"])
+                except (ValueError, KeyError, TypeError):
+                    # Skip lines that aren't a {"file": ..., "status": ...} object rather than refuse to start
+                    continue
+                self._journal_entries += 1
+            self.stats["replayed"] = self._journal_entries
+        self._journal = open(self.journal_path, 'a')
+
+    def _apply(self, filename: str, status: Optional[str]):
+        if status is None:
+            self._statuses.pop(filename, None)
+        else:
+            self._statuses[filename] = status
+
+    def get_all(self) -> Dict[str, str]:
+        """Return a copy of all statuses."""
+        with self._lock:
+            return dict(self._statuses)
+
+    def get(self, filename: str) -> Optional[str]:
+        """Return the status of one file, or None."""
+        with self._lock:
+            return self._statuses.get(filename)
+
+    def set_many(self, updates: Dict[str, Optional[str]]):
+        """
+        Change the status of several files.
+
+        Args:
+            updates: Dict mapping filename to its new status (None removes it)
+        """
+        if not updates:
+            return
+        lines = "".join(json.dumps({"file": f, "status": s}) + "\n" for f, s in updates.items())
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Status store is closed")
+            self._journal.write(lines)
+            self._journal.flush()
+            for filename, status in updates.items():
+                self._apply(filename, status)
+            self._journal_entries += len(updates)
+            self.stats["updates"] += len(updates)
+            if self._journal_entries >= self.compact_threshold:
+                self._compact_locked()
+        self._dirty.set()
+
+    def set(self, filenames: List[str], status: Optional[str]):
+        """Set the same status for several files."""
+        self.set_many({filename: status for filename in filenames})
+
+    def _compact_locked(self):
+        # Called with self._lock held
+        write_json_atomic(self.snapshot_path, self._statuses)
+        self._journal.truncate(0)
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._journal_entries = 0
+        self.stats["compactions"] += 1
+
+    def compact(self):
+        """Write all statuses to the snapshot file and empty the journal."""
+        with self._lock:
+            if not self._closed:
+                self._compact_locked()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._dirty.wait()
+            # Let more changes arrive so they share this fsync
+            time.sleep(self.fsync_interval)
+            self._dirty.clear()
+            with self._lock:
+                if self._closed:
+                    break
+                os.fsync(self._journal.fileno())
+                self.stats["fsyncs"] += 1
+
+    def close(self, compact: bool = True):
+        """Flush pending changes (compacting them into the snapshot by default) and close the journal."""
+        with self._lock:
+            if self._closed:
+                return
+            if compact:
+                self._compact_locked()
+            else:
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+            self._closed = True
+            self._journal.close()
+        self._dirty.set()  # Wake the flusher so it exits
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return status count, journal size and counters."""
+        with self._lock:
+            return {"statuses": len(self._statuses), "journal_entries": self._journal_entries, **self.stats}
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+
+import change_log
+
+
+def test_collects_keys_changed_since_a_sequence_number():
+    log = change_log.ChangeLog()
+    start = log.seq
+    log.record("image", ["a.jpg", "b.jpg"])
+    middle = log.record("status", ["a.jpg"])
+    last = log.record("classes")
+
+    assert last == start + 4 == log.seq
+    changed = log.changes_since(start)
+    assert changed == {"image": {"a.jpg", "b.jpg"}, "annotation": set(), "status": {"a.jpg"}, "classes": {None}}
+    assert log.changes_since(middle) == {"image": set(), "annotation": set(), "status": set(), "classes": {None}}
+    assert log.changes_since(last) == {kind: set() for kind in change_log.CHANGE_KINDS}
+
+
+def test_clients_behind_the_log_or_from_another_run_must_reload():
+    log = change_log.ChangeLog(max_entries=2)
+    start = log.seq
+    log.record("annotation", ["a", "b", "c"])
+
+    # The change after `start` has been evicted
+    assert log.changes_since(start) is None
+    assert log.changes_since(start + 1) == {"image": set(), "annotation": {"b", "c"}, "status": set(), "classes": set()}
+    # A number from a later (or earlier) server run
+    assert log.changes_since(log.seq + 1) is None
+    assert log.changes_since(0) is None
+
+
+def test_wait_returns_at_once_or_on_timeout():
+    log = change_log.ChangeLog()
+    start = log.seq
+    log.record("image", ["a.jpg"])
+
+    async def main():
+        assert await log.wait(start, timeout=5)
+        assert not await log.wait(log.seq, timeout=0.01)
+        assert not log._waiters
+
+    asyncio.run(main())
+
+
+def test_record_from_another_thread_wakes_waiters():
+    log = change_log.ChangeLog()
+    since = log.seq
+
+    async def main():
+        waiters = [asyncio.ensure_future(log.wait(since, timeout=5)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        thread = threading.Thread(target=log.record, args=("status", ["a.jpg"]))
+        thread.start()
+        woken = await asyncio.wait_for(asyncio.gather(*waiters), 2)
+        thread.join()
+        return woken
+
+    assert asyncio.run(main()) == [True, True, True]
+    assert log.changes_since(since)["status"] == {"a.jpg"}
@@ -0,0 +1,106 @@
+import importlib
+import json
+import os
+import sys
+
+import pytest
+
+import class_store
+
+
+def make_store(tmp_path):
+    return class_store.ClassStore(str(tmp_path / "classes.json"))
+
+
+def bump_mtime(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_creates_default_classes(tmp_path):
+    store = make_store(tmp_path)
+
+    assert store.load() == class_store.DEFAULT_CLASSES
+    assert json.loads((tmp_path / "classes.json").read_text()) == class_store.DEFAULT_CLASSES
+
+
+def test_etag_changes_only_with_the_class_list(tmp_path):
+    store = make_store(tmp_path)
+    data, etag = store.serialized()
+    assert store.serialized() == (data, etag)
+    assert store.serialized()[0] is data  # Serialized once per version
+
+    classes = store.load()
+    classes.append({"name": "car", "instructions": ""})
+    assert store.serialized()[1] == etag  # Editing the copy changes nothing
+
+    store.save(classes)
+    data, new_etag = store.serialized()
+    assert new_etag != etag
+    assert json.loads(data) == classes
+
+
+def test_picks_up_edits_to_the_file(tmp_path):
+    store = make_store(tmp_path)
+    _, etag = store.serialized()
+
+    path = tmp_path / "classes.json"
+    path.write_text(json.dumps(["person", {"name": "car", "instructions": "Whole vehicle"}]))
+    bump_mtime(path)
+    data, new_etag = store.serialized()
+
+    assert new_etag != etag
+    assert json.loads(data) == [{"name": "person", "instructions": ""}, {"name": "car", "instructions": "Whole vehicle"}]
+    assert store.version == 2
+
+
+def test_etags_differ_between_server_runs(tmp_path):
+    first = make_store(tmp_path)
+    first.load()
+    second = make_store(tmp_path)
+    second.load()
+
+    # Both at version 1, yet a client must not revalidate one run's list against the other
+    assert first.version == second.version == 1
+    assert first.serialized()[1] != second.serialized()[1]
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    pytest.importorskip("PIL")
+    from fastapi.testclient import TestClient
+
+    # app keeps its folders and files in the working directory
+    workdir = tmp_path_factory.mktemp("server")
+    os.symlink(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static_pages"),
+               workdir / "static_pages")
+    cwd = os.getcwd()
+    patch = pytest.MonkeyPatch()
+    patch.setenv("YOLOLABEL_ENABLE_ML", "0")
+    os.chdir(workdir)
+    try:
+        app = importlib.import_module("app")
+        yield TestClient(app.app)
+    finally:
+        os.chdir(cwd)
+        patch.undo()
+        sys.modules.pop("app", None)
+
+
+def test_classes_endpoint_answers_304_for_current_etag(client):
+    response = client.get("/classes")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    assert client.get("/classes", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/classes", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    assert client.get("/classes", headers={"If-None-Match": "*"}).status_code == 304
+    assert client.get("/classes", headers={"If-None-Match": '"other"'}).status_code == 200
+
+    assert client.post("/classes", json={"class_name": "car"}).status_code == 200
+    response = client.get("/classes", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert [c["name"] for c in response.json()][-1] == "car"
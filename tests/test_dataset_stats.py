@@ -0,0 +1,91 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+import annotation_store
+import dataset_stats
+
+
+def box(class_id, x=0.5, y=0.5, w=0.2, h=0.1):
+    return {"class": class_id, "x_center": x, "y_center": y, "width": w, "height": h}
+
+
+@pytest.fixture
+def store(tmp_path):
+    (tmp_path / "annotations").mkdir()
+    store = annotation_store.AnnotationStore(str(tmp_path / "annotations"), db_path=str(tmp_path / "index.sqlite3"))
+    store.save("a", [box(0), box(0, x=0.1), box(1)])
+    store.save("b", [box(1, y=0.9)])
+    store.save("c", [])
+    return store
+
+
+def make_stats(store):
+    stats = dataset_stats.DatasetStats(store, image_width=640, image_height=640)
+    store.on_change = stats.mark_changed
+    return stats
+
+
+def test_counts_boxes_and_images(store):
+    result = make_stats(store).compute()
+
+    assert result["total_boxes"] == 4
+    assert result["annotated_images"] == 3
+    assert result["images_with_boxes"] == 2
+    assert result["class_counts"] == [2, 2]
+    assert result["images_per_class"] == [1, 2]
+    assert result["boxes_per_image"]["counts"] == [1, 1, 0, 1]
+    assert sum(map(sum, result["heatmap"])) == 4
+
+    only_class_1 = make_stats(store).compute(class_id=1)
+    assert only_class_1["total_boxes"] == 2
+    assert only_class_1["images_with_boxes"] == 2
+
+
+def test_applies_saved_annotations_incrementally(store):
+    stats = make_stats(store)
+    first = stats.compute()
+    assert stats.compute() is first
+    assert stats.get_stats()["cache_hits"] == 1
+
+    store.save("a", [box(2)])
+    store.save("d", [box(0), box(0)])
+    result = stats.compute()
+
+    assert stats.get_stats()["loads"] == 1
+    assert stats.get_stats()["incremental_updates"] == 1
+    assert result["version"] == first["version"] + 1
+    assert result["class_counts"] == [2, 1, 1]
+    assert result["images_per_class"] == [1, 1, 1]
+    assert result["annotated_images"] == 4
+    # The incremental result matches loading everything again
+    fresh = make_stats(store).compute()
+    for key in ("total_boxes", "class_counts", "images_per_class", "boxes_per_image", "box_width", "heatmap"):
+        assert result[key] == fresh[key]
+
+
+def test_skips_negative_class_ids(store, tmp_path):
+    # A hand-edited file with a negative class id
+    (tmp_path / "annotations" / "e.txt").write_text("-1 0.5 0.5 0.1 0.1\n0 0.5 0.5 0.1 0.1\n")
+    store.sync()
+    stats = make_stats(store)
+
+    result = stats.compute()
+    assert result["total_boxes"] == 5
+    assert result["class_counts"] == [3, 2]
+    assert stats.get_stats()["invalid_boxes"] == 1
+
+    store.save("b", [box(-2), box(1)])
+    assert stats.compute()["class_counts"] == [3, 2]
+    assert stats.get_stats()["invalid_boxes"] == 2
+
+
+def test_keeps_large_image_ids_exact():
+    # float32 cannot tell these ids apart; the id array must
+    rows = [(2 ** 24, 0, 0.5, 0.5, 0.1, 0.1), (2 ** 24 + 1, 3, 0.5, 0.5, 0.1, 0.1)]
+    ids, coords, invalid = dataset_stats.split_rows(rows)
+
+    assert ids.tolist() == [[2 ** 24, 0], [2 ** 24 + 1, 3]]
+    assert coords.dtype == np.float32 and coords.shape == (2, 4)
+    assert invalid == 0
+    assert dataset_stats.split_rows([])[0].shape == (0, 2)
@@ -0,0 +1,114 @@
+import os
+
+import pytest
+
+import file_index
+
+
+def write(folder, name, size, mtime):
+    path = folder / name
+    path.write_bytes(b"x" * size)
+    os.utime(path, ns=(mtime * 1_000_000_000, mtime * 1_000_000_000))
+
+
+def bump_folder_mtime(folder):
+    st = os.stat(folder)
+    os.utime(folder, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def index(tmp_path):
+    folder = tmp_path / "images"
+    folder.mkdir()
+    # name, size, mtime
+    for name, size, mtime in [("a.jpg", 30, 5), ("b.jpg", 10, 1), ("c.png", 20, 3), ("d.jpg", 10, 4), ("e.png", 50, 2)]:
+        write(folder, name, size, mtime)
+    (folder / "subfolder").mkdir()
+    index = file_index.FileIndex(str(folder))
+    index.refresh()
+    return index
+
+
+def all_pages(index, limit, **kwargs):
+    files, cursor = [], None
+    while True:
+        page = index.page(cursor=cursor, limit=limit, **kwargs)
+        files.extend(page["files"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return files
+
+
+@pytest.mark.parametrize("sort,expected", [
+    ("name", ["a.jpg", "b.jpg", "c.png", "d.jpg", "e.png"]),
+    ("mtime", ["b.jpg", "e.png", "c.png", "d.jpg", "a.jpg"]),
+    ("size", ["b.jpg", "d.jpg", "c.png", "a.jpg", "e.png"]),  # Ties ordered by name
+])
+def test_pages_cover_the_sorted_list(index, sort, expected):
+    assert index.page(sort)["files"] == expected
+    for limit in (1, 2, 5):
+        assert all_pages(index, limit, sort=sort) == expected
+        assert all_pages(index, limit, sort=sort, descending=True) == expected[::-1]
+
+    page = index.page(sort, limit=2)
+    assert page["total"] == 5 and len(page["files"]) == 2
+    assert index.page(sort, limit=5)["next_cursor"] is None
+
+
+def test_predicate_filters_before_paging(index):
+    jpgs = lambda name: name.endswith(".jpg")
+    page = index.page("size", limit=2, predicate=jpgs)
+
+    assert page["files"] == ["b.jpg", "d.jpg"]
+    assert page["total"] == 3
+    assert all_pages(index, 2, sort="size", predicate=jpgs) == ["b.jpg", "d.jpg", "a.jpg"]
+
+
+def test_cursor_stays_valid_when_files_change(index, tmp_path):
+    folder = tmp_path / "images"
+    first = index.page("name", limit=2)
+
+    # The file the cursor points at is removed and new files appear before and after it
+    os.remove(folder / "b.jpg")
+    write(folder, "aa.jpg", 1, 6)
+    write(folder, "bb.jpg", 1, 6)
+    bump_folder_mtime(folder)
+    index.refresh()
+
+    assert index.page("name", cursor=first["next_cursor"])["files"] == ["bb.jpg", "c.png", "d.jpg", "e.png"]
+    assert index.get_stats()["files"] == 6
+
+
+def test_rejects_bad_cursors(index):
+    with pytest.raises(ValueError):
+        index.page("name", cursor="not a cursor")
+    with pytest.raises(ValueError):
+        index.page("name", cursor=file_index.encode_cursor(([1], "a.jpg")))
+    # A cursor from a listing with another sort key
+    size_cursor = index.page("size", limit=1)["next_cursor"]
+    with pytest.raises(ValueError):
+        index.page("name", cursor=size_cursor)
+    with pytest.raises(ValueError):
+        index.page("date")
+
+
+def test_rescans_only_when_the_folder_changes(index, tmp_path):
+    folder = tmp_path / "images"
+    version = index.version
+    index.refresh()
+    assert index.get_stats()["scans"] == 1
+
+    # Overwritten in place: not seen by refresh(), reported with update()
+    write(folder, "a.jpg", 100, 9)
+    index.refresh()
+    assert index.page("size")["files"][-1] == "e.png"
+
+    index.update(["a.jpg", "b.jpg"])
+    assert index.page("size")["files"][-1] == "a.jpg"
+    assert index.version == version + 1
+    assert index.get_stats()["updated"] == 1
+
+    os.remove(folder / "c.png")
+    index.update(["c.png"])
+    assert "c.png" not in index.names()
+    assert index.get_stats()["scans"] == 1
@@ -0,0 +1,53 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("ultralytics")
+import yolo_predict
+from onnx_backend import OnnxBoxes, OnnxResult
+
+
+def make_result(xyxy, conf, cls, path="a.jpg"):
+    boxes = OnnxBoxes(np.array(xyxy, dtype=np.float32).reshape(-1, 4), np.array(conf, dtype=np.float32),
+                      np.array(cls, dtype=np.float32))
+    return OnnxResult(path, (480, 640), boxes, {0: "person", 1: "car"}, {"inference": 12.5})
+
+
+def test_columnar_and_row_layouts_hold_the_same_boxes():
+    results = [
+        make_result([[0, 0, 64, 48], [320, 240, 640, 480]], [0.9, 0.5], [0, 1]),
+        make_result([], [], [], path="b.jpg"),
+    ]
+    columnar = yolo_predict.format_results(results, columnar=True)
+    rows = yolo_predict.format_results(results)
+
+    assert set(columnar[0]["boxes"]) == set(yolo_predict.BOX_FIELDS)
+    assert yolo_predict.columns_to_rows(columnar[0]["boxes"]) == rows[0]["boxes"]
+    assert yolo_predict.rows_to_columns(rows[0]["boxes"]) == columnar[0]["boxes"]
+    assert columnar[1]["boxes"] == {field: [] for field in yolo_predict.BOX_FIELDS}
+    assert rows[1]["boxes"] == []
+    for key in ("image_width", "image_height", "image_path", "prediction_time"):
+        assert columnar[0][key] == rows[0][key]
+
+
+def test_boxes_are_centered_and_normalized():
+    box = yolo_predict.format_results([make_result([[320, 240, 640, 480]], [0.5], [1])])[0]["boxes"][0]
+
+    assert (box["class"], box["name"]) == (1, "car")
+    assert box["confidence"] == pytest.approx(0.5)
+    assert (box["x_center"], box["y_center"], box["width"], box["height"]) == pytest.approx((0.75, 0.75, 0.5, 0.5))
+    assert (box["x1"], box["y1"], box["x2"], box["y2"]) == pytest.approx((320, 240, 640, 480))
+
+
+def test_unknown_class_ids_get_a_placeholder_name():
+    columns = yolo_predict.box_columns([[0, 0, 1, 1]], [0.3], [7], {0: "person"}, 10, 10)
+    assert columns["name"] == ["Class 7"]
+
+
+def test_convert_boxes_format():
+    rows = yolo_predict.format_results([make_result([[0, 0, 64, 48]], [0.9], [0])])[0]
+
+    assert yolo_predict.convert_boxes_format(rows, columnar=False) is rows
+    columnar = yolo_predict.convert_boxes_format(rows, columnar=True)
+    assert columnar["boxes"]["confidence"] == [rows["boxes"][0]["confidence"]]
+    assert yolo_predict.convert_boxes_format(columnar, columnar=False) == rows
+    assert isinstance(rows["boxes"], list)
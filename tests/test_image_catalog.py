@@ -0,0 +1,107 @@
+import os
+import threading
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+import image_catalog
+
+
+def make_image(path, size=(8, 6), color=(255, 0, 0)):
+    Image.new("RGB", size, color).save(path)
+
+
+def make_catalog(tmp_path, **kwargs):
+    return image_catalog.ImageCatalog(str(tmp_path / "images"), snapshot_path=str(tmp_path / "catalog.json"), **kwargs)
+
+
+@pytest.fixture
+def folder(tmp_path):
+    (tmp_path / "images").mkdir()
+    make_image(tmp_path / "images" / "a.png")
+    make_image(tmp_path / "images" / "b.png", size=(4, 4))
+    (tmp_path / "images" / "notes.txt").write_text("not an image")
+    return tmp_path
+
+
+def by_name(entries):
+    return {entry["name"]: entry for entry in entries}
+
+
+def test_describes_images(folder):
+    catalog = make_catalog(folder, annotated_stems=lambda: {"a"})
+    catalog.refresh()
+    entries = by_name(catalog.entries())
+
+    assert sorted(entries) == ["a.png", "b.png"]
+    assert (entries["a.png"]["width"], entries["a.png"]["height"]) == (8, 6)
+    assert entries["a.png"]["has_annotation"] and not entries["b.png"]["has_annotation"]
+    assert entries["a.png"]["hash"] != entries["b.png"]["hash"]
+    assert catalog.get_stats()["described"] == 2
+
+
+def test_redescribes_only_images_whose_mtime_or_size_changed(folder):
+    catalog = make_catalog(folder)
+    catalog.poll()
+    old = by_name(catalog.entries())
+    assert catalog.get_stats()["described"] == 3  # poll() also hashes notes.txt
+
+    # Overwritten in place: the folder mtime does not change, poll() finds it by its signature
+    make_image(folder / "images" / "a.png", size=(16, 9))
+    st = os.stat(folder / "images" / "a.png")
+    os.utime(folder / "images" / "a.png", ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert catalog.poll() == {"added": 0, "changed": 1, "removed": 0}
+
+    entries = by_name(catalog.entries())
+    assert (entries["a.png"]["width"], entries["a.png"]["height"]) == (16, 9)
+    assert entries["a.png"]["hash"] != old["a.png"]["hash"]
+    assert entries["b.png"] == old["b.png"]
+    assert catalog.get_stats()["described"] == 4
+
+
+def test_snapshot_skips_unchanged_images_after_restart(folder):
+    catalog = make_catalog(folder)
+    catalog.poll()
+    expected = catalog.entries()
+    catalog.close()
+
+    make_image(folder / "images" / "c.png")
+    reopened = make_catalog(folder)
+    assert reopened.get_stats()["loaded"] == 3
+    assert reopened.poll()["added"] == 1
+    assert reopened.get_stats()["described"] == 1
+    assert [entry for entry in reopened.entries() if entry["name"] != "c.png"] == expected
+
+
+def test_entries_without_describe_do_not_read_images(folder):
+    catalog = make_catalog(folder)
+    catalog.refresh()
+    entries = by_name(catalog.entries(describe=False))
+
+    assert entries["a.png"]["hash"] is None and entries["a.png"]["size"] > 0
+    assert catalog.get_stats()["described"] == 0
+
+
+def test_close_stops_a_running_describe_pass(folder, monkeypatch):
+    for i in range(20):
+        make_image(folder / "images" / f"img{i}.png")
+    catalog = make_catalog(folder)
+    catalog.refresh()
+
+    started = threading.Event()
+    describe_image = image_catalog.describe_image
+
+    def slow_describe(path):
+        started.set()
+        catalog._stop.wait(5)
+        return describe_image(path)
+
+    monkeypatch.setattr(image_catalog, "describe_image", slow_describe)
+    worker = threading.Thread(target=catalog.describe_missing)
+    worker.start()
+    started.wait(5)
+    catalog.close(timeout=5)
+    worker.join(5)
+
+    assert not worker.is_alive()
+    assert catalog.get_stats()["described"] == 1
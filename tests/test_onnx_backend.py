@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+pytest.importorskip("onnxruntime")
+ultralytics = pytest.importorskip("ultralytics")
+import yolo_predict
+
+# ONNX letterboxes to a fixed square input while ultralytics pads to a multiple
+# of the stride, so boxes and scores differ slightly between the backends
+MIN_IOU = 0.9  # Lowest IoU between a PyTorch box and its ONNX counterpart
+MAX_CONF_DIFF = 0.05  # Largest confidence difference of a matched pair
+MAX_UNMATCHED = 1  # Boxes per backend allowed to be missing (scores right at the threshold)
+
+
+@pytest.fixture(scope="module")
+def model_path(tmp_path_factory):
+    # The weights are downloaded into the working directory; the ONNX export is written next to them
+    folder = tmp_path_factory.mktemp("model")
+    cwd = os.getcwd()
+    os.chdir(folder)
+    try:
+        ultralytics.YOLO(yolo_predict.DEFAULT_MODEL)
+    finally:
+        os.chdir(cwd)
+    return str(folder / yolo_predict.DEFAULT_MODEL)
+
+
+def test_onnx_matches_torch(model_path):
+    image_path = str(ultralytics.utils.ASSETS / "bus.jpg")
+    comparison = yolo_predict.compare_backends(image_path, conf=yolo_predict.CONFIDENCE_THRESHOLD, model_path=model_path)
+
+    assert comparison["torch_boxes"] > 0
+    assert comparison["torch_boxes"] - comparison["matched"] <= MAX_UNMATCHED
+    assert comparison["onnx_boxes"] - comparison["matched"] <= MAX_UNMATCHED
+    assert comparison["min_iou"] >= MIN_IOU
+    assert comparison["max_conf_diff"] <= MAX_CONF_DIFF
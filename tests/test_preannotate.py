@@ -0,0 +1,82 @@
+import os
+import json
+
+import pytest
+
+pytest.importorskip("ultralytics")
+import preannotate
+import yolo_predict
+
+
+BOX = {"class": 0, "name": "cat", "confidence": 0.9, "x_center": 0.5, "y_center": 0.5, "width": 0.2, "height": 0.2}
+
+
+class Crash(Exception):
+    pass
+
+
+def make_job(tmp_path, update_statuses, **kwargs):
+    return preannotate.PreannotationJob(
+        images_folder=str(tmp_path / "images"),
+        annotations_folder=str(tmp_path / "annotations"),
+        checkpoint_path=str(tmp_path / "checkpoint.json"),
+        class_names=["cat"],
+        update_statuses=update_statuses,
+        batch_size=2,
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def images(tmp_path, monkeypatch):
+    (tmp_path / "images").mkdir()
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        (tmp_path / "images" / name).write_bytes(b"")
+
+    # b.jpg has no detections, the others get one box
+    def predict_batch(paths, batch_size=None, conf=None):
+        return [{"boxes": [] if path.endswith("b.jpg") else [dict(BOX)]} for path in paths]
+
+    monkeypatch.setattr(yolo_predict, "predict_batch", predict_batch)
+    return tmp_path
+
+
+def test_writes_labels_and_flags_images(images):
+    flagged = []
+    final = make_job(images, lambda files, status: flagged.extend(files)).run()
+
+    assert final["state"] == "completed"
+    assert (final["written"], final["empty"], final["errors"]) == (2, 1, 0)
+    assert sorted(flagged) == ["a.jpg", "c.jpg"]
+    assert (images / "annotations" / "b.txt").read_text() == ""
+    assert (images / "annotations" / "a.txt").read_text().startswith("0 0.5")
+
+
+def test_resume_flags_labels_written_before_crash(images):
+    def crash(files, status):
+        raise Crash()
+
+    # The first batch's labels are on disk but the job dies before flagging them
+    final = make_job(images, crash).run()
+    assert final["state"] == "failed"
+    assert (images / "annotations" / "a.txt").exists()
+    with open(images / "checkpoint.json") as f:
+        assert json.load(f)["pending"] == {"review": ["a.jpg"], "empty": ["b.jpg"]}
+
+    flagged = []
+    final = make_job(images, lambda files, status: flagged.extend(files)).run()
+    assert final["state"] == "completed"
+    assert final["resumed"]
+    assert sorted(flagged) == ["a.jpg", "c.jpg"]
+    assert (final["written"], final["empty"], final["processed"]) == (2, 1, 3)
+
+
+def test_keeps_labels_saved_by_annotator(images):
+    os.makedirs(images / "annotations")
+    (images / "annotations" / "a.txt").write_text("0 0.1 0.1 0.1 0.1\n")
+
+    flagged = []
+    final = make_job(images, lambda files, status: flagged.extend(files)).run()
+    assert flagged == ["c.jpg"]
+    assert final["total"] == 2
+    assert (images / "annotations" / "a.txt").read_text() == "0 0.1 0.1 0.1 0.1\n"
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("ultralytics")
+import predict_scheduler
+
+
+def test_rejects_requests_beyond_max_pending():
+    executor = predict_scheduler.InferenceExecutor(workers=1, max_pending=2)
+
+    with executor.admit(), executor.admit():
+        with pytest.raises(predict_scheduler.QueueFullError) as error:
+            with executor.admit():
+                pass
+        assert error.value.retry_after >= 1
+        assert executor.get_stats()["pending_requests"] == 2
+
+    # Finished requests free their slot, also when they fail
+    with pytest.raises(ValueError):
+        with executor.admit(), executor.admit():
+            raise ValueError("prediction failed")
+    with executor.admit():
+        pass
+
+    stats = executor.get_stats()
+    assert (stats["admitted"], stats["rejected"], stats["max_pending_seen"]) == (5, 1, 2)
+    assert stats["pending_requests"] == 0
+
+
+def test_retry_after_follows_backlog_and_run_time():
+    executor = predict_scheduler.InferenceExecutor(workers=2, max_pending=10)
+    for _ in range(4):
+        executor.run_histogram.observe(3000.0)
+
+    with executor.admit(), executor.admit(), executor.admit():
+        # Three requests of 3 s each on two workers
+        assert executor.retry_after() == 5
+    assert executor.retry_after() == 1
+
+
+def test_runs_work_off_the_event_loop():
+    executor = predict_scheduler.InferenceExecutor(workers=1, max_pending=4)
+    release = threading.Event()
+
+    async def main():
+        loop_thread = threading.get_ident()
+        blocked = asyncio.ensure_future(executor.run(lambda: (release.wait(5), threading.get_ident())[1]))
+        queued = asyncio.ensure_future(executor.run(lambda a, b: a + b, 1, 2))
+        await asyncio.sleep(0.05)
+
+        # The loop keeps running while the only worker is busy
+        stats = executor.get_stats()
+        assert (stats["running_tasks"], stats["queued_tasks"]) == (1, 1)
+        release.set()
+        worker_thread, total = await asyncio.gather(blocked, queued)
+        assert worker_thread != loop_thread
+        assert total == 3
+
+    asyncio.run(main())
+    stats = executor.get_stats()
+    assert stats["tasks"] == 2
+    assert (stats["running_tasks"], stats["queued_tasks"]) == (0, 0)
+    assert stats["run_ms_histogram"]["count"] == 2
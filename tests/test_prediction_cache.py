@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+pytest.importorskip("ultralytics")
+import yolo_predict
+
+
+RESULT = {"boxes": {"class": [0], "confidence": [0.9]}, "image_width": 640, "image_height": 480}
+
+
+def touch(path, content):
+    path.write_bytes(content)
+    # Give every write its own mtime, like edits seconds apart
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    return str(path)
+
+
+@pytest.fixture
+def files(tmp_path):
+    return {
+        "image": touch(tmp_path / "a.jpg", b"image one"),
+        "model": touch(tmp_path / "best.pt", b"weights one"),
+    }
+
+
+def key(files, conf=yolo_predict.RAW_CONFIDENCE_FLOOR, **kwargs):
+    return yolo_predict.prediction_cache_key(files["image"], conf, model_path=files["model"], **kwargs)
+
+
+def test_key_changes_with_image_model_threshold_and_backend(files, tmp_path):
+    base = key(files)
+    assert key(files) == base
+    assert key(files, conf=0.25) != base
+    assert key(files, backend="onnx") != base
+
+    # Same content under another name (or rewritten unchanged) gives the same key
+    copy = touch(tmp_path / "b.jpg", b"image one")
+    assert yolo_predict.prediction_cache_key(copy, yolo_predict.RAW_CONFIDENCE_FLOOR, model_path=files["model"]) == base
+
+    touch(tmp_path / "a.jpg", b"image two")
+    assert key(files) != base
+    touch(tmp_path / "a.jpg", b"image one")
+    touch(tmp_path / "best.pt", b"weights two")
+    assert key(files) != base
+
+
+def test_memo_only_key_needs_hashed_files(files):
+    assert key(files, memo_only=True) is None
+    full = key(files)
+    assert key(files, memo_only=True) == full
+
+
+def test_raw_results_are_keyed_by_box_limit(files, monkeypatch):
+    raw = key(files)
+    monkeypatch.setattr(yolo_predict, "RAW_MAX_DETECTIONS", 1000)
+    assert key(files) != raw
+    assert key(files, conf=0.25) == key(files, conf=0.25)
+
+
+def test_cache_survives_restart_and_copies_results(tmp_path):
+    cache = yolo_predict.PredictionCache(str(tmp_path / "cache"), max_memory_entries=2)
+    cache_key = yolo_predict.PredictionCache.make_key("image", "model", 0.01)
+    assert cache.get(cache_key) is None
+
+    cache.put(cache_key, RESULT)
+    hit = cache.get(cache_key)
+    assert hit == RESULT
+    hit["boxes"]["class"].append(1)
+    assert cache.get(cache_key) == RESULT
+    assert cache.get_stats()["memory_hits"] == 2
+
+    reopened = yolo_predict.PredictionCache(str(tmp_path / "cache"))
+    assert reopened.peek(cache_key) is None
+    assert reopened.get(cache_key) == RESULT
+    assert reopened.get_stats()["disk_hits"] == 1
+    assert reopened.peek(cache_key) == RESULT
+
+
+def test_memory_tier_is_bounded(tmp_path):
+    cache = yolo_predict.PredictionCache(str(tmp_path / "cache"), max_memory_entries=2)
+    keys = [yolo_predict.PredictionCache.make_key(f"image{i}", "model", 0.01) for i in range(3)]
+    for cache_key in keys:
+        cache.put(cache_key, RESULT)
+
+    assert cache.get_stats()["memory_entries"] == 2
+    assert cache.peek(keys[0]) is None
+    assert cache.get(keys[0]) == RESULT  # Still on disk
+
+    cache.clear()
+    assert cache.get(keys[1]) is None
+
+
+def test_visualization_cache_remembers_its_source():
+    cache = yolo_predict.VisualizationCache(max_bytes=10)
+    etag = cache.put("a_visualization.jpg", b"12345", source="key|0.25|")
+
+    assert cache.get("a_visualization.jpg") == (b"12345", etag)
+    assert cache.rendered_from("a_visualization.jpg", "key|0.25|")
+    assert not cache.rendered_from("a_visualization.jpg", "key|0.5|")
+
+    cache.put("b_visualization.jpg", b"123456")
+    assert cache.get("a_visualization.jpg") is None
+    assert not cache.rendered_from("a_visualization.jpg", "key|0.25|")
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("ultralytics")
+import onnx_backend
+import yolo_predict
+
+
+NAMES = {0: "person", 1: "car", 2: "dog"}
+
+
+def head_output(scores, classes, num_classes=3):
+    """Detection head output with one non-overlapping 8x8 box per score, laid out on a grid."""
+    count = len(scores)
+    grid = int(np.ceil(np.sqrt(count)))
+    output = np.zeros((4 + num_classes, count), dtype=np.float32)
+    output[0] = (np.arange(count) % grid) * 10 + 5
+    output[1] = (np.arange(count) // grid) * 10 + 5
+    output[2:4] = 8
+    output[4 + np.asarray(classes), np.arange(count)] = scores
+    return output
+
+
+def predict(output, conf):
+    """Decode a head output at a threshold, like the model would predict at it."""
+    xyxy, scores, class_ids = onnx_backend.decode_predictions(output, conf, max_det=yolo_predict.max_detections(conf))
+    return {"boxes": yolo_predict.box_columns(xyxy, scores, class_ids, NAMES, 640, 640)}
+
+
+@pytest.fixture
+def crowded():
+    rng = np.random.default_rng(0)
+    return head_output(rng.uniform(0.0, 1.0, 2000).astype(np.float32), rng.integers(0, 3, 2000))
+
+
+@pytest.mark.parametrize("conf", [0.05, 0.25, 0.5, 0.9])
+def test_filter_matches_prediction_at_threshold(crowded, conf):
+    raw = predict(crowded, yolo_predict.RAW_CONFIDENCE_FLOOR)
+    direct = predict(crowded, conf)
+
+    assert yolo_predict.filter_is_exact(raw, conf)
+    filtered = yolo_predict.filter_predictions(raw, conf, columnar=True)
+    assert filtered["boxes"] == direct["boxes"]
+    assert len(filtered["boxes"]["confidence"]) <= yolo_predict.MAX_DETECTIONS
+
+
+@pytest.mark.parametrize("conf", [0.05, 0.5, 0.9])
+def test_filter_matches_prediction_when_raw_result_is_full(crowded, conf, monkeypatch):
+    monkeypatch.setattr(yolo_predict, "RAW_MAX_DETECTIONS", 500)
+    raw = predict(crowded, yolo_predict.RAW_CONFIDENCE_FLOOR)
+    assert len(raw["boxes"]["confidence"]) == 500
+
+    assert yolo_predict.filter_is_exact(raw, conf)
+    assert yolo_predict.filter_predictions(raw, conf, columnar=True)["boxes"] == predict(crowded, conf)["boxes"]
+
+
+def test_full_raw_result_is_not_exact_for_low_class_threshold(monkeypatch):
+    monkeypatch.setattr(yolo_predict, "RAW_MAX_DETECTIONS", 500)
+    rng = np.random.default_rng(1)
+    # Many confident people and a few faint dogs that the raw result has no room for
+    scores = np.concatenate([rng.uniform(0.5, 1.0, 1000), rng.uniform(0.02, 0.05, 10)]).astype(np.float32)
+    classes = np.concatenate([np.zeros(1000, dtype=np.int64), np.full(10, 2)])
+    raw = predict(head_output(scores, classes), yolo_predict.RAW_CONFIDENCE_FLOOR)
+
+    assert not yolo_predict.filter_is_exact(raw, 0.95, {"dog": 0.02})
+    assert yolo_predict.filter_is_exact(raw, 0.95)
+    assert yolo_predict.filter_is_exact(raw, 0.6, {"dog": 0.02})  # 300+ people pass, the cap hides the dogs anyway
+
+
+def test_parse_class_conf():
+    assert yolo_predict.parse_class_conf("person:0.5, 2:0.3,") == {"person": 0.5, 2: 0.3}
+    assert yolo_predict.parse_class_conf("traffic light:0.4") == {"traffic light": 0.4}
+    with pytest.raises(ValueError):
+        yolo_predict.parse_class_conf("person:high")
+
+
+def test_filter_with_class_thresholds():
+    detections = [(0, 0.9), (0, 0.4), (1, 0.3), (2, 0.2)]
+    raw = {
+        "image_width": 640,
+        "boxes": yolo_predict.columns_to_rows(yolo_predict.box_columns(
+            [[10.0 * i, 0.0, 10.0 * i + 8, 8.0] for i in range(len(detections))],
+            [score for _, score in detections], [class_id for class_id, _ in detections], NAMES, 640, 640,
+        )),
+    }
+    # By name, by id, and the default for classes without their own threshold
+    filtered = yolo_predict.filter_predictions(raw, conf=0.25, class_conf={"person": 0.5, 2: 0.1})
+    assert [box["confidence"] for box in filtered["boxes"]] == [0.9, 0.3, 0.2]
+    assert filtered["image_width"] == 640
+    assert len(raw["boxes"]) == 4
+
+    columns = yolo_predict.filter_predictions(raw, conf=0.35, columnar=True)["boxes"]
+    assert columns["confidence"] == [0.9, 0.4]
+    assert columns["name"] == ["person", "person"]
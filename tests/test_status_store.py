@@ -0,0 +1,71 @@
+import json
+
+import status_store
+
+
+def make_store(tmp_path, **kwargs):
+    return status_store.StatusStore(str(tmp_path / "file_statuses.json"), fsync_interval=0, **kwargs)
+
+
+def test_replays_journal_after_crash(tmp_path):
+    store = make_store(tmp_path)
+    store.set(["a.jpg", "b.jpg"], "DONE")
+    store.set_many({"a.jpg": "ATTENTION", "b.jpg": None})
+    store.close(compact=False)
+
+    reopened = make_store(tmp_path)
+    assert reopened.get_all() == {"a.jpg": "ATTENTION"}
+    assert reopened.get_stats()["replayed"] == 4
+    reopened.close()
+
+
+def test_truncates_torn_last_line(tmp_path):
+    store = make_store(tmp_path)
+    store.set(["a.jpg"], "DONE")
+    store.close(compact=False)
+    with open(store.journal_path, "a") as f:
+        f.write('{"file": "b.jpg", "sta')
+
+    reopened = make_store(tmp_path)
+    assert reopened.get_all() == {"a.jpg": "DONE"}
+    # New entries start on a fresh line instead of being glued to the torn one
+    reopened.set(["c.jpg"], "IN_PROGRESS")
+    reopened.close(compact=False)
+
+    assert make_store(tmp_path).get_all() == {"a.jpg": "DONE", "c.jpg": "IN_PROGRESS"}
+
+
+def test_skips_malformed_journal_lines(tmp_path):
+    journal = tmp_path / "file_statuses.json.journal"
+    journal.write_text(
+        '{"file": "a.jpg", "status": "DONE"}\n'
+        '{"file": "b.jpg"}\n'
+        '["not", "an", "object"]\n'
+        '42\n'
+        'not json\n'
+        '{"file": "c.jpg", "status": "ATTENTION"}\n'
+    )
+
+    store = make_store(tmp_path)
+    assert store.get_all() == {"a.jpg": "DONE", "c.jpg": "ATTENTION"}
+    store.close()
+
+
+def test_compacts_into_snapshot(tmp_path):
+    store = make_store(tmp_path, compact_threshold=3)
+    store.set(["a.jpg", "b.jpg"], "DONE")
+    assert store.get_stats()["compactions"] == 0
+    store.set(["c.jpg"], "ATTENTION")
+
+    assert store.get_stats()["compactions"] == 1
+    assert store.get_stats()["journal_entries"] == 0
+    with open(store.snapshot_path) as f:
+        assert json.load(f) == {"a.jpg": "DONE", "b.jpg": "DONE", "c.jpg": "ATTENTION"}
+    with open(store.journal_path) as f:
+        assert f.read() == ""
+
+    store.set(["a.jpg"], None)
+    store.close()
+    with open(store.snapshot_path) as f:
+        assert json.load(f) == {"b.jpg": "DONE", "c.jpg": "ATTENTION"}
+    assert make_store(tmp_path).get_all() == {"b.jpg": "DONE", "c.jpg": "ATTENTION"}
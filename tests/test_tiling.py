@@ -0,0 +1,101 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("ultralytics")
+import yolo_predict
+from onnx_backend import OnnxBoxes, OnnxResult
+
+
+@pytest.mark.parametrize("length,tile_size,overlap", [(640, 320, 0.5), (1000, 320, 0.2), (321, 320, 0.0), (5000, 640, 0.9)])
+def test_tiles_cover_the_axis(length, tile_size, overlap):
+    origins = yolo_predict.tile_origins(length, tile_size, overlap)
+
+    assert origins[0] == 0
+    assert origins[-1] + tile_size == length
+    assert origins == sorted(set(origins))
+    # No gaps between neighbouring tiles
+    assert all(b - a <= tile_size for a, b in zip(origins, origins[1:]))
+
+
+def test_small_axis_gets_one_tile():
+    assert yolo_predict.tile_origins(200, 320, 0.5) == [0]
+    assert yolo_predict.tile_origins(320, 320, 0.5) == [0]
+
+
+@pytest.mark.parametrize("overlap", [-0.1, 1.0, 1.5])
+def test_rejects_overlap_outside_range(overlap):
+    with pytest.raises(ValueError):
+        yolo_predict.tile_origins(1000, 320, overlap)
+
+
+class WhiteBoxModel:
+    """Detects the white pixels of each image as a person, and again as a less confident car."""
+
+    def __init__(self):
+        self.images = 0
+
+    def predict(self, source, conf, **kwargs):
+        results = []
+        for image in source:
+            self.images += 1
+            ys, xs = np.nonzero(image.min(axis=2) == 255)
+            if len(xs):
+                box = [xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]
+                boxes = OnnxBoxes(np.array([box, box], dtype=np.float32), np.array([0.9, 0.6], dtype=np.float32),
+                                  np.array([0, 1], dtype=np.float32))
+            else:
+                boxes = OnnxBoxes(np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32),
+                                  np.zeros(0, dtype=np.float32))
+            results.append(OnnxResult("", image.shape[:2], boxes, {0: "person", 1: "car"}, {}))
+        return results
+
+
+@pytest.fixture
+def model(monkeypatch):
+    model = WhiteBoxModel()
+    monkeypatch.setattr(yolo_predict, "get_model", lambda *args, **kwargs: model)
+    return model
+
+
+def test_merges_detections_across_tiles(tmp_path, model):
+    image = np.zeros((640, 640, 3), dtype=np.uint8)
+    # Inside the overlap of four tiles
+    image[200:260, 180:250] = 255
+    cv2.imwrite(str(tmp_path / "a.png"), image)
+
+    result = yolo_predict.predict_tiled(str(tmp_path / "a.png"), conf=0.25, tile_size=320, overlap=0.5,
+                                        batch_size=4, workers=2, backend="onnx", columnar=True)[0]
+
+    assert result["tiles"] == 9
+    assert model.images == 10  # Nine tiles and the whole image
+    # One box per class, in resized image pixels
+    boxes = result["boxes"]
+    assert sorted(boxes["name"]) == ["car", "person"]
+    person = boxes["name"].index("person")
+    assert boxes["confidence"][person] == pytest.approx(0.9)
+    assert [boxes[field][person] for field in ("x_center", "y_center", "width", "height")] == pytest.approx(
+        [215 / 640, 230 / 640, 70 / 640, 60 / 640])
+
+
+def test_maps_original_pixels_to_the_resized_image(tmp_path, model):
+    original = np.zeros((1280, 1280, 3), dtype=np.uint8)
+    original[200:320, 160:300] = 255
+    cv2.imwrite(str(tmp_path / "original.png"), original)
+    cv2.imwrite(str(tmp_path / "a.png"), cv2.resize(original, (640, 640), interpolation=cv2.INTER_NEAREST))
+
+    result = yolo_predict.predict_tiled(str(tmp_path / "a.png"), str(tmp_path / "original.png"), conf=0.25,
+                                        tile_size=640, overlap=0.25, include_full_image=False, backend="onnx")[0]
+
+    person = [box for box in result["boxes"] if box["name"] == "person"]
+    assert len(person) == 1
+    assert (result["image_width"], result["image_height"]) == (640, 640)
+    assert [person[0][field] for field in ("x_center", "y_center", "width", "height")] == pytest.approx(
+        [230 / 1280, 260 / 1280, 140 / 1280, 120 / 1280])
+
+
+def test_image_without_detections(tmp_path, model):
+    cv2.imwrite(str(tmp_path / "a.png"), np.zeros((640, 640, 3), dtype=np.uint8))
+
+    result = yolo_predict.predict_tiled(str(tmp_path / "a.png"), conf=0.25, tile_size=320, backend="onnx")[0]
+    assert result["boxes"] == []
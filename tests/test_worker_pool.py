@@ -0,0 +1,56 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("ultralytics")
+import worker_pool
+from multiprocessing import shared_memory
+
+
+@pytest.fixture
+def created_blocks(monkeypatch):
+    names = []
+    original = shared_memory.SharedMemory
+
+    def recording(*args, **kwargs):
+        shm = original(*args, **kwargs)
+        if kwargs.get("create"):
+            names.append(shm.name)
+        return shm
+
+    monkeypatch.setattr(worker_pool.shared_memory, "SharedMemory", recording)
+    return names
+
+
+def assert_unlinked(names):
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+
+def test_submit_without_workers_releases_shared_memory(created_blocks):
+    # Not started (or every worker retiring): nobody can take the task
+    pool = worker_pool.InferenceWorkerPool(num_workers=1)
+    image = np.zeros((4, 4, 3), dtype=np.uint8)
+
+    with pytest.raises(RuntimeError):
+        pool.submit_image(image, "x.jpg", model_path="model.pt")
+
+    assert len(created_blocks) == 1
+    assert_unlinked(created_blocks)
+    assert pool.get_stats()["pending_jobs"] == 0
+
+
+def test_failed_queue_put_releases_shared_memory(created_blocks):
+    pool = worker_pool.InferenceWorkerPool(num_workers=1)
+
+    class BrokenQueue:
+        def put(self, task):
+            raise OSError("queue closed")
+
+    pool._workers[0] = worker_pool._WorkerHandle(0, None, BrokenQueue())
+    with pytest.raises(OSError):
+        pool.submit_image(np.zeros((4, 4, 3), dtype=np.uint8), "x.jpg", model_path="model.pt")
+
+    assert_unlinked(created_blocks)
+    assert not pool._jobs
+    assert not pool._workers[0].inflight
@@ -0,0 +1,375 @@
+"""
+Video ingest for YoloLabel application.
+This module decodes a video with a streaming reader, samples frames at a fixed
+stride and/or on scene changes, and stores them like uploaded images (original
+frame plus a center-cropped, resized copy). Optionally the frames are
+pre-labeled with the model and a multi-object tracker, so boxes of the same
+object keep a consistent class from frame to frame. Decoding and inference run
+in separate threads connected by a bounded queue.
+"""
+
+import os
+import time
+import queue
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable
+
+try:
+    import cv2
+    import numpy as np
+    from PIL import Image
+except ImportError as e:
+    module = str(e).split("'")[-2]
+    raise ImportError(
+        f"{module} package is required. Install with: pip install {module}"
+    )
+
+import image_utils
+from annotation_store import format_yolo_lines
+
+# Constants
+IMAGES_FOLDER = os.path.join(os.getcwd(), "images")
+ORIGINAL_IMAGES_FOLDER = os.path.join(os.getcwd(), "original_images")
+ANNOTATIONS_FOLDER = os.path.join(os.getcwd(), "annotations")
+VIDEOS_FOLDER = os.path.join(os.getcwd(), "videos")  # Uploaded videos
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm', '.m4v')
+DEFAULT_STRIDE = int(os.environ.get("YOLOLABEL_VIDEO_STRIDE", "30"))  # Consider every Nth frame
+SCENE_THUMB_SIZE = (64, 36)  # Thumbnail compared for scene-change sampling
+FRAME_QUEUE_SIZE = 16  # Decoded frames buffered between the decode and inference stages
+DEFAULT_TRACKER = "bytetrack.yaml"  # Ultralytics tracker configuration
+REVIEW_STATUS = "ATTENTION"  # Status given to frames with predicted annotations
+
+# Marks the end of the frame stream between pipeline stages
+_END = object()
+
+def scene_change(thumb: np.ndarray, previous: Optional[np.ndarray]) -> float:
+    """
+    Measure how different a frame is from the previous sampled frame.
+
+    Args:
+        thumb: Grayscale thumbnail of the frame
+        previous: Thumbnail of the last sampled frame (None for the first frame)
+
+    Returns:
+        Mean absolute pixel difference in the range 0-1 (1.0 for the first frame)
+    """
+    if previous is None:
+        return 1.0
+    return float(cv2.absdiff(thumb, previous).mean()) / 255.0
+
+class VideoIngestJob:
+    """
+    Background job that turns a video into labeled-ready frames.
+
+    The decode stage reads the video sequentially, skips frames it does not
+    sample without converting them (grab only), and crops, resizes and saves the
+    sampled ones. When tracking is on, a second stage runs the model with a
+    tracker on the resized frames while the decoder keeps reading, writes YOLO
+    annotations and flags the frames for review. Each track gets the class most
+    often predicted for it so far.
+    """
+
+    def __init__(
+        self,
+        video_path: str,
+        stride: int = DEFAULT_STRIDE,
+        scene_threshold: float = 0.0,
+        max_frames: Optional[int] = None,
+        track: bool = False,
+        conf: Optional[float] = None,
+        model_path: Optional[str] = None,
+        tracker: str = DEFAULT_TRACKER,
+        images_folder: str = IMAGES_FOLDER,
+        original_images_folder: str = ORIGINAL_IMAGES_FOLDER,
+        annotations_folder: str = ANNOTATIONS_FOLDER,
+        class_names: Optional[List[str]] = None,
+        update_statuses: Optional[Callable[[List[str], str], None]] = None,
+        on_frame: Optional[Callable[[str], None]] = None,
+        save_annotation: Optional[Callable[[str, List[Dict[str, Any]]], Any]] = None,
+        verbose: bool = False,
+    ):
+        self.video_path = video_path
+        self.stride = max(1, int(stride))
+        self.scene_threshold = max(0.0, float(scene_threshold))
+        self.max_frames = max_frames
+        self.track = track
+        self.conf = conf
+        self.model_path = model_path
+        self.tracker = tracker
+        self.images_folder = images_folder
+        self.original_images_folder = original_images_folder
+        self.annotations_folder = annotations_folder
+        self.class_names = class_names
+        self.update_statuses = update_statuses
+        self.on_frame = on_frame  # Called with the filename of every frame saved to the images folder
+        self.save_annotation = save_annotation  # Called with (image stem, boxes); None writes the .txt file directly
+        self.verbose = verbose
+        self._thread: Optional[threading.Thread] = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._progress = {
+            "state": "idle",
+            "video": os.path.basename(video_path),
+            "total_frames": 0,
+            "frames_read": 0,
+            "frames_sampled": 0,
+            "frames_predicted": 0,
+            "annotations_written": 0,
+            "boxes": 0,
+            "tracks": 0,
+            "errors": 0,
+            "files": [],
+            "decode_seconds": 0.0,
+            "inference_seconds": 0.0,
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        """
+        Start the job in a background thread.
+
+        Returns:
+            False if the job is already running, True otherwise
+        """
+        if self.running:
+            return False
+        self._cancel.clear()
+        self._set_progress(state="running")
+        self._thread = threading.Thread(target=self.run, name="video-ingest", daemon=True)
+        self._thread.start()
+        return True
+
+    def cancel(self):
+        """Ask the job to stop; frames already saved are kept."""
+        self._cancel.set()
+
+    def progress(self) -> Dict[str, Any]:
+        """Return a snapshot of the job progress."""
+        with self._lock:
+            progress = dict(self._progress)
+            progress["files"] = list(progress["files"])
+        elapsed = (progress["finished_at"] or time.time()) - progress["started_at"] if progress["started_at"] else 0
+        progress["frames_per_second"] = progress["frames_read"] / elapsed if elapsed > 0 else 0.0
+        return progress
+
+    def _set_progress(self, **values):
+        with self._lock:
+            self._progress.update(values)
+
+    def _add_progress(self, **values):
+        with self._lock:
+            for key, value in values.items():
+                self._progress[key] += value
+
+    def _save_frame(self, frame: np.ndarray, filename: str) -> np.ndarray:
+        # Same layout as /upload_files: full frame in original_images, cropped and resized copy in images
+        cv2.imwrite(os.path.join(self.original_images_folder, filename), frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+        resized = image_utils.crop_and_resize(Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
+        resized.save(os.path.join(self.images_folder, filename), quality=95)
+        return cv2.cvtColor(np.asarray(resized), cv2.COLOR_RGB2BGR)
+
+    def _decode(self, frames: Optional[queue.Queue]):
+        """Decode stage: read, sample, save, and hand resized frames to the inference stage."""
+        capture = cv2.VideoCapture(self.video_path)
+        stem = Path(self.video_path).stem
+        previous_thumb = None
+        index = -1
+        sampled = 0
+        try:
+            if not capture.isOpened():
+                raise ValueError(f"Could not open video: {self.video_path}")
+            self._set_progress(total_frames=int(capture.get(cv2.CAP_PROP_FRAME_COUNT)))
+            while not self._cancel.is_set():
+                if self.max_frames is not None and sampled >= self.max_frames:
+                    break
+                start_time = time.perf_counter()
+                # grab() advances without converting the frame; only sampled frames are retrieved
+                if not capture.grab():
+                    break
+                index += 1
+                if index % self.stride != 0:
+                    self._add_progress(frames_read=1, decode_seconds=time.perf_counter() - start_time)
+                    continue
+                ok, frame = capture.retrieve()
+                if not ok:
+                    self._add_progress(frames_read=1, errors=1)
+                    continue
+
+                if self.scene_threshold > 0:
+                    thumb = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), SCENE_THUMB_SIZE,
+                                       interpolation=cv2.INTER_AREA)
+                    if scene_change(thumb, previous_thumb) < self.scene_threshold:
+                        self._add_progress(frames_read=1, decode_seconds=time.perf_counter() - start_time)
+                        continue
+                    previous_thumb = thumb
+
+                filename = f"{stem}_{index:07d}.jpg"
+                resized = self._save_frame(frame, filename)
+                if self.on_frame is not None:
+                    self.on_frame(filename)
+                sampled += 1
+                with self._lock:
+                    self._progress["frames_read"] += 1
+                    self._progress["frames_sampled"] += 1
+                    self._progress["decode_seconds"] += time.perf_counter() - start_time
+                    self._progress["files"].append(filename)
+
+                if frames is not None:
+                    # Blocks when inference falls behind, so memory stays bounded
+                    frames.put((filename, resized))
+        finally:
+            capture.release()
+            if frames is not None:
+                frames.put(_END)
+
+    def _predict(self, frames: queue.Queue):
+        """Inference stage: track objects across the sampled frames and write annotations."""
+        # Load a private model: the tracker keeps state on the model's predictor
+        from ultralytics import YOLO
+        import yolo_predict
+        import preannotate
+
+        model = YOLO(self.model_path or yolo_predict.get_best_model())
+        class_names = self.class_names if self.class_names is not None else preannotate.load_class_names()
+        update_statuses = self.update_statuses or preannotate.update_statuses_file
+        track_votes: Dict[int, Counter] = {}
+        conf = self.conf if self.conf is not None else yolo_predict.CONFIDENCE_THRESHOLD
+
+        while True:
+            item = frames.get()
+            if item is _END:
+                break
+            if self._cancel.is_set():
+                continue  # Drain the queue so the decoder can finish
+            filename, image = item
+            start_time = time.perf_counter()
+            try:
+                result = model.track(source=image, conf=conf, tracker=self.tracker,
+                                     persist=True, verbose=False)[0]
+                labels = []
+                boxes = result.boxes
+                if boxes is not None and len(boxes):
+                    class_ids = boxes.cls.cpu().numpy().astype(int)
+                    xywhn = boxes.xywhn.cpu().numpy()
+                    track_ids = boxes.id.cpu().numpy().astype(int) if boxes.id is not None else [None] * len(class_ids)
+                    for class_id, (x, y, w, h), track_id in zip(class_ids, xywhn, track_ids):
+                        if track_id is not None:
+                            # Keep the class of a track stable: use its most frequent prediction
+                            votes = track_votes.setdefault(int(track_id), Counter())
+                            votes[int(class_id)] += 1
+                            class_id = votes.most_common(1)[0][0]
+                        box = {"class": int(class_id), "name": result.names.get(int(class_id), "")}
+                        labels.append({"class": preannotate.map_class_index(box, class_names),
+                                       "x_center": float(x), "y_center": float(y), "width": float(w), "height": float(h)})
+
+                written = 0
+                stem = os.path.splitext(filename)[0]
+                annotation_path = os.path.join(self.annotations_folder, stem + ".txt")
+                if labels and not os.path.exists(annotation_path):
+                    if self.save_annotation is not None:
+                        self.save_annotation(stem, labels)
+                    else:
+                        with open(annotation_path, 'w') as f:
+                            f.write(format_yolo_lines(labels))
+                    update_statuses([filename], REVIEW_STATUS)
+                    written = 1
+                self._add_progress(frames_predicted=1, annotations_written=written, boxes=len(labels),
+                                   inference_seconds=time.perf_counter() - start_time)
+                self._set_progress(tracks=len(track_votes))
+            except Exception as e:
+                print(f"Error predicting frame {filename}: {str(e)}")
+                self._add_progress(errors=1)
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Run the job synchronously.
+
+        Returns:
+            Final progress snapshot
+        """
+        self._set_progress(state="running", started_at=time.time(), finished_at=None, error=None)
+        try:
+            os.makedirs(self.images_folder, exist_ok=True)
+            os.makedirs(self.original_images_folder, exist_ok=True)
+            os.makedirs(self.annotations_folder, exist_ok=True)
+
+            if self.track:
+                frames = queue.Queue(maxsize=FRAME_QUEUE_SIZE)
+                errors = []
+
+                def decode():
+                    try:
+                        self._decode(frames)
+                    except Exception as e:
+                        errors.append(e)
+
+                decoder = threading.Thread(target=decode, name="video-decode", daemon=True)
+                decoder.start()
+                try:
+                    self._predict(frames)
+                except Exception:
+                    # Let the decoder finish instead of blocking on a full queue
+                    self._cancel.set()
+                    while decoder.is_alive():
+                        try:
+                            frames.get(timeout=0.1)
+                        except queue.Empty:
+                            pass
+                    raise
+                decoder.join()
+                if errors:
+                    raise errors[0]
+            else:
+                self._decode(None)
+
+            state = "cancelled" if self._cancel.is_set() else "completed"
+            self._set_progress(state=state, finished_at=time.time())
+        except Exception as e:
+            print(f"Video ingest error: {str(e)}")
+            self._set_progress(state="failed", error=str(e), finished_at=time.time())
+
+        final = self.progress()
+        if self.verbose:
+            print(f"Ingested {final['frames_sampled']} of {final['frames_read']} frames from {final['video']} "
+                  f"({final['annotations_written']} pre-labeled, {final['errors']} errors)")
+        return final
+
+if __name__ == "__main__":
+    # Simple command-line interface when run directly
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extract frames from a video into the images folder")
+    parser.add_argument("video_path", help="Path to the video file")
+    parser.add_argument("--stride", type=int, default=DEFAULT_STRIDE, help="Consider every Nth frame")
+    parser.add_argument("--scene-threshold", type=float, default=0.0,
+                        help="Keep a frame only if it differs this much (0-1) from the last kept frame")
+    parser.add_argument("--max-frames", type=int, default=None, help="Stop after this many frames")
+    parser.add_argument("--track", action="store_true", help="Pre-label frames with the model and a tracker")
+    parser.add_argument("--conf", type=float, default=None,
+                        help="Confidence threshold for pre-labels (default: the prediction threshold, 0.25)")
+    parser.add_argument("--tracker", default=DEFAULT_TRACKER, help="Ultralytics tracker config")
+
+    args = parser.parse_args()
+
+    # Open the status store once for the whole run (the server must not be running)
+    import status_store
+    statuses = status_store.StatusStore()
+    job = VideoIngestJob(
+        args.video_path, stride=args.stride, scene_threshold=args.scene_threshold,
+        max_frames=args.max_frames, track=args.track, conf=args.conf, tracker=args.tracker,
+        update_statuses=statuses.set, verbose=True,
+    )
+    try:
+        final = job.run()
+    finally:
+        statuses.close()
+    if final["state"] == "failed":
+        print(f"Error: {final['error']}")
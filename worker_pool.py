@@ -0,0 +1,387 @@
+"""
+Multi-process inference worker pool for YoloLabel application.
+Each worker process keeps its own resident model with a pinned torch thread
+count. The API process decodes images once and hands them to workers through
+multiprocessing.shared_memory instead of pickling arrays or re-reading files.
+"""
+
+import os
+import time
+import queue
+import itertools
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from concurrent.futures import Future
+from typing import Dict, Any, Optional, Set
+
+try:
+    import cv2
+    import numpy as np
+except ImportError as e:
+    module = str(e).split("'")[-2]
+    raise ImportError(
+        f"{module} package is required. Install with: pip install {module}"
+    )
+
+import yolo_predict
+
+# Settings (can be overridden with environment variables)
+WORKER_PROCESSES = int(os.environ.get("YOLOLABEL_WORKER_PROCESSES", "0"))  # 0 disables the pool
+WORKER_TORCH_THREADS = int(os.environ.get("YOLOLABEL_WORKER_TORCH_THREADS", "4"))  # Torch threads per worker
+REAP_INTERVAL = 1.0  # Seconds between checks for dead or retired workers
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS")  # Read by OpenMP/MKL when torch is first imported
+
+# Guards os.environ while it holds a worker's thread settings
+_spawn_env_lock = threading.Lock()
+
+def _start_with_thread_env(process, threads: int):
+    """
+    Start a process with OMP_NUM_THREADS/MKL_NUM_THREADS set to `threads`.
+
+    Spawned children copy the parent's environment at start(), and the worker
+    module imports torch before any of its code runs, so the limits must
+    already be in the environment. The parent's values are restored afterwards.
+    """
+    with _spawn_env_lock:
+        saved = {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+        try:
+            for name in THREAD_ENV_VARS:
+                os.environ[name] = str(threads)
+            process.start()
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+def read_image(image_path: str) -> np.ndarray:
+    """Decode an image file for InferenceWorkerPool.submit_image()."""
+    image = cv2.imread(image_path)
+    if image is None:
+        raise FileNotFoundError(f"Image not found: {image_path}")
+    return image
+
+def _worker_main(worker_id: int, task_queue, result_queue, torch_threads: int, backend: Optional[str]):
+    """
+    Entry point of a worker process: load the model, then serve tasks until a None sentinel.
+    """
+    # torch is already imported here (through yolo_predict), so OpenMP/MKL were pinned by the
+    # environment the parent spawned us with; torch's own pools are pinned explicitly
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+        torch.set_num_interop_threads(1)
+    except ImportError:
+        pass
+
+    # Load the model up front so the first task doesn't pay for it
+    try:
+        yolo_predict.get_model(backend=backend)
+    except Exception as e:
+        print(f"Worker {worker_id}: error preloading model: {str(e)}")
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+
+        job_id, shm_name, shape, dtype, image_path, conf, model_path, task_backend = task
+        try:
+            shm = shared_memory.SharedMemory(name=shm_name)
+            try:
+                image = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+                formatted = yolo_predict.predict_arrays(
+                    [image], conf, model_path, task_backend or backend, columnar=True
+                )[0]
+                del image
+            finally:
+                shm.close()
+            formatted["image_path"] = image_path
+            result_queue.put((job_id, worker_id, formatted, None))
+        except Exception as e:
+            result_queue.put((job_id, worker_id, None, str(e)))
+
+class _WorkerHandle:
+    """
+    Parent-side state of one worker process.
+    """
+
+    def __init__(self, worker_id: int, process, task_queue):
+        self.worker_id = worker_id
+        self.process = process
+        self.task_queue = task_queue
+        self.inflight: Set[int] = set()
+        self.retiring = False
+
+class InferenceWorkerPool:
+    """
+    Pool of inference processes fed through shared memory.
+
+    submit() decodes an image, copies it into a shared memory block and queues
+    it on the least loaded worker; the returned Future resolves to a
+    format_results entry (columnar boxes). When the best model file changes,
+    workers are restarted one by one: retiring workers finish their queued
+    tasks while replacements already take new ones.
+    """
+
+    def __init__(self, num_workers: int = WORKER_PROCESSES, torch_threads: int = WORKER_TORCH_THREADS,
+                 backend: Optional[str] = None):
+        self.num_workers = max(1, num_workers)
+        self.torch_threads = max(1, torch_threads)
+        self.backend = backend
+        self.stats = {"submitted": 0, "completed": 0, "errors": 0, "restarts": 0, "worker_deaths": 0}
+        self._ctx = mp.get_context("spawn")
+        self._result_queue = self._ctx.Queue()
+        self._workers: Dict[int, _WorkerHandle] = {}
+        self._jobs: Dict[int, tuple] = {}  # job_id -> (future, shm, worker_id)
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count()
+        self._worker_ids = itertools.count()
+        self._model_key = None
+        self._collector: Optional[threading.Thread] = None
+        self._closed = False
+
+    def start(self):
+        """Start the worker processes and the result collector thread."""
+        with self._lock:
+            for _ in range(self.num_workers):
+                self._spawn()
+        self._model_key = self._current_model_key()
+        self._collector = threading.Thread(target=self._collect, name="worker-pool-results", daemon=True)
+        self._collector.start()
+
+    def _spawn(self) -> _WorkerHandle:
+        # Called with self._lock held
+        worker_id = next(self._worker_ids)
+        task_queue = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, task_queue, self._result_queue, self.torch_threads, self.backend),
+            name=f"inference-worker-{worker_id}",
+            daemon=True,
+        )
+        _start_with_thread_env(process, self.torch_threads)
+        handle = _WorkerHandle(worker_id, process, task_queue)
+        self._workers[worker_id] = handle
+        return handle
+
+    @staticmethod
+    def _current_model_key():
+        return yolo_predict.ModelManager.model_key(yolo_predict.get_best_model())
+
+    def _check_model(self):
+        key = self._current_model_key()
+        with self._lock:
+            # Only the first request to see a new model restarts the workers
+            if self._model_key is not None and key != self._model_key:
+                print(f"Model changed to {key[0]}, restarting inference workers")
+                self._restart_locked()
+            self._model_key = key
+
+    def restart(self):
+        """Gracefully replace every worker (e.g. after best.pt changed)."""
+        with self._lock:
+            self._restart_locked()
+
+    def _restart_locked(self):
+        # Called with self._lock held
+        for handle in list(self._workers.values()):
+            if handle.retiring:
+                continue
+            handle.retiring = True
+            handle.task_queue.put(None)
+            self._spawn()
+        self.stats["restarts"] += 1
+
+    def submit(
+        self,
+        image_path: str,
+        conf: float = yolo_predict.CONFIDENCE_THRESHOLD,
+        model_path: Optional[str] = None,
+        backend: Optional[str] = None,
+    ) -> Future:
+        """
+        Queue an image for prediction on a worker process.
+
+        Args:
+            image_path: Path to the image file
+            conf: Confidence threshold for detections (0-1)
+            model_path: Path to a specific model file (optional)
+            backend: Inference backend (defaults to the pool's backend)
+
+        Returns:
+            Future resolving to a format_results entry with columnar boxes
+        """
+        return self.submit_image(read_image(image_path), image_path, conf, model_path, backend)
+
+    def submit_image(
+        self,
+        image: np.ndarray,
+        image_path: str,
+        conf: float = yolo_predict.CONFIDENCE_THRESHOLD,
+        model_path: Optional[str] = None,
+        backend: Optional[str] = None,
+    ) -> Future:
+        """
+        Queue an already decoded image for prediction on a worker process.
+
+        The image is copied into shared memory, so the caller can keep using it
+        (e.g. to draw the predicted boxes on).
+
+        Args:
+            image: BGR image array from read_image()
+            image_path: Path of the image file, reported in the result
+            conf: Confidence threshold for detections (0-1)
+            model_path: Path to a specific model file (optional)
+            backend: Inference backend (defaults to the pool's backend)
+
+        Returns:
+            Future resolving to a format_results entry with columnar boxes
+        """
+        if self._closed:
+            raise RuntimeError("Worker pool is closed")
+        if model_path is None:
+            self._check_model()
+
+        shm = shared_memory.SharedMemory(create=True, size=image.nbytes)
+        job_id = None
+        try:
+            np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)[:] = image
+
+            future = Future()
+            with self._lock:
+                candidates = [h for h in self._workers.values() if not h.retiring]
+                if self._closed or not candidates:
+                    raise RuntimeError("No inference worker is accepting tasks")
+                handle = min(candidates, key=lambda h: len(h.inflight))
+                job_id = next(self._job_ids)
+                self._jobs[job_id] = (future, shm, handle.worker_id)
+                handle.inflight.add(job_id)
+                self.stats["submitted"] += 1
+
+            handle.task_queue.put((job_id, shm.name, image.shape, image.dtype.str, image_path, conf, model_path, backend))
+        except Exception:
+            # The block would outlive the process if nobody unlinked it
+            if job_id is not None:
+                with self._lock:
+                    job = self._jobs.pop(job_id, None)
+                    handle.inflight.discard(job_id)
+                if job is None:
+                    raise  # Already finished (and unlinked) by close() or the reaper
+            shm.close()
+            shm.unlink()
+            raise
+        return future
+
+    def _finish(self, job_id: int, result: Optional[Dict[str, Any]], error: Optional[str]):
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is None:
+                return
+            future, shm, worker_id = job
+            handle = self._workers.get(worker_id)
+            if handle is not None:
+                handle.inflight.discard(job_id)
+            if error is None:
+                self.stats["completed"] += 1
+            else:
+                self.stats["errors"] += 1
+
+        shm.close()
+        shm.unlink()
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(RuntimeError(error))
+
+    def _reap(self):
+        # Drop workers that exited; fail their jobs and replace unexpected deaths
+        with self._lock:
+            dead = [h for h in self._workers.values() if not h.process.is_alive()]
+            for handle in dead:
+                del self._workers[handle.worker_id]
+                handle.process.join(timeout=0)
+                if not handle.retiring and not self._closed:
+                    self.stats["worker_deaths"] += 1
+                    print(f"Inference worker {handle.worker_id} died, starting a replacement")
+                    self._spawn()
+        for handle in dead:
+            for job_id in list(handle.inflight):
+                self._finish(job_id, None, f"Inference worker {handle.worker_id} exited")
+
+    def _collect(self):
+        last_reap = time.monotonic()
+        while not self._closed:
+            try:
+                job_id, _, result, error = self._result_queue.get(timeout=REAP_INTERVAL)
+                self._finish(job_id, result, error)
+            except queue.Empty:
+                pass
+            if time.monotonic() - last_reap >= REAP_INTERVAL:
+                self._reap()
+                last_reap = time.monotonic()
+
+    def close(self, timeout: float = 10.0):
+        """Stop all workers after their queued tasks and release shared memory."""
+        self._closed = True
+        with self._lock:
+            handles = list(self._workers.values())
+            for handle in handles:
+                handle.task_queue.put(None)
+        for handle in handles:
+            handle.process.join(timeout=timeout)
+            if handle.process.is_alive():
+                handle.process.terminate()
+        for job_id in list(self._jobs):
+            self._finish(job_id, None, "Worker pool closed")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return pool settings, counters and per-worker load."""
+        with self._lock:
+            workers = [
+                {
+                    "worker_id": h.worker_id,
+                    "pid": h.process.pid,
+                    "alive": h.process.is_alive(),
+                    "retiring": h.retiring,
+                    "inflight": len(h.inflight),
+                }
+                for h in self._workers.values()
+            ]
+            return {
+                "num_workers": self.num_workers,
+                "torch_threads": self.torch_threads,
+                "pending_jobs": len(self._jobs),
+                **self.stats,
+                "workers": workers,
+            }
+
+# Process-wide pool, started on first use when WORKER_PROCESSES > 0
+_pool: Optional[InferenceWorkerPool] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> Optional[InferenceWorkerPool]:
+    """
+    Get the process-wide worker pool, starting it on first use.
+
+    Returns:
+        The pool, or None if WORKER_PROCESSES is 0
+    """
+    global _pool
+    if WORKER_PROCESSES <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = InferenceWorkerPool()
+            _pool.start()
+        return _pool
+
+def shutdown_pool():
+    """Stop the process-wide worker pool if it was started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
@@ -6,8 +6,17 @@ This module provides functions to perform object detection on images using YOLOv
 import os
 import sys
 import io
+import time
+import json
+import copy
+import hashlib
+import sqlite3
+import threading
+import contextlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union, Tuple
+from typing import List, Dict, Any, Optional, Union, Tuple, Iterable, Iterator
 
 try:
     from ultralytics import YOLO
@@ -20,43 +29,535 @@ except ImportError as e:
         f"{module} package is required. Install with: pip install {module}"
     )
 
+import image_utils
+
 # Constants
 DEFAULT_MODEL = "yolov8n.pt"  # Default model to use if no custom model is available
 CUSTOM_MODEL_DIR = os.path.join(os.getcwd(), "custom_yolo_model")
 CONFIDENCE_THRESHOLD = 0.25  # Minimum confidence threshold for detections
-VISUALIZATIONS_DIR = os.path.join(os.getcwd(), "visualizations")  # Directory to store visualizations
-os.makedirs(VISUALIZATIONS_DIR, exist_ok=True)  # Create the directory if it doesn't exist
+RAW_CONFIDENCE_FLOOR = float(os.environ.get("YOLOLABEL_RAW_CONF_FLOOR", "0.01"))  # Threshold of stored raw predictions
+MAX_DETECTIONS = 300  # Boxes kept per image (ultralytics' default max_det)
+RAW_MAX_DETECTIONS = int(os.environ.get("YOLOLABEL_RAW_MAX_DET", "3000"))  # Boxes kept per image by raw predictions
+VISUALIZATIONS_DIR = os.path.join(os.getcwd(), "visualizations")  # Directory to store visualizations (created on first save)
+DEFAULT_BATCH_SIZE = int(os.environ.get("YOLOLABEL_BATCH_SIZE", "8"))  # Images per forward pass for batched prediction
+MODEL_CACHE_SIZE = int(os.environ.get("YOLOLABEL_MODEL_CACHE_SIZE", "2"))  # Max models kept resident in memory
+BACKENDS = ("torch", "onnx", "onnx_int8")  # Available inference backends
+INFERENCE_BACKEND = os.environ.get("YOLOLABEL_BACKEND", "torch")  # Server-wide default backend
+VISUALIZATION_CACHE_BYTES = int(os.environ.get("YOLOLABEL_VISUALIZATION_CACHE_MB", "64")) * 1024 * 1024  # In-memory visualizations
+TILE_SIZE = int(os.environ.get("YOLOLABEL_TILE_SIZE", "640"))  # Tile size in original-image pixels
+TILE_OVERLAP = float(os.environ.get("YOLOLABEL_TILE_OVERLAP", "0.2"))  # Fraction of a tile shared with its neighbour
+TILE_BATCH_SIZE = int(os.environ.get("YOLOLABEL_TILE_BATCH_SIZE", "8"))  # Tiles per forward pass
+TILE_WORKERS = int(os.environ.get("YOLOLABEL_TILE_WORKERS", "1"))  # Threads running tile batches
+TILE_MERGE_IOU = 0.5  # IoU above which detections from neighbouring tiles are merged
+WARMUP_RUNS = int(os.environ.get("YOLOLABEL_WARMUP_RUNS", "2"))  # Warmup forward passes after preloading the model
+PREDICTION_CACHE_DIR = os.environ.get(
+    "YOLOLABEL_PREDICTION_CACHE_DIR", os.path.join(os.getcwd(), "prediction_cache")
+)  # Directory for the on-disk prediction cache
+PREDICTION_CACHE_SIZE = int(os.environ.get("YOLOLABEL_PREDICTION_CACHE_SIZE", "1024"))  # In-memory cache entries
+
+# Model path last reported by get_best_model()
+_logged_model: Optional[str] = None
 
 def get_best_model() -> str:
     """
     Find the best available YOLO model to use for prediction.
     Prioritizes custom models from the custom_yolo_model folder.
     
+    This runs on every prediction, so the choice is only logged when it changes.
+    
     Returns:
         str: Path to the best available model
     """
+    global _logged_model
     # Check for best model in custom model directory
     custom_best_model = os.path.join(CUSTOM_MODEL_DIR, "best.pt")
-    if os.path.exists(custom_best_model):
-        print(f"Using custom model: {custom_best_model}")
-        return custom_best_model
-    
     # Check for last model in custom model directory
     custom_last_model = os.path.join(CUSTOM_MODEL_DIR, "last.pt")
-    if os.path.exists(custom_last_model):
-        print(f"Using custom model: {custom_last_model}")
-        return custom_last_model
+    if os.path.exists(custom_best_model):
+        model_path = custom_best_model
+    elif os.path.exists(custom_last_model):
+        model_path = custom_last_model
+    else:
+        # Fall back to default model if no custom model is available
+        model_path = DEFAULT_MODEL
+    
+    if model_path != _logged_model:
+        _logged_model = model_path
+        if model_path == DEFAULT_MODEL:
+            print(f"No custom model found, using default model: {DEFAULT_MODEL}")
+        else:
+            print(f"Using custom model: {model_path}")
+    return model_path
+
+class ModelManager:
+    """
+    Keeps loaded YOLO models resident in memory between predictions.
+    
+    Models are held in an LRU keyed by (absolute path, mtime, size) of the weights
+    file plus the inference backend, so replacing a file such as custom_yolo_model/best.pt produces a new key
+    and the new weights are picked up on next use without restarting the server.
+    The previous model keeps serving until the new one has loaded successfully.
+    """
+    
+    def __init__(self, max_models: int = MODEL_CACHE_SIZE):
+        self.max_models = max(1, max_models)
+        self._models: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()  # Guards _models and stats
+        self._load_lock = threading.Lock()  # Serializes model loading
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "loads": 0,
+            "reloads": 0,
+            "load_errors": 0,
+            "load_time_total": 0.0,
+            "last_load_time": 0.0,
+        }
+    
+    @staticmethod
+    def model_key(model_path: str) -> Tuple:
+        """
+        Build the cache key for a model file.
+        
+        Args:
+            model_path: Path to the model file
+            
+        Returns:
+            Tuple of (path, mtime_ns, size); mtime and size are None for names
+            that are not local files (e.g. a model YOLO downloads on first use)
+        """
+        try:
+            st = os.stat(model_path)
+            return (os.path.abspath(model_path), st.st_mtime_ns, st.st_size)
+        except OSError:
+            return (model_path, None, None)
+    
+    def _lookup(self, key: Tuple):
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                self.stats["hits"] += 1
+            return model
+    
+    def get(self, model_path: str, backend: str = "torch"):
+        """
+        Return a loaded YOLO model for the given path, loading it if needed.
+        
+        Args:
+            model_path: Path to the model file
+            backend: Inference backend ('torch', 'onnx' or 'onnx_int8')
+            
+        Returns:
+            Loaded model (ultralytics YOLO, or onnx_backend.OnnxModel)
+        """
+        key = self.model_key(model_path) + (backend,)
+        model = self._lookup(key)
+        if model is not None:
+            return model
+        
+        with self._load_lock:
+            # Another thread may have loaded it while we were waiting
+            model = self._lookup(key)
+            if model is not None:
+                return model
+            
+            with self._lock:
+                self.stats["misses"] += 1
+                stale_keys = [k for k in self._models if k[0] == key[0] and k[3] == backend]
+            
+            start_time = time.perf_counter()
+            try:
+                model = _load_model(model_path, backend)
+            except Exception as e:
+                with self._lock:
+                    self.stats["load_errors"] += 1
+                    # Keep serving the previous weights (e.g. file is still being written)
+                    if stale_keys and stale_keys[-1] in self._models:
+                        print(f"Error loading model {model_path}, keeping previous version: {str(e)}")
+                        return self._models[stale_keys[-1]]
+                raise
+            load_time = time.perf_counter() - start_time
+            
+            with self._lock:
+                # Swap in the new weights and drop older versions of the same file
+                for stale_key in stale_keys:
+                    self._models.pop(stale_key, None)
+                self._models[key] = model
+                while len(self._models) > self.max_models:
+                    self._models.popitem(last=False)
+                
+                self.stats["loads"] += 1
+                if stale_keys:
+                    self.stats["reloads"] += 1
+                self.stats["load_time_total"] += load_time
+                self.stats["last_load_time"] = load_time
+            
+            print(f"Loaded model {model_path} ({backend}) in {load_time:.3f}s")
+            return model
+    
+    def clear(self):
+        """Drop all resident models."""
+        with self._lock:
+            self._models.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return cache counters and the list of resident models.
+        
+        Returns:
+            Dict of counters plus resident model keys
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["resident_models"] = [
+                {"path": k[0], "mtime_ns": k[1], "size": k[2], "backend": k[3]} for k in self._models
+            ]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+def _load_model(model_path: str, backend: str):
+    # The ONNX backend is optional, only import it when selected
+    if backend in ("onnx", "onnx_int8"):
+        import onnx_backend
+        return onnx_backend.load_onnx_model(model_path, quantized=(backend == "onnx_int8"))
+    return YOLO(model_path)
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """
+    Resolve and validate an inference backend name.
+    
+    Args:
+        backend: 'torch', 'onnx', 'onnx_int8', or None for the server default (INFERENCE_BACKEND)
+        
+    Returns:
+        Backend name
+    """
+    backend = backend or INFERENCE_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid backend: {backend} (expected one of {', '.join(BACKENDS)})")
+    return backend
+
+# Process-wide model manager shared by all prediction calls
+model_manager = ModelManager()
+# YOLO predictors are not thread-safe, so PyTorch forward passes are serialized
+_inference_lock = threading.Lock()
+
+def _inference_guard(backend: str):
+    # ONNX Runtime sessions can run concurrently, ultralytics predictors cannot
+    return _inference_lock if backend == "torch" else contextlib.nullcontext()
+
+def get_model(model_path: Optional[str] = None, backend: Optional[str] = None):
+    """
+    Get a resident YOLO model, loading it on first use.
+    
+    Args:
+        model_path: Path to a specific model file (defaults to get_best_model())
+        backend: Inference backend ('torch', 'onnx' or 'onnx_int8', defaults to INFERENCE_BACKEND)
+        
+    Returns:
+        Loaded model
+    """
+    if model_path is None:
+        model_path = get_best_model()
+    return model_manager.get(model_path, resolve_backend(backend))
+
+def get_model_stats() -> Dict[str, Any]:
+    """Return load-time and cache-hit counters of the model manager."""
+    return model_manager.get_stats()
+
+def warmup_model(
+    model_path: Optional[str] = None,
+    backend: Optional[str] = None,
+    runs: int = WARMUP_RUNS,
+    image_size: Tuple[int, int] = (image_utils.TARGET_HEIGHT, image_utils.TARGET_WIDTH),
+) -> Dict[str, Any]:
+    """
+    Load a model and run a few forward passes on a blank image.
+    
+    The first passes pay for lazy kernel selection and memory allocation, so
+    doing them up front keeps that cost out of the first real prediction.
+    
+    Args:
+        model_path: Path to a specific model file (defaults to get_best_model())
+        backend: Inference backend ('torch', 'onnx' or 'onnx_int8', defaults to INFERENCE_BACKEND)
+        runs: Number of warmup forward passes
+        image_size: (height, width) of the warmup image, the size of labeled images
+        
+    Returns:
+        Dict with the model path and the seconds spent in each phase
+    """
+    timings: Dict[str, Any] = {}
+    start_time = time.perf_counter()
+    if model_path is None:
+        model_path = get_best_model()
+    timings["model_path"] = model_path
+    timings["resolve_seconds"] = time.perf_counter() - start_time
+    
+    start_time = time.perf_counter()
+    backend = resolve_backend(backend)
+    model = get_model(model_path, backend)
+    timings["load_seconds"] = time.perf_counter() - start_time
+    
+    blank = np.zeros((image_size[0], image_size[1], 3), dtype=np.uint8)
+    run_times = []
+    for _ in range(max(0, runs)):
+        start_time = time.perf_counter()
+        with _inference_guard(backend):
+            model.predict(source=[blank], conf=CONFIDENCE_THRESHOLD, batch=1, verbose=False)
+        run_times.append(time.perf_counter() - start_time)
+    timings["warmup_seconds"] = sum(run_times)
+    timings["warmup_runs"] = run_times
+    return timings
+
+# Memoized file hashes keyed by (path, mtime_ns, size)
+_file_hashes: "OrderedDict[Tuple, str]" = OrderedDict()
+_file_hashes_lock = threading.Lock()
+_FILE_HASHES_MAX = 8192
+
+def file_hash(path: str, memo_only: bool = False) -> Optional[str]:
+    """
+    Compute the content hash of a file.
+    
+    Hashes are memoized by path, mtime and size, so unchanged files are only
+    read once.
+    
+    Args:
+        path: Path to the file
+        memo_only: Return None instead of reading the file when the hash is not memoized
+        
+    Returns:
+        Hex digest of the file content
+    """
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _file_hashes_lock:
+        digest = _file_hashes.get(memo_key)
+        if digest is not None:
+            _file_hashes.move_to_end(memo_key)
+            return digest
+    if memo_only:
+        return None
+    
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    digest = hasher.hexdigest()
+    
+    with _file_hashes_lock:
+        _file_hashes[memo_key] = digest
+        while len(_file_hashes) > _FILE_HASHES_MAX:
+            _file_hashes.popitem(last=False)
+    return digest
+
+def get_model_hash(model_path: Optional[str] = None, memo_only: bool = False) -> Optional[str]:
+    """
+    Get the content hash of the model weights used for prediction.
+    
+    Args:
+        model_path: Path to a specific model file (defaults to get_best_model())
+        memo_only: Return None instead of hashing weights that were not hashed yet
+        
+    Returns:
+        Hex digest of the weights file, or the model name if it is not a local file
+    """
+    if model_path is None:
+        model_path = get_best_model()
+    if os.path.isfile(model_path):
+        return file_hash(model_path, memo_only)
+    return model_path
+
+class PredictionCache:
+    """
+    Two-tier cache of formatted prediction results.
+    
+    Entries are keyed by (image content hash, model weights hash, conf). An
+    in-memory LRU serves repeated lookups and an SQLite database under
+    PREDICTION_CACHE_DIR keeps results across restarts. A retrained model has a
+    new weights hash, so results from older weights are simply never looked up.
+    /predict stores raw results at RAW_CONFIDENCE_FLOOR and applies the requested
+    thresholds with filter_predictions().
+    """
+    
+    def __init__(self, cache_dir: str = PREDICTION_CACHE_DIR, max_memory_entries: int = PREDICTION_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.db_path = os.path.join(cache_dir, "predictions.sqlite3")
+        self.max_memory_entries = max(0, max_memory_entries)
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "disk_errors": 0}
+    
+    @staticmethod
+    def make_key(image_hash: str, model_hash: str, conf: float) -> str:
+        """Build a cache key from image hash, model hash and confidence threshold."""
+        return f"{image_hash}:{model_hash}:{conf:.4f}"
+    
+    def _connect(self):
+        # Called with self._lock held
+        if self._db is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "key TEXT PRIMARY KEY, image_hash TEXT, model_hash TEXT, "
+                "conf REAL, result TEXT, created REAL)"
+            )
+            self._db.commit()
+        return self._db
+    
+    def _remember(self, key: str, result: Dict[str, Any]):
+        # Called with self._lock held
+        if self.max_memory_entries == 0:
+            return
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result.
+        
+        Args:
+            key: Cache key from make_key()
+            
+        Returns:
+            Copy of the cached format_results entry, or None on a miss
+        """
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return copy.deepcopy(result)
+            
+            try:
+                row = self._connect().execute(
+                    "SELECT result FROM predictions WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"Prediction cache read error: {str(e)}")
+                self.stats["disk_errors"] += 1
+                row = None
+            
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            
+            result = json.loads(row[0])
+            self._remember(key, result)
+            self.stats["disk_hits"] += 1
+            return copy.deepcopy(result)
+    
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a result in the in-memory tier only, without copying it.
+        
+        This never touches the disk, so it is safe to call from the event loop.
+        The returned entry is shared and must not be modified.
+        
+        Args:
+            key: Cache key from make_key()
+            
+        Returns:
+            The cached format_results entry, or None if it is not in memory
+        """
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+            return result
+    
+    def put(self, key: str, result: Dict[str, Any]):
+        """
+        Store a result in both cache tiers.
+        
+        Args:
+            key: Cache key from make_key()
+            result: A single format_results entry
+        """
+        image_hash, model_hash, conf = key.rsplit(":", 2)
+        with self._lock:
+            self._remember(key, copy.deepcopy(result))
+            self.stats["writes"] += 1
+            try:
+                db = self._connect()
+                db.execute(
+                    "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, image_hash, model_hash, float(conf), json.dumps(result), time.time()),
+                )
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"Prediction cache write error: {str(e)}")
+                self.stats["disk_errors"] += 1
+    
+    def clear(self):
+        """Remove all entries from both cache tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._connect().execute("DELETE FROM predictions")
+            self._db.commit()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Return cache hit/miss counters."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+# Process-wide prediction cache
+prediction_cache = PredictionCache()
+
+def max_detections(conf: float) -> int:
+    """Return the max_det to predict with: raw predictions keep more boxes than thresholded ones."""
+    return max(RAW_MAX_DETECTIONS, MAX_DETECTIONS) if conf <= RAW_CONFIDENCE_FLOOR else MAX_DETECTIONS
+
+def prediction_cache_key(
+    image_path: str,
+    conf: float = CONFIDENCE_THRESHOLD,
+    model_path: Optional[str] = None,
+    backend: Optional[str] = None,
+    memo_only: bool = False,
+) -> Optional[str]:
+    """
+    Build the prediction cache key for an image.
     
-    # Fall back to default model if no custom model is available
-    print(f"No custom model found, using default model: {DEFAULT_MODEL}")
-    return DEFAULT_MODEL
+    Args:
+        image_path: Path to the image file
+        conf: Confidence threshold for detections (0-1)
+        model_path: Path to a specific model file (optional)
+        backend: Inference backend (results of non-default backends are cached separately)
+        memo_only: Only use memoized file hashes (no file reads); None if one is missing
+        
+    Returns:
+        Cache key for prediction_cache
+    """
+    model_hash = get_model_hash(model_path, memo_only)
+    image_hash = file_hash(image_path, memo_only)
+    if model_hash is None or image_hash is None:
+        return None
+    backend = resolve_backend(backend)
+    if backend != "torch":
+        model_hash = f"{model_hash}-{backend}"
+    # Raw results keep more boxes; keying them by the limit keeps entries stored with another limit out
+    if max_detections(conf) != MAX_DETECTIONS:
+        model_hash = f"{model_hash}-max{max_detections(conf)}"
+    return PredictionCache.make_key(image_hash, model_hash, conf)
 
 def predict(
     image_path: str, 
     conf: float = CONFIDENCE_THRESHOLD,
     model_path: Optional[str] = None,
     save_visualization: bool = False,
-    visualization_path: Optional[str] = None
+    visualization_path: Optional[str] = None,
+    backend: Optional[str] = None
 ) -> List[Any]:
     """
     Run YOLO prediction on an image.
@@ -67,6 +568,7 @@ def predict(
         model_path: Path to a specific model file (optional)
         save_visualization: Whether to save an image with bounding boxes
         visualization_path: Path to save the visualization (if None, auto-generated)
+        backend: Inference backend ('torch', 'onnx' or 'onnx_int8', defaults to INFERENCE_BACKEND)
         
     Returns:
         List of YOLO results
@@ -74,22 +576,21 @@ def predict(
     if not os.path.exists(image_path):
         raise FileNotFoundError(f"Image not found: {image_path}")
     
-    # Determine which model to use
-    if model_path is None:
-        model_path = get_best_model()
-    
-    # Load the model
-    model = YOLO(model_path)
+    # Get the (cached) model
+    backend = resolve_backend(backend)
+    model = get_model(model_path, backend)
     
     # Run prediction
-    results = model.predict(
-        source=image_path,
-        conf=conf,
-        save=save_visualization,  # Save visualization if requested
-        project=VISUALIZATIONS_DIR if save_visualization else None,
-        name="" if save_visualization else None,
-        verbose=False  # Don't print progress to console
-    )
+    with _inference_guard(backend):
+        results = model.predict(
+            source=image_path,
+            conf=conf,
+            max_det=max_detections(conf),
+            save=save_visualization,  # Save visualization if requested
+            project=VISUALIZATIONS_DIR if save_visualization else None,
+            name="" if save_visualization else None,
+            verbose=False  # Don't print progress to console
+        )
     
     # If custom visualization path is specified, but YOLO didn't save one (or saved to default location)
     if save_visualization and visualization_path:
@@ -106,6 +607,526 @@ def predict(
     
     return results
 
+def predict_results_batch(
+    paths: List[str],
+    conf: float = CONFIDENCE_THRESHOLD,
+    model_path: Optional[str] = None,
+    backend: Optional[str] = None,
+) -> List[Any]:
+    """
+    Run a single batched forward pass over a list of images.
+    
+    Args:
+        paths: Paths to the image files (all are sent as one batch)
+        conf: Confidence threshold for detections (0-1)
+        model_path: Path to a specific model file (optional)
+        backend: Inference backend ('torch', 'onnx' or 'onnx_int8', defaults to INFERENCE_BACKEND)
+        
+    Returns:
+        List of YOLO results, in the same order as paths
+    """
+    backend = resolve_backend(backend)
+    model = get_model(model_path, backend)
+    with _inference_guard(backend):
+        return model.predict(source=list(paths), conf=conf, max_det=max_detections(conf), batch=len(paths), verbose=False)
+
+def predict_arrays(
+    images: List[np.ndarray],
+    conf: float = CONFIDENCE_THRESHOLD,
+    model_path: Optional[str] = None,
+    backend: Optional[str] = None,
+    columnar: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Run YOLO prediction on already decoded images and format the results.
+    
+    Only formatted results are returned, so no reference to the input arrays
+    outlives the call (they may live in shared memory).
+    
+    Args:
+        images: BGR image arrays, sent to the model as one batch
+        conf: Confidence threshold for detections (0-1)
+        model_path: Path to a specific model file (optional)
+        backend: Inference backend ('torch', 'onnx' or 'onnx_int8', defaults to INFERENCE_BACKEND)
+        columnar: Return boxes as parallel lists (see format_results)
+        
+    Returns:
+        List of format_results entries, in the same order as images
+    """
+    backend = resolve_backend(backend)
+    model = get_model(model_path, backend)
+    with _inference_guard(backend):
+        results = model.predict(source=list(images), conf=conf, max_det=max_detections(conf), batch=len(images),
+                                verbose=False)
+    return format_results(results, columnar=columnar)
+
+def predict_batch(
+    paths: Iterable[str],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    conf: float = CONFIDENCE_THRESHOLD,
+    model_path: Optional[str] = None,
+    columnar: bool = False,
+    backend: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Run YOLO prediction on many images, feeding them to the model in batches.
+    
+    Args:
+        paths: Paths to the image files
+        batch_size: Number of images per forward pass
+        conf: Confidence threshold for detections (0-1)
+        model_path: Path to a specific model file (optional)
+        columnar: Return boxes as parallel lists (see format_results)
+        backend: Inference backend ('torch', 'onnx' or 'onnx_int8', defaults to INFERENCE_BACKEND)
+        
+    Yields:
+        One format_results-shaped dict per image, in input order. Images that
+        cannot be predicted yield a dict with "image_path" and "error" instead.
+    """
+    batch_size = max(1, int(batch_size))
+    
+    def run_batch(batch: List[str]) -> Iterator[Dict[str, Any]]:
+        try:
+            results = predict_results_batch(batch, conf, model_path, backend)
+        except Exception as e:
+            print(f"Batch prediction error: {str(e)}")
+            for path in batch:
+                yield {"image_path": path, "error": str(e)}
+            return
+        for path, formatted in zip(batch, format_results(results, columnar=columnar)):
+            formatted["image_path"] = path
+            yield formatted
+    
+    batch = []
+    for path in paths:
+        if not os.path.exists(path):
+            yield {"image_path": path, "error": f"Image not found: {path}"}
+            continue
+        batch.append(path)
+        if len(batch) >= batch_size:
+            yield from run_batch(batch)
+            batch = []
+    
+    if batch:
+        yield from run_batch(batch)
+
+def tile_origins(length: int, tile_size: int, overlap: float) -> List[int]:
+    """
+    Compute tile start offsets along one axis.
+    
+    Args:
+        length: Length of the axis in pixels
+        tile_size: Tile length in pixels
+        overlap: Fraction of a tile shared with the next one (0 <= overlap < 1)
+        
+    Returns:
+        Sorted start offsets; the last tile ends exactly at length
+    """
+    # An overlap of 1 or more would step one pixel at a time
+    if not 0 <= overlap < 1:
+        raise ValueError(f"Tile overlap must be at least 0 and less than 1, got {overlap}")
+    if length <= tile_size:
+        return [0]
+    stride = max(1, int(tile_size * (1 - overlap)))
+    origins = list(range(0, length - tile_size, stride))
+    origins.append(length - tile_size)
+    return origins
+
+def predict_tiled(
+    image_path: str,
+    original_path: Optional[str] = None,
+    conf: float = CONFIDENCE_THRESHOLD,
+    model_path: Optional[str] = None,
+    tile_size: int = TILE_SIZE,
+    overlap: float = TILE_OVERLAP,
+    batch_size: int = TILE_BATCH_SIZE,
+    workers: int = TILE_WORKERS,
+    include_full_image: bool = True,
+    merge_iou: float = TILE_MERGE_IOU,
+    columnar: bool = False,
+    backend: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Run sliced inference on the full-resolution original of a labeling image.
+    
+    The original is center-cropped like upload_files does, split into
+    overlapping tiles and the tiles are inferred in batches. Detections from all
+    tiles (plus the resized image, if include_full_image) are merged with
+    class-aware NMS and mapped back to the coordinates of the resized image.
+    
+    Args:
+        image_path: Path to the resized image in the images folder
+        original_path: Path to the full-resolution original (falls back to image_path)
+        conf: Confidence threshold for detections (0-1)
+        model_path: Path to a specific model file (optional)
+        tile_size: Tile size in original-image pixels
+        overlap: Fraction of a tile shared with its neighbour (0-1)
+        batch_size: Tiles per forward pass
+        workers: Threads running tile batches concurrently (PyTorch forward
+            passes are still serialized; the ONNX backends run in parallel)
+        include_full_image: Also predict the resized image to keep large objects
+        merge_iou: IoU above which overlapping detections are merged
+        columnar: Return boxes as parallel lists (see format_results)
+        backend: Inference backend ('torch', 'onnx' or 'onnx_int8', defaults to INFERENCE_BACKEND)
+        
+    Returns:
+        List with one format_results-shaped entry for the resized image
+    """
+    from onnx_backend import nms
+    
+    start_time = time.perf_counter()
+    backend = resolve_backend(backend)
+    
+    resized = cv2.imread(image_path)
+    if resized is None:
+        raise FileNotFoundError(f"Image not found: {image_path}")
+    resized_height, resized_width = resized.shape[:2]
+    
+    original = cv2.imread(original_path) if original_path and os.path.exists(original_path) else None
+    if original is None:
+        original = resized
+    orig_height, orig_width = original.shape[:2]
+    
+    # Only tile the region that ends up in the resized image
+    left, top, right, bottom = image_utils.center_crop_box(orig_width, orig_height, resized_width, resized_height)
+    region = original[top:bottom, left:right]
+    scale_x = resized_width / (right - left)
+    scale_y = resized_height / (bottom - top)
+    
+    tiles, offsets = [], []
+    for y in tile_origins(region.shape[0], tile_size, overlap):
+        for x in tile_origins(region.shape[1], tile_size, overlap):
+            tiles.append(np.ascontiguousarray(region[y:y + tile_size, x:x + tile_size]))
+            offsets.append((x, y))
+    
+    model = get_model(model_path, backend)
+    
+    def run_tiles(start: int) -> Tuple[int, List[Any]]:
+        with _inference_guard(backend):
+            batch = tiles[start:start + batch_size]
+            return start, model.predict(source=batch, conf=conf, max_det=max_detections(conf), batch=len(batch),
+                                        verbose=False)
+    
+    batch_size = max(1, int(batch_size))
+    starts = range(0, len(tiles), batch_size)
+    if workers > 1 and len(starts) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            batches = list(executor.map(run_tiles, starts))
+    else:
+        batches = [run_tiles(start) for start in starts]
+    
+    all_xyxy, all_conf, all_cls = [], [], []
+    names = {}
+    for start, results in batches:
+        for (x, y), result in zip(offsets[start:start + batch_size], results):
+            names = result.names
+            if result.boxes is None or not len(result.boxes):
+                continue
+            # Tile pixels -> crop region pixels -> resized image pixels
+            xyxy = _to_numpy(result.boxes.xyxy).astype(np.float64).reshape(-1, 4) + [x, y, x, y]
+            all_xyxy.append(xyxy * [scale_x, scale_y, scale_x, scale_y])
+            all_conf.append(_to_numpy(result.boxes.conf).astype(np.float64).reshape(-1))
+            all_cls.append(_to_numpy(result.boxes.cls).astype(np.int64).reshape(-1))
+    
+    if include_full_image:
+        with _inference_guard(backend):
+            full_result = model.predict(source=[resized], conf=conf, max_det=max_detections(conf), batch=1,
+                                        verbose=False)[0]
+        names = full_result.names
+        if full_result.boxes is not None and len(full_result.boxes):
+            all_xyxy.append(_to_numpy(full_result.boxes.xyxy).astype(np.float64).reshape(-1, 4))
+            all_conf.append(_to_numpy(full_result.boxes.conf).astype(np.float64).reshape(-1))
+            all_cls.append(_to_numpy(full_result.boxes.cls).astype(np.int64).reshape(-1))
+    
+    if all_xyxy:
+        xyxy = np.concatenate(all_xyxy)
+        confidences = np.concatenate(all_conf)
+        class_ids = np.concatenate(all_cls)
+        
+        # Cross-tile NMS; offset boxes by class so only same-class boxes are merged
+        offsets_by_class = class_ids[:, None].astype(np.float64) * (max(resized_width, resized_height) + 1)
+        keep = nms(xyxy + offsets_by_class, confidences, merge_iou)
+        xyxy, confidences, class_ids = xyxy[keep], confidences[keep], class_ids[keep]
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, resized_width)
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, resized_height)
+        columns = box_columns(xyxy, confidences, class_ids, names, resized_width, resized_height)
+    else:
+        columns = {field: [] for field in BOX_FIELDS}
+    
+    return [{
+        "boxes": columns if columnar else columns_to_rows(columns),
+        "image_width": resized_width,
+        "image_height": resized_height,
+        "image_path": image_path,
+        "prediction_time": (time.perf_counter() - start_time) * 1000,
+        "tiles": len(tiles),
+    }]
+
+class VisualizationCache:
+    """
+    In-memory LRU of encoded visualization images, bounded by total bytes.
+    
+    Entries are keyed by visualization filename and carry an ETag derived from
+    the encoded bytes, so clients can revalidate cheaply. An entry can also
+    record what it was rendered from (e.g. prediction cache key and thresholds),
+    so a repeated request can skip rendering it again.
+    """
+    
+    def __init__(self, max_bytes: int = VISUALIZATION_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[bytes, str, Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+    
+    def put(self, name: str, data: bytes, source: Optional[str] = None) -> str:
+        """
+        Store an encoded image.
+        
+        Args:
+            name: Visualization filename
+            data: Encoded image bytes
+            source: What the image was rendered from (see rendered_from)
+            
+        Returns:
+            ETag of the stored image
+        """
+        etag = '"' + hashlib.blake2b(data, digest_size=16).hexdigest() + '"'
+        with self._lock:
+            old = self._entries.pop(name, None)
+            if old is not None:
+                self.total_bytes -= len(old[0])
+            self._entries[name] = (data, etag, source)
+            self.total_bytes += len(data)
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, (evicted, _, _) = self._entries.popitem(last=False)
+                self.total_bytes -= len(evicted)
+                self.stats["evictions"] += 1
+        return etag
+    
+    def get(self, name: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Look up an encoded image.
+        
+        Args:
+            name: Visualization filename
+            
+        Returns:
+            Tuple of (bytes, ETag), or None if not cached
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(name)
+            self.stats["hits"] += 1
+            return entry[:2]
+    
+    def rendered_from(self, name: str, source: str) -> bool:
+        """Check whether an image is cached and was rendered from `source`."""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry[2] != source:
+                return False
+            self._entries.move_to_end(name)
+            return True
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "total_bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                **self.stats,
+            }
+
+# Process-wide cache of rendered visualizations
+visualization_cache = VisualizationCache()
+
+def visualization_filename(image_path: str) -> str:
+    """Return the visualization filename for an image."""
+    return f"{Path(image_path).stem}_visualization.jpg"
+
+def render_visualization(
+    result,
+    image_path: str,
+    return_mode: str = "path",  # 'path', 'bytes', 'array', or 'cache'
+    line_width: int = 2,
+    font_size: float = 1.0,
+    box_color: Optional[Tuple[int, int, int]] = None,  # RGB color tuple
+) -> Union[str, bytes, np.ndarray]:
+    """
+    Render a visualization with bounding boxes from an existing YOLO result.
+    
+    The image already decoded for inference (result.orig_img) is drawn on, so
+    the image file is not read again.
+    
+    Args:
+        result: A single YOLO result for the image
+        image_path: Path to the image file the result belongs to
+        return_mode: How to return the visualization ('path', 'bytes', 'array', or 'cache')
+        line_width: Width of bounding box lines
+        font_size: Size of the font for labels
+        box_color: Custom color for bounding boxes (RGB tuple)
+        
+    Returns:
+        Depending on return_mode:
+        - 'path': Path to the saved visualization image
+        - 'bytes': Bytes of the visualization image
+        - 'array': Numpy array of the visualization image
+        - 'cache': Filename of the JPEG stored in visualization_cache
+    """
+    # Draw boxes ourselves for custom styling or results without a plot() (ONNX backend)
+    if box_color or line_width != 2 or font_size != 1.0 or not hasattr(result, "plot"):
+        return render_boxes_visualization(
+            format_results([result], columnar=True)[0],
+            image_path,
+            return_mode=return_mode,
+            line_width=line_width,
+            font_size=font_size,
+            box_color=box_color,
+            image=getattr(result, "orig_img", None),
+        )
+    
+    # Use built-in plotting function (it returns BGR, convert to RGB like the manual path)
+    img = cv2.cvtColor(result.plot(), cv2.COLOR_BGR2RGB)
+    
+    return _output_visualization(img, image_path, return_mode)
+
+def render_boxes_visualization(
+    formatted_result: Dict[str, Any],
+    image_path: str,
+    return_mode: str = "path",  # 'path', 'bytes', 'array', or 'cache'
+    line_width: int = 2,
+    font_size: float = 1.0,
+    box_color: Optional[Tuple[int, int, int]] = None,  # RGB color tuple
+    image: Optional[np.ndarray] = None,
+    cache_source: Optional[str] = None,
+) -> Union[str, bytes, np.ndarray]:
+    """
+    Render a visualization from a format_results entry (e.g. a cached prediction).
+    
+    Args:
+        formatted_result: A single entry returned by format_results
+        image_path: Path to the image file
+        return_mode: How to return the visualization ('path', 'bytes', 'array', or 'cache')
+        line_width: Width of bounding box lines
+        font_size: Size of the font for labels
+        box_color: Custom color for bounding boxes (RGB tuple)
+        image: Already decoded BGR image to draw on (read from image_path if None)
+        cache_source: What the boxes came from, stored with a 'cache' visualization
+        
+    Returns:
+        Visualization in the same forms as render_visualization
+    """
+    if image is None:
+        image = cv2.imread(image_path)
+        if image is None:
+            raise FileNotFoundError(f"Image not found: {image_path}")
+    img = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)  # Convert to RGB (this also copies the array)
+    
+    color = tuple(reversed(box_color)) if box_color else (0, 255, 0)
+    font_scale = font_size * 0.7
+    
+    for box in convert_boxes_format(formatted_result, columnar=False)["boxes"]:
+        x1, y1, x2, y2 = (int(box[k]) for k in ("x1", "y1", "x2", "y2"))
+        
+        # Draw box
+        cv2.rectangle(img, (x1, y1), (x2, y2), color, line_width)
+        
+        # Draw label
+        label = f"{box['name']} {box['confidence']:.2f}"
+        text_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, 2)[0]
+        cv2.rectangle(img, (x1, y1 - text_size[1] - 5), (x1 + text_size[0], y1), color, -1)
+        cv2.putText(img, label, (x1, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), 2)
+    
+    return _output_visualization(img, image_path, return_mode, cache_source)
+
+def _output_visualization(img: np.ndarray, image_path: str, return_mode: str,
+                          cache_source: Optional[str] = None) -> Union[str, bytes, np.ndarray]:
+    # Save the visualization
+    if return_mode == 'path':
+        os.makedirs(VISUALIZATIONS_DIR, exist_ok=True)
+        vis_path = os.path.join(VISUALIZATIONS_DIR, visualization_filename(image_path))
+        cv2.imwrite(vis_path, cv2.cvtColor(img, cv2.COLOR_RGB2BGR))
+        return vis_path
+    
+    # Encode once and keep it in memory
+    elif return_mode == 'cache':
+        vis_filename = visualization_filename(image_path)
+        ok, encoded = cv2.imencode('.jpg', cv2.cvtColor(img, cv2.COLOR_RGB2BGR))
+        if not ok:
+            raise ValueError(f"Could not encode visualization for {image_path}")
+        visualization_cache.put(vis_filename, encoded.tobytes(), cache_source)
+        return vis_filename
+    
+    # Return as bytes
+    elif return_mode == 'bytes':
+        img_pil = Image.fromarray(img)
+        img_byte_arr = io.BytesIO()
+        img_pil.save(img_byte_arr, format='JPEG')
+        return img_byte_arr.getvalue()
+    
+    # Return as numpy array
+    elif return_mode == 'array':
+        return img
+    
+    else:
+        raise ValueError(f"Invalid return_mode: {return_mode}")
+
+def predict_with_visualization(
+    image_path: str, 
+    conf: float = CONFIDENCE_THRESHOLD,
+    model_path: Optional[str] = None,
+    return_mode: str = "path",  # 'path', 'bytes', or 'array'
+    line_width: int = 2,
+    font_size: float = 1.0,
+    box_color: Optional[Tuple[int, int, int]] = None,  # RGB color tuple
+    backend: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Union[str, bytes, np.ndarray, None]]:
+    """
+    Run YOLO prediction once and return both formatted results and a visualization.
+    
+    Both outputs are built from the same Results object, so a visualized
+    prediction costs a single forward pass.
+    
+    Args:
+        image_path: Path to the image file
+        conf: Confidence threshold for detections (0-1)
+        model_path: Path to a specific model file (optional)
+        return_mode: How to return the visualization ('path', 'bytes', or 'array')
+        line_width: Width of bounding box lines
+        font_size: Size of the font for labels
+        box_color: Custom color for bounding boxes (RGB tuple)
+        backend: Inference backend ('torch', 'onnx' or 'onnx_int8', defaults to INFERENCE_BACKEND)
+        
+    Returns:
+        Tuple of (format_results output, visualization). The visualization is
+        None if rendering fails; prediction errors are raised.
+    """
+    results = predict(image_path, conf, model_path, False, backend=backend)
+    formatted_results = format_results(results)
+    
+    if not results:
+        return formatted_results, None
+    
+    try:
+        visualization = render_visualization(
+            results[0],
+            image_path,
+            return_mode=return_mode,
+            line_width=line_width,
+            font_size=font_size,
+            box_color=box_color,
+        )
+    except Exception as e:
+        print(f"Error creating visualization: {str(e)}")
+        visualization = None
+    
+    return formatted_results, visualization
+
 def predict_and_visualize(
     image_path: str, 
     conf: float = CONFIDENCE_THRESHOLD,
@@ -135,77 +1156,91 @@ def predict_and_visualize(
         - None if an error occurs
     """
     try:
-        # Generate a unique filename for the visualization
-        vis_filename = f"{Path(image_path).stem}_visualization.jpg"
-        vis_path = os.path.join(VISUALIZATIONS_DIR, vis_filename)
-        
-        # Run prediction
-        results = predict(image_path, conf, model_path, False)
-        
-        if not results:
-            return None
-        
-        # Get the first result
-        result = results[0]
-        
-        # Generate visualization
-        boxes = result.boxes
-        img = cv2.imread(image_path)
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)  # Convert to RGB
-        
-        # Plot boxes manually if we want custom styling
-        if box_color or line_width != 2 or font_size != 1.0:
-            for box in boxes:
-                # Get coordinates
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
-                class_id = int(box.cls)
-                conf_score = float(box.conf)
-                
-                # Get color (convert from RGB to BGR for OpenCV)
-                color = tuple(reversed(box_color)) if box_color else (0, 255, 0)
-                
-                # Draw box
-                cv2.rectangle(img, (x1, y1), (x2, y2), color, line_width)
-                
-                # Draw label
-                label = f"{result.names[class_id]} {conf_score:.2f}"
-                font_scale = font_size * 0.7
-                text_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, 2)[0]
-                cv2.rectangle(img, (x1, y1 - text_size[1] - 5), (x1 + text_size[0], y1), color, -1)
-                cv2.putText(img, label, (x1, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), 2)
-        else:
-            # Use built-in plotting function
-            img = result.plot()
-        
-        # Save the visualization
-        if return_mode == 'path':
-            cv2.imwrite(vis_path, cv2.cvtColor(img, cv2.COLOR_RGB2BGR))
-            return vis_path
-        
-        # Return as bytes
-        elif return_mode == 'bytes':
-            img_pil = Image.fromarray(img)
-            img_byte_arr = io.BytesIO()
-            img_pil.save(img_byte_arr, format='JPEG')
-            return img_byte_arr.getvalue()
-        
-        # Return as numpy array
-        elif return_mode == 'array':
-            return img
-        
-        else:
-            raise ValueError(f"Invalid return_mode: {return_mode}")
-    
+        _, visualization = predict_with_visualization(
+            image_path,
+            conf,
+            model_path,
+            return_mode=return_mode,
+            line_width=line_width,
+            font_size=font_size,
+            box_color=box_color,
+        )
+        return visualization
     except Exception as e:
         print(f"Error creating visualization: {str(e)}")
         return None
 
-def format_results(results) -> List[Dict[str, Any]]:
+# Per-box fields in the order they appear in formatted results
+BOX_FIELDS = ["class", "name", "confidence", "x_center", "y_center", "width", "height", "x1", "y1", "x2", "y2"]
+
+def _to_numpy(values) -> np.ndarray:
+    # Accept torch tensors as well as arrays/lists
+    if hasattr(values, "cpu"):
+        values = values.cpu().numpy()
+    return np.asarray(values)
+
+def box_columns(
+    xyxy: np.ndarray,
+    confidences: np.ndarray,
+    class_ids: np.ndarray,
+    names: Dict[int, str],
+    img_width: int,
+    img_height: int,
+) -> Dict[str, List[Any]]:
+    """
+    Build columnar box data from detection arrays.
+    
+    Args:
+        xyxy: Boxes as (N, 4) pixel corner coordinates
+        confidences: Confidences as (N,) array
+        class_ids: Class ids as (N,) array
+        names: Mapping of class id to class name
+        img_width: Width used to normalize x coordinates
+        img_height: Height used to normalize y coordinates
+        
+    Returns:
+        Dict mapping each field in BOX_FIELDS to a list of values
+    """
+    xyxy = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4)
+    confidences = np.asarray(confidences, dtype=np.float64).reshape(-1)
+    class_ids = np.asarray(class_ids).astype(np.int64).reshape(-1)
+    
+    # Convert to center format (YOLO preferred format) and normalize
+    sizes = xyxy[:, 2:] - xyxy[:, :2]
+    centers = xyxy[:, :2] + sizes / 2
+    scale = np.array([img_width, img_height], dtype=np.float64)
+    centers_norm = centers / scale
+    sizes_norm = sizes / scale
+    
+    class_names = {c: names.get(c, f"Class {c}") for c in np.unique(class_ids).tolist()}
+    class_list = class_ids.tolist()
+    
+    return {
+        "class": class_list,
+        "name": [class_names[c] for c in class_list],
+        "confidence": confidences.tolist(),
+        "x_center": centers_norm[:, 0].tolist(),
+        "y_center": centers_norm[:, 1].tolist(),
+        "width": sizes_norm[:, 0].tolist(),
+        "height": sizes_norm[:, 1].tolist(),
+        # Also include pixel coordinates for convenience
+        "x1": xyxy[:, 0].tolist(),
+        "y1": xyxy[:, 1].tolist(),
+        "x2": xyxy[:, 2].tolist(),
+        "y2": xyxy[:, 3].tolist(),
+    }
+
+def format_results(results, columnar: bool = False) -> List[Dict[str, Any]]:
     """
     Format YOLO results into a more usable structure.
     
+    Box data is pulled from each result once as NumPy arrays and the center,
+    size and normalized columns are computed in bulk.
+    
     Args:
         results: Results from YOLO prediction
+        columnar: Return "boxes" as a dict of parallel lists (one per field in
+            BOX_FIELDS) instead of a list of per-box dicts
         
     Returns:
         List of formatted detection results
@@ -213,58 +1248,28 @@ def format_results(results) -> List[Dict[str, Any]]:
     formatted_results = []
     
     for result in results:
-        boxes = []
+        img_height, img_width = result.orig_shape[0], result.orig_shape[1]
+        columns = {field: [] for field in BOX_FIELDS}
         
         # Process detection boxes
-        if result.boxes is not None:
-            for i, box in enumerate(result.boxes):
-                # Get box data
-                try:
-                    class_id = int(box.cls.item())
-                    confidence = float(box.conf.item())
-                    x1, y1, x2, y2 = [float(x) for x in box.xyxy.squeeze().tolist()]
-                    
-                    # Calculate width and height
-                    width = x2 - x1
-                    height = y2 - y1
-                    
-                    # Convert to center format (YOLO preferred format)
-                    x_center = x1 + width / 2
-                    y_center = y1 + height / 2
-                    
-                    # Normalize coordinates (YOLO format)
-                    img_width, img_height = result.orig_shape[1], result.orig_shape[0]
-                    x_center_norm = x_center / img_width
-                    y_center_norm = y_center / img_height
-                    width_norm = width / img_width
-                    height_norm = height / img_height
-                    
-                    # Create box entry
-                    box_data = {
-                        "class": class_id,
-                        "name": result.names.get(class_id, f"Class {class_id}"),
-                        "confidence": confidence,
-                        "x_center": x_center_norm,
-                        "y_center": y_center_norm,
-                        "width": width_norm,
-                        "height": height_norm,
-                        # Also include pixel coordinates for convenience
-                        "x1": x1,
-                        "y1": y1,
-                        "x2": x2,
-                        "y2": y2
-                    }
-                    
-                    boxes.append(box_data)
-                except Exception as e:
-                    print(f"Error processing box {i}: {str(e)}")
-                    continue
+        if result.boxes is not None and len(result.boxes):
+            try:
+                columns = box_columns(
+                    _to_numpy(result.boxes.xyxy),
+                    _to_numpy(result.boxes.conf),
+                    _to_numpy(result.boxes.cls),
+                    result.names,
+                    img_width,
+                    img_height,
+                )
+            except Exception as e:
+                print(f"Error processing boxes: {str(e)}")
         
         # Compile result data
         formatted_result = {
-            "boxes": boxes,
-            "image_width": result.orig_shape[1],
-            "image_height": result.orig_shape[0],
+            "boxes": columns if columnar else columns_to_rows(columns),
+            "image_width": img_width,
+            "image_height": img_height,
             "image_path": result.path,
             "prediction_time": result.speed.get('inference', 0)
         }
@@ -273,6 +1278,217 @@ def format_results(results) -> List[Dict[str, Any]]:
     
     return formatted_results
 
+def columns_to_rows(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """
+    Convert columnar boxes (parallel lists) to a list of per-box dicts.
+    
+    Args:
+        columns: Dict mapping each field in BOX_FIELDS to a list of values
+        
+    Returns:
+        List of box dicts
+    """
+    return [dict(zip(BOX_FIELDS, values)) for values in zip(*(columns[field] for field in BOX_FIELDS))]
+
+def rows_to_columns(rows: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """
+    Convert a list of per-box dicts to columnar boxes (parallel lists).
+    
+    Args:
+        rows: List of box dicts
+        
+    Returns:
+        Dict mapping each field in BOX_FIELDS to a list of values
+    """
+    return {field: [row[field] for row in rows] for field in BOX_FIELDS}
+
+def convert_boxes_format(formatted_result: Dict[str, Any], columnar: bool) -> Dict[str, Any]:
+    """
+    Return a formatted result with its boxes in the requested layout.
+    
+    Args:
+        formatted_result: A single format_results entry (either layout)
+        columnar: Whether boxes should be columnar (parallel lists)
+        
+    Returns:
+        The same entry with "boxes" converted if needed
+    """
+    boxes = formatted_result.get("boxes", [])
+    is_columnar = isinstance(boxes, dict)
+    if is_columnar == columnar:
+        return formatted_result
+    converted = dict(formatted_result)
+    converted["boxes"] = rows_to_columns(boxes) if columnar else columns_to_rows(boxes)
+    return converted
+
+def parse_class_conf(class_conf: str) -> Dict[Union[int, str], float]:
+    """
+    Parse per-class thresholds given as "name:0.5,2:0.3".
+    
+    Args:
+        class_conf: Comma-separated class:threshold pairs (class name or id)
+        
+    Returns:
+        Dict mapping class ids (int) and class names (str) to thresholds;
+        raises ValueError if a threshold is not a number
+    """
+    thresholds = {}
+    for item in class_conf.split(","):
+        if not item.strip():
+            continue
+        key, _, value = item.rpartition(":")
+        key = key.strip()
+        thresholds[int(key) if key.isdigit() else key] = float(value)
+    return thresholds
+
+def filter_predictions(
+    formatted_result: Dict[str, Any],
+    conf: float = CONFIDENCE_THRESHOLD,
+    class_conf: Optional[Dict[Union[int, str], float]] = None,
+    columnar: bool = False,
+) -> Dict[str, Any]:
+    """
+    Apply confidence thresholds to a raw prediction without running the model.
+    
+    Results are stored at RAW_CONFIDENCE_FLOOR with up to RAW_MAX_DETECTIONS
+    boxes. NMS only lets higher scoring boxes suppress lower scoring ones, so
+    the boxes above a threshold, cut to the MAX_DETECTIONS highest scoring, are
+    the boxes predicting at that threshold returns. That holds as long as the
+    raw result was not itself cut off below the threshold; check it with
+    filter_is_exact().
+    
+    Args:
+        formatted_result: A single format_results entry (either layout), not modified
+        conf: Confidence threshold for classes without their own threshold
+        class_conf: Per-class thresholds keyed by class id or class name
+        columnar: Return boxes as parallel lists instead of one dict per box
+        
+    Returns:
+        A new format_results entry with only the boxes above their threshold
+    """
+    columns = formatted_result.get("boxes", [])
+    if not isinstance(columns, dict):
+        columns = rows_to_columns(columns)
+    
+    keep = _passing_boxes(columns, conf, class_conf)
+    if len(keep) > MAX_DETECTIONS:
+        confidences = columns["confidence"]
+        keep = sorted(sorted(keep, key=lambda i: -confidences[i])[:MAX_DETECTIONS])
+    
+    boxes = {field: [values[i] for i in keep] for field, values in columns.items()}
+    filtered = {key: value for key, value in formatted_result.items() if key != "boxes"}
+    filtered["boxes"] = boxes if columnar else columns_to_rows(boxes)
+    return filtered
+
+def filter_is_exact(
+    formatted_result: Dict[str, Any],
+    conf: float = CONFIDENCE_THRESHOLD,
+    class_conf: Optional[Dict[Union[int, str], float]] = None,
+) -> bool:
+    """
+    Check whether filter_predictions() gives the same boxes as predicting at the thresholds.
+    
+    A raw result that reached RAW_MAX_DETECTIONS dropped its lowest scoring
+    boxes. Those can only matter when fewer than MAX_DETECTIONS stored boxes
+    pass the thresholds while the lowest stored score still passes one of them
+    (possible with per-class thresholds); the caller then has to predict at
+    the lowest threshold instead.
+    
+    Args:
+        formatted_result: A raw format_results entry (either layout)
+        conf: Confidence threshold for classes without their own threshold
+        class_conf: Per-class thresholds keyed by class id or class name
+        
+    Returns:
+        True if the filtered boxes are exact
+    """
+    columns = formatted_result.get("boxes", [])
+    if not isinstance(columns, dict):
+        columns = rows_to_columns(columns)
+    confidences = columns["confidence"]
+    if len(confidences) < max_detections(RAW_CONFIDENCE_FLOOR):
+        return True
+    lowest_threshold = min([conf, *class_conf.values()]) if class_conf else conf
+    if min(confidences) < lowest_threshold:
+        return True
+    return len(_passing_boxes(columns, conf, class_conf)) >= MAX_DETECTIONS
+
+def _passing_boxes(
+    columns: Dict[str, List[Any]],
+    conf: float,
+    class_conf: Optional[Dict[Union[int, str], float]],
+) -> List[int]:
+    confidences = columns["confidence"]
+    if class_conf:
+        return [
+            i for i, (score, class_id, name) in enumerate(zip(confidences, columns["class"], columns["name"]))
+            if score >= class_conf.get(name, class_conf.get(class_id, conf))
+        ]
+    return [i for i, score in enumerate(confidences) if score >= conf]
+
+def compare_backends(
+    image_path: str,
+    conf: float = CONFIDENCE_THRESHOLD,
+    model_path: Optional[str] = None,
+    iou_match: float = 0.5,
+) -> Dict[str, Any]:
+    """
+    Compare PyTorch and ONNX backend predictions on the same image.
+    
+    Boxes are matched greedily by class and IoU; differences are reported on
+    the normalized coordinates and confidences of matched boxes.
+    
+    Args:
+        image_path: Path to the image file
+        conf: Confidence threshold for detections (0-1)
+        model_path: Path to a specific model file (optional)
+        iou_match: Minimum IoU for two boxes to be considered the same detection
+        
+    Returns:
+        Dict with box counts, number matched, the lowest IoU of a matched pair
+        and max coordinate/confidence differences
+    """
+    torch_boxes = format_results(predict(image_path, conf, model_path, backend="torch"), columnar=True)[0]["boxes"]
+    onnx_boxes = format_results(predict(image_path, conf, model_path, backend="onnx"), columnar=True)[0]["boxes"]
+    
+    def corners(boxes):
+        return np.array([boxes["x1"], boxes["y1"], boxes["x2"], boxes["y2"]], dtype=np.float64).T.reshape(-1, 4)
+    
+    torch_xyxy, onnx_xyxy = corners(torch_boxes), corners(onnx_boxes)
+    coords = ("x_center", "y_center", "width", "height")
+    unmatched = set(range(len(onnx_xyxy)))
+    matched, min_iou, max_coord_diff, max_conf_diff = 0, 1.0, 0.0, 0.0
+    
+    for i in range(len(torch_xyxy)):
+        best_j, best_iou = None, iou_match
+        for j in unmatched:
+            if onnx_boxes["class"][j] != torch_boxes["class"][i]:
+                continue
+            inter_w = max(0.0, min(torch_xyxy[i, 2], onnx_xyxy[j, 2]) - max(torch_xyxy[i, 0], onnx_xyxy[j, 0]))
+            inter_h = max(0.0, min(torch_xyxy[i, 3], onnx_xyxy[j, 3]) - max(torch_xyxy[i, 1], onnx_xyxy[j, 1]))
+            inter = inter_w * inter_h
+            area_i = (torch_xyxy[i, 2] - torch_xyxy[i, 0]) * (torch_xyxy[i, 3] - torch_xyxy[i, 1])
+            area_j = (onnx_xyxy[j, 2] - onnx_xyxy[j, 0]) * (onnx_xyxy[j, 3] - onnx_xyxy[j, 1])
+            iou = inter / (area_i + area_j - inter + 1e-9)
+            if iou >= best_iou:
+                best_j, best_iou = j, iou
+        if best_j is None:
+            continue
+        unmatched.discard(best_j)
+        matched += 1
+        min_iou = min(min_iou, best_iou)
+        max_coord_diff = max(max_coord_diff, *(abs(torch_boxes[c][i] - onnx_boxes[c][best_j]) for c in coords))
+        max_conf_diff = max(max_conf_diff, abs(torch_boxes["confidence"][i] - onnx_boxes["confidence"][best_j]))
+    
+    return {
+        "torch_boxes": len(torch_xyxy),
+        "onnx_boxes": len(onnx_xyxy),
+        "matched": matched,
+        "min_iou": min_iou if matched else None,
+        "max_coord_diff": max_coord_diff,
+        "max_conf_diff": max_conf_diff,
+    }
+
 if __name__ == "__main__":
     # Simple command-line interface when run directly
     import argparse
@@ -286,6 +1502,8 @@ if __name__ == "__main__":
     parser.add_argument("--visualize", action="store_true", help="Generate visualization with bounding boxes")
     parser.add_argument("--line-width", type=int, default=2, help="Width of bounding box lines")
     parser.add_argument("--color", help="Bounding box color as R,G,B (e.g., 255,0,0 for red)")
+    parser.add_argument("--backend", choices=BACKENDS, help=f"Inference backend (default: {INFERENCE_BACKEND})")
+    parser.add_argument("--compare-backends", action="store_true", help="Compare PyTorch and ONNX predictions")
     
     args = parser.parse_args()
     
@@ -301,26 +1519,33 @@ if __name__ == "__main__":
             except:
                 print("Warning: Invalid color format. Using default color.")
         
+        if args.compare_backends:
+            comparison = compare_backends(args.image_path, args.conf, args.model)
+            print("\nBackend comparison (PyTorch vs ONNX):")
+            pprint(comparison)
+            sys.exit(0)
+        
         if args.visualize:
-            # Generate visualization
-            vis_path = predict_and_visualize(
+            # Run prediction and generate visualization from the same results
+            formatted_results, vis_path = predict_with_visualization(
                 args.image_path, 
                 args.conf, 
                 args.model,
                 line_width=args.line_width,
-                box_color=box_color
+                box_color=box_color,
+                backend=args.backend
             )
             
             if vis_path:
                 print(f"\nVisualization saved to: {vis_path}")
             else:
                 print("\nFailed to generate visualization")
-        
-        # Run prediction
-        results = predict(args.image_path, args.conf, args.model)
-        
-        # Format and print results
-        formatted_results = format_results(results)
+        else:
+            # Run prediction
+            results = predict(args.image_path, args.conf, args.model, backend=args.backend)
+            
+            # Format results
+            formatted_results = format_results(results)
         
         for i, result in enumerate(formatted_results):
             print(f"\nResult {i+1}:")
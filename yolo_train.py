@@ -21,6 +21,8 @@ except ImportError:
 DEFAULT_MODEL = "yolo11n.pt"  # YOLOv11 nano model - smaller and faster than small
 TRAINING_DIR = os.path.join(os.getcwd(), "yolo_training")
 OUTPUT_DIR = os.path.join(os.getcwd(), "custom_yolo_model")
+CALIBRATION_IMAGES_DIR = os.path.join(TRAINING_DIR, "images", "train")
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp')
 
 def train(
     epochs: int = 50,
@@ -237,6 +239,177 @@ def validate(model_path: Optional[str] = None) -> Dict[str, Any]:
             "error": str(e)
         }
 
+def _benchmark_latency(predict_fn, image_paths: List[str]) -> float:
+    """Return the mean latency in milliseconds of predict_fn over image_paths (after one warmup call)."""
+    predict_fn(image_paths[0])
+    start_time = time.perf_counter()
+    for image_path in image_paths:
+        predict_fn(image_path)
+    return (time.perf_counter() - start_time) * 1000 / len(image_paths)
+
+def quantize(
+    model_path: Optional[str] = None,
+    method: str = "static",
+    calibration_images: int = 100,
+    benchmark_images: int = 20,
+    run_validation: bool = True,
+    verbose: bool = True,
+) -> Dict[str, Any]:
+    """
+    Produce an INT8 ONNX variant of a trained model and compare it to the float model.
+    
+    The weights are exported to ONNX, then quantized with ONNX Runtime. Static
+    quantization calibrates activation ranges on images from
+    yolo_training/images/train; dynamic quantization only quantizes weights.
+    The result is saved next to the weights as <name>.int8.onnx, which
+    yolo_predict serves with backend="onnx_int8".
+    
+    Args:
+        model_path: Path to the float model (defaults to best.pt in OUTPUT_DIR)
+        method: 'static' (calibrated) or 'dynamic'
+        calibration_images: Maximum number of images used for calibration
+        benchmark_images: Number of images used to measure latency
+        run_validation: Compare mAP50 of both models with validate()
+        verbose: Print the comparison report
+        
+    Returns:
+        Dict containing the quantized model path and the comparison report
+    """
+    if model_path is None:
+        model_path = os.path.join(OUTPUT_DIR, "best.pt")
+    
+    if not os.path.exists(model_path):
+        return {"success": False, "error": f"Model not found: {model_path}"}
+    
+    if method not in ("static", "dynamic"):
+        return {"success": False, "error": f"Invalid quantization method: {method}"}
+    
+    if not os.path.isdir(CALIBRATION_IMAGES_DIR):
+        return {"success": False, "error": f"Calibration images not found: {CALIBRATION_IMAGES_DIR}"}
+    
+    image_paths = sorted(
+        os.path.join(CALIBRATION_IMAGES_DIR, f) for f in os.listdir(CALIBRATION_IMAGES_DIR)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    if not image_paths:
+        return {"success": False, "error": f"No images found in {CALIBRATION_IMAGES_DIR}"}
+    
+    try:
+        import cv2
+        import numpy as np
+        import onnx_backend
+        from onnxruntime.quantization import (
+            CalibrationDataReader, QuantFormat, QuantType, quantize_dynamic, quantize_static
+        )
+    except ImportError as e:
+        return {
+            "success": False,
+            "error": f"{str(e)}. Quantization requires: pip install onnx onnxruntime opencv-python"
+        }
+    
+    try:
+        start_time = time.time()
+        float_onnx_path = onnx_backend.export_onnx(model_path)
+        int8_path = onnx_backend.quantized_onnx_path(model_path)
+        
+        if method == "static":
+            float_model = onnx_backend.OnnxModel(float_onnx_path)
+            
+            class ImageCalibrationReader(CalibrationDataReader):
+                """Feeds letterboxed training images to the calibrator, one at a time."""
+                
+                def __init__(self, paths):
+                    self._paths = iter(paths)
+                
+                def get_next(self):
+                    for path in self._paths:
+                        img = cv2.imread(path)
+                        if img is None:
+                            continue
+                        padded, _, _ = onnx_backend.letterbox(img, float_model.imgsz)
+                        tensor = padded[..., ::-1].transpose(2, 0, 1)[None]
+                        return {float_model.input_name: np.ascontiguousarray(tensor, dtype=np.float32) / 255.0}
+                    return None
+            
+            if verbose:
+                print(f"Calibrating on {min(len(image_paths), calibration_images)} images from {CALIBRATION_IMAGES_DIR}")
+            quantize_static(
+                float_onnx_path,
+                int8_path,
+                ImageCalibrationReader(image_paths[:calibration_images]),
+                quant_format=QuantFormat.QDQ,
+                activation_type=QuantType.QUInt8,
+                weight_type=QuantType.QInt8,
+                per_channel=True,
+            )
+        else:
+            quantize_dynamic(float_onnx_path, int8_path, weight_type=QuantType.QUInt8)
+        
+        # Keep the class names and input size ultralytics stores in the model metadata
+        import onnx
+        float_proto = onnx.load(float_onnx_path)
+        int8_proto = onnx.load(int8_path)
+        del int8_proto.metadata_props[:]
+        int8_proto.metadata_props.extend(float_proto.metadata_props)
+        onnx.save(int8_proto, int8_path)
+        
+        quantization_time = time.time() - start_time
+        
+        # Compare latency and size of the float and INT8 models
+        bench_paths = image_paths[:benchmark_images]
+        torch_model = YOLO(model_path)
+        onnx_model = onnx_backend.OnnxModel(float_onnx_path)
+        int8_model = onnx_backend.OnnxModel(int8_path)
+        
+        report = {
+            "float": {
+                "path": model_path,
+                "size_mb": os.path.getsize(model_path) / 1e6,
+                "latency_ms": _benchmark_latency(lambda p: torch_model.predict(source=p, verbose=False), bench_paths),
+            },
+            "onnx_float": {
+                "path": float_onnx_path,
+                "size_mb": os.path.getsize(float_onnx_path) / 1e6,
+                "latency_ms": _benchmark_latency(lambda p: onnx_model.predict(source=p), bench_paths),
+            },
+            "int8": {
+                "path": int8_path,
+                "size_mb": os.path.getsize(int8_path) / 1e6,
+                "latency_ms": _benchmark_latency(lambda p: int8_model.predict(source=p), bench_paths),
+            },
+        }
+        
+        if run_validation:
+            for name, path in (("float", model_path), ("int8", int8_path)):
+                validation = validate(path)
+                report[name]["mAP50"] = validation["metrics"]["mAP50"] if validation["success"] else None
+                if not validation["success"] and verbose:
+                    print(f"Validation of {path} failed: {validation.get('error')}")
+        
+        if verbose:
+            print(f"\nQuantization report ({method}, {quantization_time:.1f}s):")
+            print(f"  {'Model':<12}{'Size (MB)':>12}{'Latency (ms)':>15}{'mAP50':>10}")
+            for name, row in report.items():
+                map50 = row.get("mAP50")
+                map50_text = f"{map50:.4f}" if map50 is not None else "-"
+                print(f"  {name:<12}{row['size_mb']:>12.2f}{row['latency_ms']:>15.1f}{map50_text:>10}")
+        
+        return {
+            "success": True,
+            "method": method,
+            "quantized_model_path": int8_path,
+            "quantization_time": quantization_time,
+            "report": report
+        }
+    
+    except Exception as e:
+        if verbose:
+            print(f"Quantization error: {str(e)}")
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
 if __name__ == "__main__":
     # Simple command-line interface when run directly
     import argparse
@@ -247,10 +420,19 @@ if __name__ == "__main__":
     parser.add_argument("--img", type=int, default=640, help="Image size")
     parser.add_argument("--resume", action="store_true", help="Resume training from last checkpoint")
     parser.add_argument("--validate", action="store_true", help="Validate instead of train")
+    parser.add_argument("--quantize", action="store_true", help="Create an INT8 variant of best.pt instead of training")
+    parser.add_argument("--quant-method", choices=["static", "dynamic"], default="static", help="Quantization method")
     
     args = parser.parse_args()
     
-    if args.validate:
+    if args.quantize:
+        print("Quantizing model...")
+        results = quantize(method=args.quant_method)
+        if results["success"]:
+            print(f"\nQuantized model saved to: {results['quantized_model_path']}")
+        else:
+            print(f"Quantization failed: {results.get('error')}")
+    elif args.validate:
         print("Validating model...")
         results = validate()
         if results["success"]: